@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+휴대폰 업로드 SSE(/approval/v2/mobile-upload/<token>/events/)처럼 연결을 오래 잡는 요청은
+ASGI 워커로 띄운다. 예) MOBILE_UPLOAD_SSE=1 gunicorn approval.asgi:application -k uvicorn.workers.UvicornWorker
+(WSGI 배포에서는 MOBILE_UPLOAD_SSE를 켜지 않는다 → 작성 화면은 폴링)
 """
 
 import os
@@ -14,3 +18,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'approval.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.APPROVAL_PDF_WARM_ON_START:
+    from approvals_v2.pdf_renderer import warm_renderer
+
+    warm_renderer()
+
+if settings.UPLOAD_SWEEP_INTERVAL_SECONDS > 0:
+    from approvals_v2.upload_sweeper import start_sweeper_thread
+
+    start_sweeper_thread()
@@ -133,6 +133,110 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 업로드를 받으면서 SHA-256 계산 (첨부 중복 제거 저장소용)
+FILE_UPLOAD_HANDLERS = [
+    "approvals_v2.upload_handlers.HashingMemoryFileUploadHandler",
+    "approvals_v2.upload_handlers.HashingTemporaryFileUploadHandler",
+]
+
+# v2 PDF 렌더 결과 캐시 (media 밖, 직접 노출 X)
+APPROVAL_PDF_CACHE_DIR = Path(os.environ.get("APPROVAL_PDF_CACHE_DIR", BASE_DIR / "pdf_cache"))
+# inline: 요청 안에서 렌더 / service: manage.py pdf_render_worker가 렌더, 웹은 대기 화면
+# service로 두면 pdf_render_worker를 반드시 함께 띄워야 한다 (없으면 PdfRenderJob이 처리되지 않음)
+APPROVAL_PDF_RENDER_MODE = os.environ.get("APPROVAL_PDF_RENDER_MODE", "inline")
+APPROVAL_PDF_RENDER_WORKERS = int(os.environ.get("APPROVAL_PDF_RENDER_WORKERS", "2"))
+# 웹 프로세스 시작 시 PDF 렌더러(폰트 설정/CSS) 예열 (렌더 풀 프로세스는 항상 예열)
+APPROVAL_PDF_WARM_ON_START = os.environ.get(
+    "APPROVAL_PDF_WARM_ON_START", "1" if APPROVAL_PDF_RENDER_MODE == "inline" else "0"
+) == "1"
+# 완료/반려 시 최종 PDF를 pdf_render_worker로 미리 렌더 (service 모드에서만, inline이면 무시)
+APPROVAL_PDF_PRERENDER = os.environ.get("APPROVAL_PDF_PRERENDER", "1") == "1"
+# PDF 묶음 ZIP 내보내기 1회 최대 문서 수
+APPROVAL_EXPORT_MAX_DOCS = int(os.environ.get("APPROVAL_EXPORT_MAX_DOCS", "1000"))
+# v2 리스트 페이지 크기 (id keyset 페이지)
+APPROVAL_LIST_PAGE_SIZE = int(os.environ.get("APPROVAL_LIST_PAGE_SIZE", "50"))
+# 결재함 일괄 승인 1회 최대 문서 수
+APPROVAL_BATCH_APPROVE_MAX = int(os.environ.get("APPROVAL_BATCH_APPROVE_MAX", "200"))
+# 요청 없이(워커 등) 렌더할 때 이미지/정적파일을 받아올 기준 URL
+APPROVAL_PDF_BASE_URL = os.environ.get("APPROVAL_PDF_BASE_URL", "http://127.0.0.1:8000/")
+
+# 휴대폰 업로드 → PC 작성 화면 전달 (approvals_v2.handoff), 워커 간 공유되는 캐시여야 한다
+# 기본 DatabaseCache 테이블은 배포 시 migrate 다음에 manage.py createcachetable로 만든다 (LOCATION을 바꿨을 때도)
+MOBILE_UPLOAD_HANDOFF_TTL = int(os.environ.get("MOBILE_UPLOAD_HANDOFF_TTL", "1800"))
+# 업로드 완료 SSE: ASGI(approval/asgi.py)로 띄울 때만 "1". WSGI에서는 연결마다 sync 워커를 잡으므로 끄고 폴링
+MOBILE_UPLOAD_SSE = os.environ.get("MOBILE_UPLOAD_SSE", "0") == "1"
+# SSE 연결 1회 유지 시간 / 서버 내부 캐시 확인 간격(초)
+MOBILE_UPLOAD_EVENTS_TIMEOUT = float(os.environ.get("MOBILE_UPLOAD_EVENTS_TIMEOUT", "55"))
+MOBILE_UPLOAD_EVENTS_INTERVAL = float(os.environ.get("MOBILE_UPLOAD_EVENTS_INTERVAL", "3"))
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "handoff": {
+        "BACKEND": os.environ.get("APPROVAL_HANDOFF_CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": os.environ.get("APPROVAL_HANDOFF_CACHE_LOCATION", "approval_handoff_cache"),
+        "TIMEOUT": MOBILE_UPLOAD_HANDOFF_TTL,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+# 임시 업로드 정리 (manage.py sweep_uploads / 웹 프로세스 내 스케줄러)
+# 사용됨 = PC 작성 화면이 받아 감(아직 저장 전일 수 있음). 미사용 기준/MOBILE_UPLOAD_HANDOFF_TTL보다 짧게 잡혀도 그만큼은 남긴다
+UPLOAD_SWEEP_USED_AFTER_HOURS = int(os.environ.get("UPLOAD_SWEEP_USED_AFTER_HOURS", "72"))
+UPLOAD_SWEEP_UNUSED_AFTER_HOURS = int(os.environ.get("UPLOAD_SWEEP_UNUSED_AFTER_HOURS", "24"))
+UPLOAD_SWEEP_INTERVAL_SECONDS = float(os.environ.get("UPLOAD_SWEEP_INTERVAL_SECONDS", "0"))  # 0이면 끔
+# 업로드 이미지 정규화 (approvals_v2.images): 긴 변 최대 px / JPEG 품질 / 썸네일 / 도장
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE", "2000"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_THUMB_EDGE = int(os.environ.get("IMAGE_THUMB_EDGE", "480"))
+STAMP_MAX_EDGE = int(os.environ.get("STAMP_MAX_EDGE", "300"))
+# 첨부 분할(이어받기) 업로드 (approvals_v2.chunked_upload)
+CHUNKED_UPLOAD_DIR = Path(os.environ.get("CHUNKED_UPLOAD_DIR", BASE_DIR / "upload_tmp"))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get("CHUNKED_UPLOAD_CHUNK_SIZE", str(2 * 1024 * 1024)))
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.environ.get("CHUNKED_UPLOAD_MAX_CHUNK", str(8 * 1024 * 1024)))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get("CHUNKED_UPLOAD_MAX_SIZE", str(200 * 1024 * 1024)))
+# 첨부/도장/PDF 다운로드를 앞단 프록시가 전송 (approvals_v2.downloads)
+#   "nginx": X-Accel-Redirect, 예) location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+#   "xsendfile": X-Sendfile (apache/lighttpd), "": Django가 직접 전송(개발용)
+APPROVAL_SENDFILE_BACKEND = os.environ.get("APPROVAL_SENDFILE_BACKEND", "")
+APPROVAL_SENDFILE_NGINX_LOCATIONS = {
+    MEDIA_ROOT: os.environ.get("APPROVAL_SENDFILE_MEDIA_LOCATION", "/protected-media/"),
+    APPROVAL_PDF_CACHE_DIR: os.environ.get("APPROVAL_SENDFILE_PDF_LOCATION", "/protected-pdf-cache/"),
+}
+# 도장/썸네일 서명 주소 유효 시간(초)
+APPROVAL_SIGNED_URL_TTL = int(os.environ.get("APPROVAL_SIGNED_URL_TTL", "3600"))
+# 결재자/수신자(TelegramRecipient) 프로세스 캐시 유지 시간(초). 같은 프로세스의 변경은 즉시 반영
+RECIPIENT_DIRECTORY_TTL = float(os.environ.get("RECIPIENT_DIRECTORY_TTL", "60"))
+# 결재선 템플릿 (approvals_v2.route_templates). 위에서부터 작성 폼 선택지 순서
+#   roles: 결재 순서대로의 역할 (첫 역할이 기안자, 상신 시 자동 승인)
+#   notify: 알림 정책 (approvals_v2.notifications.NOTIFY_POLICIES), 생략 시 기안자 역할로 결정
+APPROVAL_ROUTE_TEMPLATES = [
+    {"code": "ADMIN_FINAL", "label": "총무전결(담당→총무)", "roles": ["drafter", "admin"], "notify": "admin_final"},
+    {"code": "NORMAL", "label": "일반품의(담당→총무→회장)", "roles": ["drafter", "admin", "chairman"]},
+    {"code": "ADMIN_TO_CHAIR", "label": "총무품의(총무→회장)", "roles": ["admin", "chairman"]},
+    {"code": "ADMIN_TO_AUDITOR_CHAIR", "label": "총무품의(총무→감사→회장)", "roles": ["admin", "auditor", "chairman"]},
+]
+
 FORCE_SCRIPT_NAME = os.environ.get("FORCE_SCRIPT_NAME", "")
 USE_X_FORWARDED_HOST = True
-LOGIN_URL = "/approval/admin/login/"
\ No newline at end of file
+LOGIN_URL = "/approval/admin/login/"
+
+# Telegram 알림 outbox (manage.py telegram_outbox_worker)
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "8"))
+TELEGRAM_OUTBOX_BACKOFF_SECONDS = int(os.environ.get("TELEGRAM_OUTBOX_BACKOFF_SECONDS", "5"))
+
+# Telegram HTTP 클라이언트 (approvals.utils.telegram_client)
+TELEGRAM_CONNECT_TIMEOUT = float(os.environ.get("TELEGRAM_CONNECT_TIMEOUT", "3.05"))
+TELEGRAM_READ_TIMEOUT = float(os.environ.get("TELEGRAM_READ_TIMEOUT", "5"))
+TELEGRAM_HTTP_POOL_SIZE = int(os.environ.get("TELEGRAM_HTTP_POOL_SIZE", "10"))
+# 한 이벤트의 수신자 병렬 발송 상한 (1이면 순차). 풀 크기보다 크게 잡지 않는다.
+TELEGRAM_FANOUT_CONCURRENCY = int(os.environ.get("TELEGRAM_FANOUT_CONCURRENCY", "4"))
+
+# Telegram 발송 속도 제한 (approvals.utils.telegram_ratelimit)
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "25"))  # 봇 전체 초당
+TELEGRAM_PER_CHAT_RATE = float(os.environ.get("TELEGRAM_PER_CHAT_RATE", "1"))  # DM 초당
+TELEGRAM_GROUP_RATE = float(os.environ.get("TELEGRAM_GROUP_RATE", str(20 / 60)))  # 그룹방 초당
+TELEGRAM_PER_CHAT_BURST = float(os.environ.get("TELEGRAM_PER_CHAT_BURST", "1"))
+TELEGRAM_RATE_WAIT_TIMEOUT = float(os.environ.get("TELEGRAM_RATE_WAIT_TIMEOUT", "60"))
+TELEGRAM_MAX_429_RETRIES = int(os.environ.get("TELEGRAM_MAX_429_RETRIES", "3"))
+# chat_id별 버킷 최대 개수 (넘으면 쉬고 있는 버킷부터 정리)
+TELEGRAM_RATE_MAX_CHATS = int(os.environ.get("TELEGRAM_RATE_MAX_CHATS", "1000"))
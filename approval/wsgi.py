@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'approval.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.APPROVAL_PDF_WARM_ON_START:
+    from approvals_v2.pdf_renderer import warm_renderer
+
+    warm_renderer()
+
+if settings.UPLOAD_SWEEP_INTERVAL_SECONDS > 0:
+    from approvals_v2.upload_sweeper import start_sweeper_thread
+
+    start_sweeper_thread()
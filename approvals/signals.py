@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# v1 텔레그램 알림 요청 (approvals.utils.telegram.enqueue_telegram)
+# 발송 대기열을 가진 앱(approvals_v2)이 받아 적재한다. approvals는 v2를 import하지 않는다.
+# kwargs: text, approval, chat_id, event / 적재했으면 receiver가 True를 돌려준다
+telegram_requested = Signal()
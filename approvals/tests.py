@@ -1,3 +1,162 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .utils import telegram_client
+from .utils.telegram_ratelimit import TelegramRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        now = bucket.updated
+
+        for _ in range(3):
+            self.assertEqual(bucket.wait_time(now), 0.0)
+            bucket.consume()
+        self.assertAlmostEqual(bucket.wait_time(now), 0.5)
+        self.assertEqual(bucket.wait_time(now + 0.5), 0.0)
+
+    def test_refill_stops_at_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=2)
+        now = bucket.updated
+        bucket.consume()
+        bucket.consume()
+
+        self.assertFalse(bucket.is_idle(now + 1))
+        self.assertTrue(bucket.is_idle(now + 60))
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_block_waits_until_retry_after(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        now = bucket.updated
+        bucket.block(now + 7)
+
+        self.assertAlmostEqual(bucket.wait_time(now + 2), 5)
+        self.assertFalse(bucket.is_idle(now + 2))
+        self.assertEqual(bucket.wait_time(now + 7), 0.0)
+
+
+class TelegramRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("approvals.utils.telegram_ratelimit.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _limiter(self, **kwargs):
+        options = {"global_rate": 100, "per_chat_rate": 1, "group_rate": 1 / 3, "burst": 1}
+        options.update(kwargs)
+        return TelegramRateLimiter(**options)
+
+    def test_per_chat_rate(self):
+        limiter = self._limiter()
+
+        self.assertTrue(limiter.acquire("1", timeout=0))
+        self.assertFalse(limiter.acquire("1", timeout=0))
+        self.assertTrue(limiter.acquire("2", timeout=0))
+
+        self.clock.now += 1
+        self.assertTrue(limiter.acquire("1", timeout=0))
+
+    def test_group_chat_uses_group_rate(self):
+        limiter = self._limiter()
+        self.assertTrue(limiter.acquire("-100", timeout=0))
+
+        self.clock.now += 1
+        self.assertFalse(limiter.acquire("-100", timeout=0))
+        self.clock.now += 2
+        self.assertTrue(limiter.acquire("-100", timeout=0))
+
+    def test_global_rate_applies_across_chats(self):
+        limiter = self._limiter(global_rate=2)
+
+        self.assertTrue(limiter.acquire("1", timeout=0))
+        self.assertTrue(limiter.acquire("2", timeout=0))
+        self.assertFalse(limiter.acquire("3", timeout=0))
+
+    def test_retry_after_blocks_only_that_chat(self):
+        limiter = self._limiter()
+        limiter.penalize("1", 30)
+
+        self.assertFalse(limiter.acquire("1", timeout=0))
+        self.assertTrue(limiter.acquire("2", timeout=0))
+
+        self.clock.now += 29
+        self.assertFalse(limiter.acquire("1", timeout=0))
+        self.clock.now += 1
+        self.assertTrue(limiter.acquire("1", timeout=0))
+
+    def test_eviction_drops_only_idle_buckets_without_waiters(self):
+        limiter = self._limiter(max_chats=3)
+        for chat_id in ("idle", "waiting", "busy"):
+            limiter.acquire(chat_id, timeout=0)
+        self.clock.now += 10
+        limiter.acquire("busy", timeout=0)
+        limiter._waiting["waiting"] = 1  # 다른 스레드가 acquire 안에서 기다리는 중
+
+        limiter.acquire("new", timeout=0)
+
+        self.assertEqual(set(limiter._chats), {"waiting", "busy", "new"})
+
+    def test_penalty_survives_eviction_pressure(self):
+        limiter = self._limiter(max_chats=1)
+        limiter.penalize("1", 30)
+
+        limiter.acquire("2", timeout=0)
+
+        self.assertIn("1", limiter._chats)
+        self.assertFalse(limiter.acquire("1", timeout=0))
+
+
+@override_settings(TELEGRAM_RATE_WAIT_TIMEOUT=1, TELEGRAM_MAX_429_RETRIES=2)
+class SendMessageTests(SimpleTestCase):
+    def _response(self, status, **data):
+        return {"ok": status == 200, "status": status, "data": data, "text": "", "error": "", "elapsed_ms": 1.0}
+
+    def _send(self, responses, limiter):
+        with mock.patch.object(telegram_client, "get_limiter", return_value=limiter), \
+                mock.patch.object(telegram_client, "call_api", side_effect=responses) as call_api:
+            res = telegram_client.send_message(token="t", chat_id="42", data={"text": "x"})
+        return res, call_api
+
+    def test_429_penalizes_chat_and_retries(self):
+        limiter = mock.Mock()
+        limiter.acquire.return_value = True
+
+        with self.assertLogs("approvals.utils.telegram_client", "WARNING"):
+            res, call_api = self._send(
+                [self._response(429, parameters={"retry_after": 7}), self._response(200, ok=True)], limiter
+            )
+
+        self.assertTrue(res["ok"])
+        self.assertEqual(call_api.call_count, 2)
+        limiter.penalize.assert_called_once_with("42", 7.0)
+
+    def test_gives_up_after_max_retries(self):
+        limiter = mock.Mock()
+        limiter.acquire.return_value = True
+
+        with self.assertLogs("approvals.utils.telegram_client", "WARNING") as logs:
+            res, call_api = self._send([self._response(429, parameters={"retry_after": 1})] * 3, limiter)
+
+        self.assertEqual(res["status"], 429)
+        self.assertEqual(call_api.call_count, 3)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_wait_timeout_does_not_call_api(self):
+        limiter = mock.Mock()
+        limiter.acquire.return_value = False
+
+        res, call_api = self._send([], limiter)
+
+        self.assertEqual(res["error"], "rate limit wait timeout")
+        call_api.assert_not_called()
@@ -1,20 +1,26 @@
+import logging
 import os
-import requests
 
-def send_telegram(text: str) -> None:
-    token = os.environ.get("TELEGRAM_BOT_TOKEN")
-    chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+from approvals.signals import telegram_requested
 
-    if not token or not chat_id:
+logger = logging.getLogger(__name__)
+
+
+def enqueue_telegram(text: str, *, approval=None) -> None:
+    """
+    v1 알림을 발송 대기열에 넣는다. (approvals_v2가 telegram_requested를 받아 TelegramOutbox에 적재)
+    웹 요청에서는 HTTP/속도 제한 대기를 하지 않고, 발송은 manage.py telegram_outbox_worker가 한다.
+    """
+    chat_id = (os.environ.get("TELEGRAM_CHAT_ID") or "").strip()
+    if not chat_id:
         return
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    requests.post(
-        url,
-        json={
-            "chat_id": chat_id,
-            "text": text,
-            "disable_web_page_preview": True,
-        },
-        timeout=5,
+    responses = telegram_requested.send(
+        sender=None,
+        text=text,
+        approval=approval,
+        chat_id=chat_id,
+        event="v1_sign",
     )
+    if not any(queued for _, queued in responses):
+        logger.warning("telegram 대기열 없음, 알림을 버림 chat_id=%s", chat_id)
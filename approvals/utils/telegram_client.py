@@ -0,0 +1,158 @@
+"""
+프로세스 공용 텔레그램 Bot API HTTP 클라이언트.
+
+- requests.Session 하나를 재사용(keep-alive, 커넥션 풀) → 메시지마다 DNS/TCP/TLS 핸드셰이크 X
+- connect/read 타임아웃 분리 (settings.TELEGRAM_CONNECT_TIMEOUT / TELEGRAM_READ_TIMEOUT)
+- 호출별 지연시간 메트릭 (get_metrics)
+- sendMessage는 토큰 버킷(telegram_ratelimit)을 거치고, 429면 retry_after 후 재시도 (send_message)
+
+v1/v2 알림은 TelegramOutbox에 쌓이고, outbox 워커가 approvals_v2.telegram → 이 모듈로 발송한다.
+send_message는 속도 제한 때문에 오래 기다릴 수 있으므로 웹 요청 안에서 부르지 않는다.
+"""
+import logging
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .telegram_ratelimit import get_limiter
+
+logger = logging.getLogger(__name__)
+
+API_BASE = "https://api.telegram.org"
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+_metrics_lock = threading.Lock()
+_metrics = {}  # method -> {"calls", "errors", "total_ms", "max_ms", "last_ms", "last_status"}
+
+
+def _timeouts():
+    connect = float(getattr(settings, "TELEGRAM_CONNECT_TIMEOUT", 3.05))
+    read = float(getattr(settings, "TELEGRAM_READ_TIMEOUT", 5))
+    return (connect, read)
+
+
+def get_session() -> requests.Session:
+    """
+    프로세스당 하나의 세션.
+    gunicorn preload 등으로 fork된 경우 부모의 소켓을 공유하지 않도록 pid가 바뀌면 새로 만든다.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _lock:
+        if _session is None or _session_pid != pid:
+            pool_size = int(getattr(settings, "TELEGRAM_HTTP_POOL_SIZE", 10))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = pid
+    return _session
+
+
+def _record(method: str, elapsed_ms: float, status, ok: bool) -> None:
+    with _metrics_lock:
+        m = _metrics.setdefault(
+            method,
+            {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0, "last_status": None},
+        )
+        m["calls"] += 1
+        if not ok:
+            m["errors"] += 1
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+        m["last_ms"] = elapsed_ms
+        m["last_status"] = status
+
+
+def get_metrics() -> dict:
+    """
+    method별 호출 통계 스냅샷 (avg_ms 포함)
+    """
+    with _metrics_lock:
+        snapshot = {}
+        for method, m in _metrics.items():
+            item = dict(m)
+            item["avg_ms"] = round(m["total_ms"] / m["calls"], 1) if m["calls"] else 0.0
+            snapshot[method] = item
+        return snapshot
+
+
+def call_api(method: str, *, token: str, data: dict = None, json: dict = None) -> dict:
+    """
+    Bot API 호출. 예외를 밖으로 던지지 않는다.
+    return: {"ok": bool, "status": int|None, "data": dict|None, "text": str, "error": str, "elapsed_ms": float}
+    """
+    url = f"{API_BASE}/bot{token}/{method}"
+    started = time.monotonic()
+    result = {"ok": False, "status": None, "data": None, "text": "", "error": "", "elapsed_ms": 0.0}
+
+    try:
+        r = get_session().post(url, data=data, json=json, timeout=_timeouts())
+        result["status"] = r.status_code
+        result["text"] = r.text[:300]
+        try:
+            result["data"] = r.json()
+        except ValueError:
+            result["data"] = None
+        result["ok"] = r.status_code == 200 and bool((result["data"] or {}).get("ok"))
+    except requests.RequestException as e:
+        # 예외 메시지에 URL(봇 토큰 포함)이 들어가므로 가린다
+        result["error"] = str(e).replace(token, "***")
+
+    result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    _record(method, result["elapsed_ms"], result["status"], result["ok"])
+    logger.info(
+        "telegram %s status=%s ok=%s elapsed_ms=%s",
+        method, result["status"], result["ok"], result["elapsed_ms"],
+    )
+    return result
+
+
+def _retry_after(res: dict):
+    if res["status"] != 429:
+        return None
+    params = (res["data"] or {}).get("parameters") or {}
+    try:
+        return float(params.get("retry_after") or 1)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def send_message(*, token: str, chat_id: str, data: dict = None, json: dict = None) -> dict:
+    """
+    속도 제한을 지키며 sendMessage 호출.
+    - 버킷에 토큰이 없으면 기다린다(최대 settings.TELEGRAM_RATE_WAIT_TIMEOUT초)
+    - 429면 retry_after만큼 해당 chat_id를 막고 다시 줄을 선다(최대 settings.TELEGRAM_MAX_429_RETRIES회)
+    return: call_api와 같은 dict
+    """
+    limiter = get_limiter()
+    wait_timeout = float(getattr(settings, "TELEGRAM_RATE_WAIT_TIMEOUT", 60))
+    max_retries = int(getattr(settings, "TELEGRAM_MAX_429_RETRIES", 3))
+
+    attempt = 0
+    while True:
+        if not limiter.acquire(chat_id, timeout=wait_timeout):
+            return {
+                "ok": False, "status": None, "data": None, "text": "",
+                "error": "rate limit wait timeout", "elapsed_ms": 0.0,
+            }
+
+        res = call_api("sendMessage", token=token, data=data, json=json)
+        retry_after = _retry_after(res)
+        if retry_after is None or attempt >= max_retries:
+            return res
+
+        attempt += 1
+        logger.warning("telegram 429 chat_id=%s retry_after=%s attempt=%s", chat_id, retry_after, attempt)
+        limiter.penalize(chat_id, retry_after)
@@ -0,0 +1,164 @@
+"""
+텔레그램 발송 속도 제한 (토큰 버킷).
+
+- 전역 버킷: 봇 전체 초당 메시지 수 (settings.TELEGRAM_GLOBAL_RATE)
+- chat_id별 버킷: 한 채팅방에 대한 초당 메시지 수 (settings.TELEGRAM_PER_CHAT_RATE)
+  그룹방(chat_id가 '-'로 시작)은 settings.TELEGRAM_GROUP_RATE
+- 429 응답의 retry_after 만큼 해당 chat_id 발송을 미룬다
+- acquire()는 실패 대신 기다린다(대기열). 대기 중인 수는 stats()로 확인한다
+- chat_id별 버킷은 settings.TELEGRAM_RATE_MAX_CHATS개를 넘으면 쉬고 있는(가득 찬) 버킷부터 버린다
+
+프로세스 단위 제한이므로, 실제 발송은 outbox 워커 한 프로세스에서 한다.
+(v1/v2 웹 요청은 TelegramOutbox에 쌓기만 하고, 직접 보내는 곳은 DEBUG 테스트 엔드포인트뿐)
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+class TokenBucket:
+    """
+    rate(개/초)로 채워지고 capacity까지 쌓이는 토큰 버킷.
+    락은 호출자(TelegramRateLimiter)가 잡는다.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        토큰 1개를 쓸 수 있을 때까지 남은 시간(초). 0이면 바로 가능.
+        """
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        """
+        새 버킷과 구별되지 않는 상태(가득 참, 차단 없음)면 버려도 된다.
+        """
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 0.0
+
+
+class TelegramRateLimiter:
+    def __init__(
+        self, *, global_rate: float, per_chat_rate: float, group_rate: float, burst: float = 1, max_chats: int = 1000
+    ):
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_chats = max(1, int(max_chats))
+
+        self._cond = threading.Condition()
+        self._global = TokenBucket(global_rate, max(global_rate, 1))
+        self._chats = {}  # chat_id -> TokenBucket
+        self._waiting = {}  # chat_id -> 대기 중인 발송 수
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chats:
+                self._evict_idle(time.monotonic())
+            rate = self.group_rate if chat_id.startswith("-") else self.per_chat_rate
+            bucket = TokenBucket(rate, max(self.burst, 1))
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _evict_idle(self, now: float) -> None:
+        """
+        대기자가 없고 쉬고 있는 버킷을 버린다. (모두 사용 중이면 그대로 둔다)
+        """
+        for chat_id in [c for c, b in self._chats.items() if c not in self._waiting and b.is_idle(now)]:
+            del self._chats[chat_id]
+
+    def acquire(self, chat_id: str, *, timeout: float = None) -> bool:
+        """
+        전역/채팅방 버킷 모두 토큰이 생길 때까지 기다렸다가 1개씩 소비한다.
+        timeout(초)이 지나도 못 얻으면 False.
+        """
+        chat_id = str(chat_id)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            self._waiting[chat_id] = self._waiting.get(chat_id, 0) + 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    chat = self._chat_bucket(chat_id)
+                    wait = max(self._global.wait_time(now), chat.wait_time(now))
+                    if wait <= 0:
+                        self._global.consume()
+                        chat.consume()
+                        return True
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[chat_id] -= 1
+                if not self._waiting[chat_id]:
+                    del self._waiting[chat_id]
+
+    def penalize(self, chat_id: str, retry_after: float) -> None:
+        """
+        429 retry_after 반영: 해당 chat_id 버킷을 retry_after초 동안 막는다.
+        """
+        until = time.monotonic() + max(float(retry_after), 0)
+        with self._cond:
+            self._chat_bucket(str(chat_id)).block(until)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """
+        대기열 깊이: {"waiting": 전체 대기 수, "per_chat": {chat_id: 대기 수}}
+        """
+        with self._cond:
+            per_chat = dict(self._waiting)
+        return {"waiting": sum(per_chat.values()), "per_chat": per_chat}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> TelegramRateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TelegramRateLimiter(
+                    global_rate=float(getattr(settings, "TELEGRAM_GLOBAL_RATE", 25)),
+                    per_chat_rate=float(getattr(settings, "TELEGRAM_PER_CHAT_RATE", 1)),
+                    group_rate=float(getattr(settings, "TELEGRAM_GROUP_RATE", 20 / 60)),
+                    burst=float(getattr(settings, "TELEGRAM_PER_CHAT_BURST", 1)),
+                    max_chats=int(getattr(settings, "TELEGRAM_RATE_MAX_CHATS", 1000)),
+                )
+    return _limiter
@@ -3,7 +3,7 @@ import uuid
 import os
 import html 
 from django.db import transaction
-from .utils.telegram import send_telegram
+from .utils.telegram import enqueue_telegram
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import ApprovalRequest
@@ -148,13 +148,14 @@ def approval_detail(request, pk):
             approval.save()
 
             def _notify():
-                    send_telegram(
+                    enqueue_telegram(
                         "✅ 결재 서명 적용 완료\n"
                         f"- 제목: {approval.title}\n"
                         f"- 부서: {approval.department}\n"
                         f"- 기안자: {approval.name}\n"
                         f"- 문서ID: {approval.pk}\n"
-                        f"- 결재시각: {approval.approved_at.strftime('%Y-%m-%d %H:%M:%S')}"
+                        f"- 결재시각: {approval.approved_at.strftime('%Y-%m-%d %H:%M:%S')}",
+                        approval=approval,
                     )
             transaction.on_commit(_notify)   
 
@@ -1,11 +1,18 @@
+from django.conf import settings
 from django.contrib import admin
 
+from .images import normalize_image
+
 from .models import (
     TelegramRecipient,
     ApprovalRouteInstance,
     ApprovalRouteStepInstance,
     ApprovalAttachment,
+    AttachmentBlob,
     TempUploadImage,
+    TelegramOutbox,
+    PdfRenderJob,
+    UploadSession,
 )
 
 
@@ -27,6 +34,14 @@ class TelegramRecipientAdmin(admin.ModelAdmin):
     list_editable = ("is_active",)
     readonly_fields = ("created_at", "updated_at")
 
+    def save_model(self, request, obj, form, change):
+        # 도장 이미지는 결재란 크기에 맞게 줄여서 저장 (투명 배경 PNG는 유지)
+        if "stamp_image" in form.changed_data and obj.stamp_image:
+            normalized = normalize_image(obj.stamp_image, max_edge=settings.STAMP_MAX_EDGE)
+            if normalized is not None:
+                obj.stamp_image = normalized
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(ApprovalRouteInstance)
 class ApprovalRouteInstanceAdmin(admin.ModelAdmin):
@@ -47,16 +62,51 @@ class ApprovalRouteStepInstanceAdmin(admin.ModelAdmin):
 
 @admin.register(ApprovalAttachment)
 class ApprovalAttachmentAdmin(admin.ModelAdmin):
-    list_display = ("id", "approval_id", "original_name", "file", "uploaded_at")
+    list_display = ("id", "approval_id", "original_name", "file", "thumbnail", "uploaded_at")
     search_fields = ("original_name", "approval__id")
     ordering = ("-uploaded_at",)
     readonly_fields = ("uploaded_at",)
     list_select_related = ("approval",)
 
 
+@admin.register(AttachmentBlob)
+class AttachmentBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "sha256", "size", "ref_count", "file", "created_at")
+    search_fields = ("sha256",)
+    ordering = ("-id",)
+    readonly_fields = ("sha256", "size", "ref_count", "created_at")
+
+
 @admin.register(TempUploadImage)
 class TempUploadImageAdmin(admin.ModelAdmin):
     list_display = ("id", "token", "created_at")
     search_fields = ("token",)
     ordering = ("-created_at",)
-    readonly_fields = ("created_at",)
\ No newline at end of file
+    readonly_fields = ("created_at",)
+
+
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "approval_id", "event", "kind", "role", "chat_id", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "kind", "event")
+    search_fields = ("chat_id", "approval__id")
+    ordering = ("-id",)
+    readonly_fields = ("created_at", "sent_at", "locked_at")
+
+
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "approval_id", "status", "attempts", "created_at", "started_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("approval__id",)
+    ordering = ("-id",)
+    readonly_fields = ("created_at", "started_at", "finished_at")
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "original_name", "size", "received", "status", "attachment_id", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("original_name",)
+    ordering = ("-updated_at",)
+    readonly_fields = ("created_at", "updated_at")
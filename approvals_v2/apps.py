@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApprovalsV2Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'approvals_v2'
+
+    def ready(self):
+        from . import signals  # noqa: F401
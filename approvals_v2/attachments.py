@@ -0,0 +1,120 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .images import is_image_name, make_thumbnail, normalize_image
+from .models import ApprovalAttachment, AttachmentBlob
+
+
+def file_sha256(f) -> str:
+    """
+    업로드 핸들러(approvals_v2.upload_handlers)가 받으면서 계산해 둔 값이 있으면 그대로,
+    없으면 chunks()로 흘려 읽으며 계산한다.
+    """
+    digest = getattr(f, "sha256", "")
+    if digest:
+        return digest
+
+    h = hashlib.sha256()
+    f.seek(0)
+    for chunk in f.chunks():
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def _add_reference(sha256: str):
+    """
+    같은 내용의 blob이 있으면 참조 수를 올려 돌려준다. 없으면 None
+    행을 잠그고 읽은 뒤 올리므로, 그사이 release_blob이 지웠다면 update가 0건 → None
+    """
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None or not AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1):
+            return None
+        blob.ref_count += 1
+        return blob
+
+
+def acquire_blob(f, *, sha256: str, thumbnail=None) -> AttachmentBlob:
+    """
+    같은 내용의 blob이 있으면 참조 수만 올리고, 없으면 파일을 저장해 새로 만든다.
+    """
+    blob = _add_reference(sha256)
+    if blob is not None:
+        return blob
+
+    blob = AttachmentBlob(sha256=sha256, size=getattr(f, "size", 0) or 0, ref_count=1)
+    blob.file.save(getattr(f, "name", "") or sha256, f, save=False)
+    if thumbnail is not None:
+        ext = os.path.splitext(thumbnail.name)[1]
+        blob.thumbnail.save(f"{sha256}_thumb{ext}", thumbnail, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+        return blob
+    except IntegrityError:
+        # 동시에 같은 파일이 올라와 다른 요청이 먼저 만들었음 → 그쪽 참조
+        if blob.thumbnail:
+            default_storage.delete(blob.thumbnail.name)
+        winner = _add_reference(sha256)
+        if winner is None:
+            raise
+        if winner.file.name != blob.file.name:
+            default_storage.delete(blob.file.name)
+        return winner
+
+
+def release_blob(blob_id) -> bool:
+    """
+    참조 수를 내리고, 더 이상 쓰는 첨부가 없으면 blob 행과 파일을 지운다. (커밋 후 파일 삭제)
+    return: 지웠으면 True
+    """
+    if not blob_id:
+        return False
+
+    # acquire_blob과 같은 행 잠금 안에서 내리고 확인하고 지운다
+    with transaction.atomic():
+        if AttachmentBlob.objects.select_for_update().filter(pk=blob_id).first() is None:
+            return False
+        AttachmentBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+        blob = (
+            AttachmentBlob.objects.filter(pk=blob_id, ref_count=0)
+            .exclude(attachments__isnull=False)
+            .first()
+        )
+        if blob is None:
+            return False
+
+        names = [n for n in (blob.file.name, blob.thumbnail.name if blob.thumbnail else "") if n]
+        blob.delete()
+        transaction.on_commit(lambda: [default_storage.delete(n) for n in names])
+    return True
+
+
+def create_attachment(approval, f) -> ApprovalAttachment:
+    """
+    첨부 저장. 이미지면 EXIF 회전/축소/재인코딩한 파일과 썸네일을 쓰고, 아니면 원본 그대로.
+    실제 파일은 내용(SHA-256) 기준 blob으로 한 번만 저장하고 첨부는 그 파일을 가리킨다.
+    original_name은 항상 사용자가 올린 파일명.
+    """
+    original_name = getattr(f, "name", "")[:255]
+    thumbnail = None
+
+    if is_image_name(original_name):
+        normalized = normalize_image(f)
+        if normalized is not None:
+            f = normalized
+            thumbnail = make_thumbnail(normalized)
+
+    with transaction.atomic():
+        blob = acquire_blob(f, sha256=file_sha256(f), thumbnail=thumbnail)
+        attachment = ApprovalAttachment(approval=approval, blob=blob, original_name=original_name)
+        attachment.file.name = blob.file.name
+        if blob.thumbnail:
+            attachment.thumbnail.name = blob.thumbnail.name
+        attachment.save()
+    return attachment
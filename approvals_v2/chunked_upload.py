@@ -0,0 +1,200 @@
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .attachments import create_attachment
+from .models import ApprovalAttachment, UploadSession
+from .search import index_approval_on_commit
+
+READ_SIZE = 64 * 1024
+# 조각을 쓰던 요청이 죽어 writing으로 남은 세션을 다른 요청이 다시 잡기까지의 시간
+STALE_WRITE_SECONDS = 120
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """
+    클라이언트가 보낸 offset이 서버가 받은 바이트 수와 다름 (현재 offset으로 다시 보내야 함)
+    """
+
+    def __init__(self, offset: int):
+        super().__init__(f"offset mismatch (server has {offset})")
+        self.offset = offset
+
+
+def upload_dir() -> Path:
+    return Path(getattr(settings, "CHUNKED_UPLOAD_DIR", Path(settings.BASE_DIR) / "upload_tmp"))
+
+
+def part_path(session: UploadSession) -> Path:
+    return upload_dir() / f"{session.id}.part"
+
+
+def chunk_paths(session: UploadSession) -> list:
+    """
+    요청별로 받아 두는 임시 조각 파일 (정상이면 요청이 끝날 때 지워진다)
+    """
+    return list(upload_dir().glob(f"{session.id}.*.chunk"))
+
+
+def start_session(*, name: str, size: int) -> UploadSession:
+    name = os.path.basename(name or "").strip()[:255]
+    if not name:
+        raise UploadError("파일명이 없습니다.")
+    max_size = int(getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 200 * 1024 * 1024))
+    if size <= 0 or size > max_size:
+        raise UploadError(f"파일 크기는 1B ~ {max_size}B 이어야 합니다.")
+
+    session = UploadSession.objects.create(original_name=name, size=size)
+    path = part_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return session
+
+
+def _claim_offset(session: UploadSession, offset: int) -> bool:
+    """
+    received == offset인 세션을 writing으로 잡는다 (compare-and-swap).
+    같은 offset으로 동시에 온 요청(재시도/중복 전송) 중 하나만 .part 파일을 건드린다.
+    """
+    stale_before = timezone.now() - timedelta(seconds=STALE_WRITE_SECONDS)
+    return bool(
+        UploadSession.objects.filter(
+            Q(status=UploadSession.STATUS_UPLOADING)
+            | Q(status=UploadSession.STATUS_WRITING, updated_at__lt=stale_before),
+            pk=session.pk,
+            received=offset,
+        ).update(status=UploadSession.STATUS_WRITING, updated_at=timezone.now())
+    )
+
+
+def _release(session: UploadSession, *, received: int) -> None:
+    UploadSession.objects.filter(pk=session.pk, status=UploadSession.STATUS_WRITING).update(
+        status=UploadSession.STATUS_UPLOADING,
+        received=received,
+        updated_at=timezone.now(),
+    )
+
+
+def write_chunk(session: UploadSession, *, offset: int, stream) -> int:
+    """
+    stream을 offset 위치부터 이어 쓴다. 요청 본문을 메모리에 올리지 않고 READ_SIZE씩 옮긴다.
+    1) 본문을 요청별 임시 파일로 받고 (느린 클라이언트를 기다리는 동안 세션을 잡지 않음)
+    2) offset을 선점한 요청만 .part에 붙인 뒤 received를 올린다
+    return: 새 offset (받은 바이트 수)
+    """
+    if session.status == UploadSession.STATUS_COMPLETE:
+        raise UploadError("이미 완료된 업로드입니다.")
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+
+    max_chunk = int(getattr(settings, "CHUNKED_UPLOAD_MAX_CHUNK", 8 * 1024 * 1024))
+    limit = min(session.size - offset, max_chunk)
+
+    chunk = upload_dir() / f"{session.id}.{uuid.uuid4().hex}.chunk"
+    try:
+        written = 0
+        with open(chunk, "wb") as fp:
+            while written < limit:
+                buf = stream.read(min(READ_SIZE, limit - written))
+                if not buf:
+                    break
+                fp.write(buf)
+                written += len(buf)
+
+        if not _claim_offset(session, offset):
+            session.refresh_from_db(fields=["received", "status"])
+            raise OffsetMismatch(session.received)
+
+        try:
+            with open(chunk, "rb") as src, open(part_path(session), "r+b") as dest:
+                dest.seek(offset)
+                shutil.copyfileobj(src, dest, READ_SIZE)
+                dest.truncate()
+        except Exception:
+            _release(session, received=offset)
+            raise
+    finally:
+        chunk.unlink(missing_ok=True)
+
+    _release(session, received=offset + written)
+    session.status = UploadSession.STATUS_UPLOADING
+    session.received = offset + written
+    return session.received
+
+
+def complete_session(session: UploadSession) -> ApprovalAttachment:
+    """
+    다 받은 업로드를 ApprovalAttachment(품의서 미지정)로 만든다. 여러 번 불러도 같은 첨부를 돌려준다.
+    """
+    if session.status == UploadSession.STATUS_COMPLETE and session.attachment_id:
+        return session.attachment
+    if session.received != session.size:
+        raise UploadError(f"아직 다 받지 못했습니다. ({session.received}/{session.size})")
+
+    # 완료 요청이 두 번 와도 첨부는 하나만 (write_chunk와 같은 선점)
+    if not _claim_offset(session, session.size):
+        session.refresh_from_db()
+        if session.status == UploadSession.STATUS_COMPLETE and session.attachment_id:
+            return session.attachment
+        raise UploadError("다른 요청이 처리 중입니다. 잠시 후 다시 시도해주세요.")
+
+    path = part_path(session)
+    try:
+        with open(path, "rb") as fp:
+            with transaction.atomic():
+                attachment = create_attachment(None, File(fp, name=session.original_name))
+                session.attachment = attachment
+                session.status = UploadSession.STATUS_COMPLETE
+                session.save(update_fields=["attachment", "status", "updated_at"])
+    except Exception:
+        _release(session, received=session.size)
+        raise
+
+    path.unlink(missing_ok=True)
+    return attachment
+
+
+def attach_uploads(approval, upload_ids) -> int:
+    """
+    폼에서 넘어온 업로드 id(UploadSession)의 첨부를 품의서에 연결한다.
+    아직 어느 품의서에도 붙지 않은 첨부만 대상. return: 연결한 수
+    """
+    ids = [x.strip() for x in upload_ids if x and x.strip()]
+    if not ids:
+        return 0
+
+    attachment_ids = UploadSession.objects.filter(
+        pk__in=_valid_uuids(ids),
+        status=UploadSession.STATUS_COMPLETE,
+        attachment__isnull=False,
+    ).values_list("attachment_id", flat=True)
+    attached = ApprovalAttachment.objects.filter(
+        pk__in=list(attachment_ids),
+        approval__isnull=True,
+    ).update(approval=approval)
+    if attached:
+        # queryset.update는 post_save가 없으므로 검색 색인(첨부 파일명)을 직접 갱신
+        index_approval_on_commit(approval.pk)
+    return attached
+
+
+def _valid_uuids(values) -> list:
+    out = []
+    for v in values:
+        try:
+            out.append(uuid.UUID(v))
+        except ValueError:
+            continue
+    return out
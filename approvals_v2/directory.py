@@ -0,0 +1,81 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import TelegramRecipient
+
+
+class RecipientDirectory:
+    """
+    TelegramRecipient 전체를 한 번 읽어 만든 읽기 전용 색인.
+    - 활성 수신자: role별 / (role, name)별 (id 순)
+    - 폼 선택지: role별 (name 순)
+    꺼낸 인스턴스는 캐시와 공유되므로 수정하지 않는다.
+    """
+
+    __slots__ = ("_by_role", "_by_role_name", "_options", "loaded_at")
+
+    def __init__(self, recipients):
+        by_role = {}
+        by_role_name = {}
+        for r in sorted(recipients, key=lambda x: x.id):
+            if not r.is_active:
+                continue
+            by_role.setdefault(r.role, []).append(r)
+            by_role_name.setdefault((r.role, r.name), []).append(r)
+
+        self._by_role = {k: tuple(v) for k, v in by_role.items()}
+        self._by_role_name = {k: tuple(v) for k, v in by_role_name.items()}
+        self._options = {
+            role: tuple(
+                {"role": r.role, "name": r.name, "department": r.department}
+                for r in sorted(items, key=lambda x: x.name)
+            )
+            for role, items in self._by_role.items()
+        }
+        self.loaded_at = time.monotonic()
+
+    def active(self, role: str, *, name: str = None) -> list:
+        if name is None:
+            return list(self._by_role.get(role, ()))
+        return list(self._by_role_name.get((role, name), ()))
+
+    def first_active(self, role: str, *, name: str = None):
+        items = self._by_role.get(role, ()) if name is None else self._by_role_name.get((role, name), ())
+        return items[0] if items else None
+
+    def form_options(self, role: str) -> list:
+        """
+        작성 폼 선택지 [{"role", "name", "department"}, ...] (name 순)
+        """
+        return [dict(x) for x in self._options.get(role, ())]
+
+
+_directory = None
+_lock = threading.Lock()
+
+
+def get_directory() -> RecipientDirectory:
+    """
+    프로세스별 캐시. 이 프로세스의 저장/삭제는 signals에서 바로 무효화하고,
+    다른 워커에서의 변경은 RECIPIENT_DIRECTORY_TTL초 안에 반영된다.
+    """
+    global _directory
+
+    ttl = float(getattr(settings, "RECIPIENT_DIRECTORY_TTL", 60))
+    d = _directory
+    if d is not None and time.monotonic() - d.loaded_at < ttl:
+        return d
+
+    with _lock:
+        d = _directory
+        if d is None or time.monotonic() - d.loaded_at >= ttl:
+            d = RecipientDirectory(TelegramRecipient.objects.all())
+            _directory = d
+    return d
+
+
+def invalidate_directory() -> None:
+    global _directory
+    _directory = None
@@ -0,0 +1,94 @@
+import mimetypes
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header
+
+SIGNED_MEDIA_SALT = "approvals_v2.downloads.signed_media"
+ATTACHMENT_SALT = "approvals_v2.downloads.attachment"
+
+
+def _nginx_locations() -> list:
+    """
+    [(로컬 디렉터리, nginx internal location), ...]
+    """
+    locations = getattr(settings, "APPROVAL_SENDFILE_NGINX_LOCATIONS", {}) or {}
+    return [(Path(root).resolve(), prefix.rstrip("/") + "/") for root, prefix in locations.items()]
+
+
+def sendfile_response(path, *, filename: str = "", content_type: str = "", as_attachment: bool = False):
+    """
+    파일 내용은 앞단 프록시가 보내도록 헤더만 담은 응답 (Range 처리도 프록시가 한다).
+    settings.APPROVAL_SENDFILE_BACKEND
+    - "nginx": X-Accel-Redirect (APPROVAL_SENDFILE_NGINX_LOCATIONS 아래 파일만)
+    - "xsendfile": X-Sendfile (apache mod_xsendfile / lighttpd)
+    - "" : Django FileResponse (개발용, 워커가 직접 읽음)
+    """
+    path = Path(path).resolve()
+    filename = filename or path.name
+    content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    backend = getattr(settings, "APPROVAL_SENDFILE_BACKEND", "")
+
+    response = None
+    if backend == "nginx":
+        for root, prefix in _nginx_locations():
+            if path.is_relative_to(root):
+                response = HttpResponse(content_type=content_type)
+                response["X-Accel-Redirect"] = prefix + quote(path.relative_to(root).as_posix())
+                break
+    elif backend == "xsendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = str(path)
+
+    if response is None:
+        return FileResponse(open(path, "rb"), content_type=content_type, as_attachment=as_attachment, filename=filename)
+
+    response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def storage_sendfile_response(name: str, **kwargs):
+    """
+    default_storage(FileSystemStorage)에 저장된 파일 이름으로 sendfile_response
+    """
+    return sendfile_response(default_storage.path(name), **kwargs)
+
+
+def signed_media_token(name: str, *, filename: str = "") -> str:
+    return signing.dumps({"n": name, "f": filename}, salt=SIGNED_MEDIA_SALT, compress=True)
+
+
+def signed_media_url(name: str, *, filename: str = "") -> str:
+    """
+    APPROVAL_SIGNED_URL_TTL초 동안만 유효한 media 파일 주소
+    """
+    return reverse("approvals_v2:signed_media", args=[signed_media_token(name, filename=filename)])
+
+
+def read_signed_media_token(token: str) -> dict:
+    """
+    raise signing.BadSignature (만료 시 SignatureExpired)
+    """
+    ttl = int(getattr(settings, "APPROVAL_SIGNED_URL_TTL", 300))
+    return signing.loads(token, salt=SIGNED_MEDIA_SALT, max_age=ttl)
+
+
+def attachment_url(attachment) -> str:
+    """
+    첨부 다운로드 주소. 순번 pk를 그대로 노출하지 않고 APPROVAL_SIGNED_URL_TTL초 동안만 유효한 서명으로 감싼다.
+    """
+    token = signing.dumps(attachment.pk, salt=ATTACHMENT_SALT)
+    return reverse("approvals_v2:attachment_download", args=[token])
+
+
+def read_attachment_token(token: str) -> int:
+    """
+    return: 첨부 pk. raise signing.BadSignature (만료 시 SignatureExpired)
+    """
+    ttl = int(getattr(settings, "APPROVAL_SIGNED_URL_TTL", 300))
+    return int(signing.loads(token, salt=ATTACHMENT_SALT, max_age=ttl))
@@ -0,0 +1,212 @@
+import logging
+import re
+import zipfile
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from approvals.models import ApprovalRequest
+
+from .pdf import current_cache_path, get_or_render_pdf, get_render_pool, store_final_pdf, submit_render
+from .pdf_jobs import enqueue_pdf_render, render_worker_enabled
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# 캐시/최종 PDF가 없는 문서를 어떻게 만들지
+RENDER_POOL = "pool"      # 관리 명령: 렌더 풀에서 병렬
+RENDER_INLINE = "inline"  # 웹 요청(inline 모드): 이 프로세스에서 하나씩 (풀을 띄우지 않음)
+RENDER_QUEUE = "queue"    # 웹 요청(service 모드): PdfRenderJob으로 넘기고 pending.txt에 목록
+
+# iter_approval_pdfs가 렌더하지 않고 PdfRenderJob으로 넘긴 문서의 표시
+RENDER_QUEUED = "queued"
+
+
+def web_render_mode() -> str:
+    """
+    웹 내보내기의 렌더 방식. 작업 대기열은 pdf_render_worker가 떠 있는 service 모드에서만 쓴다.
+    """
+    return RENDER_QUEUE if render_worker_enabled() else RENDER_INLINE
+
+
+class _ZipStream:
+    """
+    ZipFile이 쓰는 출력 버퍼. seek 없이 tell만 제공해 data descriptor 방식으로 쓰게 하고,
+    쓰인 바이트는 pop()으로 바로 꺼내 보낸다(아카이브 전체를 메모리에 들지 않음).
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arcname(approval) -> str:
+    title = re.sub(r'[\\/:*?"<>|\r\n\t]+', "_", approval.title or "").strip(" ._")[:60]
+    return f"{approval.id}_{title}.pdf" if title else f"{approval.id}.pdf"
+
+
+def _prepare(approval, *, base_url: str, render: str = RENDER_POOL):
+    """
+    ("final", route) / ("cached", path) / ("future", (future, path)) / (RENDER_QUEUED, None) 중 하나
+    """
+    route = getattr(approval, "route_v2", None)
+    if route and route.is_closed and route.final_pdf:
+        return ("final", route)
+
+    path, _, _ = current_cache_path(approval)
+    if path.exists():
+        return ("cached", path)
+
+    if render == RENDER_QUEUE:
+        enqueue_pdf_render(approval.id, base_url=base_url)
+        return (RENDER_QUEUED, None)
+    if render == RENDER_INLINE:
+        return ("cached", get_or_render_pdf(approval, base_url=base_url))
+
+    future = submit_render(approval, base_url=base_url)
+    if future is None:
+        return ("cached", path)
+    return ("future", (future, path))
+
+
+def _resolve(approval, kind, value):
+    """
+    return: 읽기용 파일 객체
+    """
+    if kind == "final":
+        return value.final_pdf.open("rb")
+
+    if kind == "future":
+        future, path = value
+        future.result()
+        value = path
+
+    route = getattr(approval, "route_v2", None)
+    if route and route.is_closed:
+        store_final_pdf(route, value)
+    return open(value, "rb")
+
+
+def iter_approval_pdfs(approvals, *, base_url: str, render: str = RENDER_POOL):
+    """
+    (approval, 파일 객체 또는 None, 오류 메시지) 를 입력 순서대로 돌려준다.
+    캐시/최종 PDF가 없는 문서는
+    - RENDER_POOL: 렌더 풀에서 병렬로 렌더하되, 앞서 나가는 작업 수는 제한한다.
+    - RENDER_INLINE: 차례가 오면 이 프로세스에서 렌더한다.
+    - RENDER_QUEUE: 렌더하지 않고 PdfRenderJob으로 넘긴다. 오류 메시지는 RENDER_QUEUED.
+    """
+    pooled = render == RENDER_POOL
+    ahead = max(int(getattr(settings, "APPROVAL_PDF_RENDER_WORKERS", 2)), 1) * 2 if pooled else 1
+    window = deque()
+
+    def pop_ready():
+        approval, prepared = window.popleft()
+        if isinstance(prepared, Exception):
+            return approval, None, str(prepared)
+        if prepared[0] == RENDER_QUEUED:
+            return approval, None, RENDER_QUEUED
+        try:
+            return approval, _resolve(approval, *prepared), ""
+        except Exception as e:
+            logger.exception("export pdf 렌더 실패 approval_id=%s", approval.id)
+            return approval, None, str(e)
+
+    # 풀을 먼저 띄워 둔다
+    if pooled:
+        get_render_pool()
+
+    for approval in approvals:
+        try:
+            window.append((approval, _prepare(approval, base_url=base_url, render=render)))
+        except Exception as e:
+            logger.exception("export pdf 준비 실패 approval_id=%s", approval.id)
+            window.append((approval, e))
+
+        if len(window) >= ahead:
+            yield pop_ready()
+
+    while window:
+        yield pop_ready()
+
+
+def iter_approvals_by_ids(ids, *, batch_size: int = 20):
+    """
+    본문(content)이 클 수 있어 id 목록을 작은 묶음으로 나눠 불러온다.
+    """
+    for i in range(0, len(ids), batch_size):
+        chunk = ids[i:i + batch_size]
+        by_id = ApprovalRequest.objects.select_related("route_v2").in_bulk(chunk)
+        for pk in chunk:
+            if pk in by_id:
+                yield by_id[pk]
+
+
+def export_filename(filters: dict) -> str:
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if date_from or date_to:
+        return f"approvals_{date_from or ''}_{date_to or ''}.zip"
+    return f"approvals_{timezone.localdate():%Y%m%d}.zip"
+
+
+def iter_export_zip(approvals, *, base_url: str, render: str = RENDER_POOL, omitted: int = 0):
+    """
+    PDF 묶음 ZIP을 조각(bytes) 단위로 생성한다. StreamingHttpResponse / 파일 쓰기 공용.
+    실패한 문서는 건너뛰고 마지막에 errors.txt로,
+    렌더 작업으로 넘긴 문서(RENDER_QUEUE)는 pending.txt로 남긴다.
+    omitted: 건수 제한으로 담지 못한 문서 수 (있으면 omitted.txt)
+    """
+    stream = _ZipStream()
+    errors = []
+    pending = []
+    now = timezone.localtime().timetuple()[:6]
+
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for approval, fp, error in iter_approval_pdfs(approvals, base_url=base_url, render=render):
+            if error == RENDER_QUEUED:
+                pending.append(f"#{approval.id} {approval.title}")
+                continue
+            if fp is None:
+                errors.append(f"#{approval.id} {approval.title}: {error}")
+                continue
+
+            info = zipfile.ZipInfo(_arcname(approval), date_time=now)
+            with fp, zf.open(info, mode="w") as dest:
+                for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+                    dest.write(chunk)
+                    yield stream.pop()
+            yield stream.pop()
+
+        if errors:
+            zf.writestr(zipfile.ZipInfo("errors.txt", date_time=now), "\n".join(errors))
+        if pending:
+            zf.writestr(
+                zipfile.ZipInfo("pending.txt", date_time=now),
+                "\n".join(["PDF를 만드는 중이라 빠진 문서입니다. 잠시 후 다시 내보내 주세요.", "", *pending]),
+            )
+        if omitted:
+            zf.writestr(
+                zipfile.ZipInfo("omitted.txt", date_time=now),
+                f"한 번에 내보낼 수 있는 문서 수를 넘어 {omitted}건이 빠졌습니다. "
+                "기간을 나눠 다시 내보내거나 manage.py export_pdfs를 사용해 주세요.",
+            )
+
+    yield stream.pop()
@@ -0,0 +1,67 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .search import filter_search
+
+STATUS_FILTERS = {"in_progress", "completed", "rejected"}
+
+
+def parse_date(value: str) -> Optional[date]:
+    """
+    'YYYY-MM-DD' -> date, 형식이 틀리면 None
+    """
+    try:
+        return datetime.strptime((value or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def read_list_filters(params) -> dict:
+    """
+    v2_list / 내보내기 공통 GET 파라미터
+    - status: all / in_progress / completed / rejected
+    - q: 제목/부서/기안자/본문/첨부 파일명 (approvals_v2.search)
+    - from, to: 기안일 범위(YYYY-MM-DD, 양끝 포함)
+    """
+    return {
+        "status": (params.get("status") or "all").strip(),
+        "q": (params.get("q") or "").strip(),
+        "date_from": parse_date(params.get("from")),
+        "date_to": parse_date(params.get("to")),
+    }
+
+
+def filter_approvals(qs, *, status: str = "all", q: str = "", date_from: date = None, date_to: date = None):
+    if status in STATUS_FILTERS:
+        qs = qs.filter(route_v2__status=status)
+
+    if q:
+        qs = filter_search(qs, q)
+
+    # 기안일은 현지(Asia/Seoul) 날짜 기준
+    tz = timezone.get_current_timezone()
+    if date_from:
+        qs = qs.filter(created_at__gte=datetime.combine(date_from, time.min, tzinfo=tz))
+    if date_to:
+        qs = qs.filter(created_at__lt=datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz))
+
+    return qs
+
+
+def count_by_status(qs, *, q: str = "", date_from: date = None, date_to: date = None, **_ignored) -> dict:
+    """
+    상태 탭 카운트. 상태를 뺀 나머지 필터(검색/기간)는 같게 적용한다.
+    return: {"all": n, "in_progress": n, "completed": n, "rejected": n}
+    """
+    qs = filter_approvals(qs, q=q, date_from=date_from, date_to=date_to)
+    rows = qs.order_by().values("route_v2__status").annotate(n=Count("id"))
+
+    counts = {"all": 0, **{s: 0 for s in STATUS_FILTERS}}
+    for row in rows:
+        counts["all"] += row["n"]
+        if row["route_v2__status"] in STATUS_FILTERS:
+            counts[row["route_v2__status"]] += row["n"]
+    return counts
@@ -0,0 +1,118 @@
+"""
+휴대폰 촬영 업로드 → PC 작성 화면 전달용 저장소.
+
+gunicorn 워커 여러 개가 같이 보도록 공유 캐시(settings.CACHES["handoff"])에 token 단위로 둔다.
+항목은 MOBILE_UPLOAD_HANDOFF_TTL초 뒤 캐시에서 자동으로 사라진다.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+HANDOFF_CACHE_ALIAS = "handoff"
+# token 하나에 쌓아 두는 최대 업로드 수 (오래된 것부터 버림)
+MAX_ENTRIES_PER_TOKEN = 20
+
+
+def _cache():
+    return caches[HANDOFF_CACHE_ALIAS]
+
+
+def _entry_key(token, seq: int) -> str:
+    return f"mobile_upload:{token}:{seq}"
+
+
+def _head_key(token) -> str:
+    return f"mobile_upload:{token}:head"
+
+
+def _tail_key(token) -> str:
+    return f"mobile_upload:{token}:tail"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "MOBILE_UPLOAD_HANDOFF_TTL", 1800))
+
+
+# 저장 구조 (token 하나당)
+#   mobile_upload:<token>:<seq>  업로드 1건. seq 자리는 cache.add로 잡으므로 동시에 올려도 덮어쓰지 않는다
+#   mobile_upload:<token>:tail   마지막으로 쓴 seq (힌트) - 경합으로 조금 뒤처질 수 있어 읽을 때 앞쪽도 본다
+#   mobile_upload:<token>:head   다음에 꺼낼 seq (힌트)
+# 꺼내기는 cache.delete가 True인 쪽만 가져가므로 같은 항목을 두 번 꺼내지 않는다.
+
+
+def _window_keys(token, hints: dict) -> dict:
+    """
+    힌트 주변에서 항목이 있을 수 있는 seq들: {key: seq}
+    """
+    head = int(hints.get(_head_key(token)) or 1)
+    tail = int(hints.get(_tail_key(token)) or 0)
+    lo = max(head, tail - MAX_ENTRIES_PER_TOKEN + 1, 1)
+    return {_entry_key(token, seq): seq for seq in range(lo, tail + MAX_ENTRIES_PER_TOKEN + 1)}
+
+
+def _sorted_entries(keys: dict, found: dict) -> list:
+    return sorted((keys[k], v) for k, v in found.items())
+
+
+def _entries(token) -> list:
+    """
+    return: [(seq, entry), ...] seq 오름차순 (캐시 조회 2회)
+    """
+    cache = _cache()
+    keys = _window_keys(token, cache.get_many([_head_key(token), _tail_key(token)]))
+    return _sorted_entries(keys, cache.get_many(list(keys)))
+
+
+async def _aentries(token) -> list:
+    cache = _cache()
+    keys = _window_keys(token, await cache.aget_many([_head_key(token), _tail_key(token)]))
+    return _sorted_entries(keys, await cache.aget_many(list(keys)))
+
+
+def put_upload(token, image_url: str, **extra) -> dict:
+    """
+    업로드 결과를 token 대기열 끝에 넣는다. (항목마다 TTL)
+    MAX_ENTRIES_PER_TOKEN개를 넘으면 가장 오래된 것부터 버린다.
+    """
+    cache = _cache()
+    seq = int(cache.get(_tail_key(token)) or 0) + 1
+    entry = {"image_url": image_url, "ts": timezone.now().isoformat(), **extra}
+
+    # 빈 자리를 잡을 때까지 (동시에 올린 다른 업로드가 먼저 잡았으면 다음 자리)
+    for _ in range(MAX_ENTRIES_PER_TOKEN):
+        if cache.add(_entry_key(token, seq), {**entry, "seq": seq}, timeout=_ttl()):
+            break
+        seq += 1
+    else:
+        raise RuntimeError(f"handoff cache: no free slot for token {token}")
+    entry["seq"] = seq
+
+    cache.set(_tail_key(token), seq, timeout=_ttl())
+    if seq > MAX_ENTRIES_PER_TOKEN:
+        cache.delete(_entry_key(token, seq - MAX_ENTRIES_PER_TOKEN))
+    return entry
+
+
+def latest_upload(token):
+    """
+    가장 최근 업로드 (꺼내지 않음). 없으면 None
+    """
+    entries = _entries(token)
+    return entries[-1][1] if entries else None
+
+
+async def alatest_upload(token):
+    entries = await _aentries(token)
+    return entries[-1][1] if entries else None
+
+
+def pop_upload(token):
+    """
+    가장 오래된 업로드를 꺼낸다. 없으면 None
+    """
+    cache = _cache()
+    for seq, entry in _entries(token):
+        if cache.delete(_entry_key(token, seq)):
+            cache.set(_head_key(token), seq + 1, timeout=_ttl())
+            return entry
+    return None
@@ -0,0 +1,100 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".heic", ".heif", ".tif", ".tiff"}
+
+
+def is_image_name(name: str) -> bool:
+    return os.path.splitext(name or "")[1].lower() in IMAGE_EXTS
+
+
+def _open(f, edge: int):
+    """
+    업로드 파일을 Pillow 이미지로 연다. 이미지가 아니면 None (파일 위치는 처음으로 되돌림)
+    JPEG는 edge 근처 크기로 축소 디코딩해 메모리/시간을 줄인다.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        f.seek(0)
+        img = Image.open(f)
+        img.draft("RGB", (edge, edge))
+        img.load()
+        return img
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+    finally:
+        f.seek(0)
+
+
+def _encode(img, *, max_edge: int, base_name: str, suffix: str = "") -> ContentFile:
+    """
+    EXIF 회전 적용 → 긴 변 max_edge 이하로 축소 → JPEG(투명도 있으면 PNG)로 다시 인코딩
+    """
+    from PIL import ImageOps
+
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_edge, max_edge))
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    buf = io.BytesIO()
+    if has_alpha:
+        img.save(buf, format="PNG", optimize=True)
+        ext = ".png"
+    else:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        quality = int(getattr(settings, "IMAGE_JPEG_QUALITY", 85))
+        img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+        ext = ".jpg"
+
+    stem = os.path.splitext(os.path.basename(base_name or "image"))[0] or "image"
+    return ContentFile(buf.getvalue(), name=f"{stem}{suffix}{ext}")
+
+
+def normalize_image(f, *, max_edge: int = None):
+    """
+    업로드 이미지를 정규화한 ContentFile. 이미지가 아니면 None
+    (max_edge 기본값: settings.IMAGE_MAX_EDGE)
+    """
+    max_edge = max_edge or int(getattr(settings, "IMAGE_MAX_EDGE", 2000))
+    img = _open(f, max_edge)
+    if img is None:
+        return None
+
+    try:
+        return _encode(img, max_edge=max_edge, base_name=getattr(f, "name", ""))
+    except Exception:
+        logger.exception("이미지 정규화 실패: %s", getattr(f, "name", ""))
+        return None
+
+
+def make_thumbnail(f):
+    """
+    settings.IMAGE_THUMB_EDGE 크기의 썸네일 ContentFile. 이미지가 아니면 None
+    """
+    edge = int(getattr(settings, "IMAGE_THUMB_EDGE", 480))
+    img = _open(f, edge)
+    if img is None:
+        return None
+
+    try:
+        return _encode(img, max_edge=edge, base_name=getattr(f, "name", ""), suffix="_thumb")
+    except Exception:
+        logger.exception("썸네일 생성 실패: %s", getattr(f, "name", ""))
+        return None
+
+
+def normalize_upload(f, *, max_edge: int = None):
+    """
+    이미지면 정규화본, 아니면 원본 그대로
+    """
+    if not is_image_name(getattr(f, "name", "")):
+        return f
+    return normalize_image(f, max_edge=max_edge) or f
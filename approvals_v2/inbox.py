@@ -0,0 +1,71 @@
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import ApprovalRouteInstance, ApprovalRouteStepInstance, TelegramRecipient
+
+# 결재함을 가지는 역할 (담당은 기안자라 결재 대기가 없다)
+INBOX_ROLES = (
+    TelegramRecipient.ROLE_ADMIN,
+    TelegramRecipient.ROLE_AUDITOR,
+    TelegramRecipient.ROLE_CHAIRMAN,
+)
+
+
+def _waiting_steps():
+    """
+    지금 결재 차례인 단계: (role, state) 인덱스로 pending만 고른 뒤
+    route의 현재 단계(order == route.current_order)인 것만 남긴다.
+    대기 시작 시각은 route.updated_at (단계 전이 때마다 갱신)
+    """
+    return ApprovalRouteStepInstance.objects.filter(
+        state=ApprovalRouteStepInstance.STATE_PENDING,
+        order=F("route__current_order"),
+        route__status=ApprovalRouteInstance.STATUS_IN_PROGRESS,
+    )
+
+
+def inbox_summary() -> dict:
+    """
+    역할별 대기 건수/가장 오래 기다린 시각 (쿼리 1회)
+    return: {role: {"count": n, "oldest": datetime|None}}
+    """
+    summary = {role: {"count": 0, "oldest": None} for role in INBOX_ROLES}
+    rows = (
+        _waiting_steps()
+        .filter(role__in=INBOX_ROLES)
+        .values("role")
+        .annotate(count=Count("id"), oldest=Min("route__updated_at"))
+        .order_by()
+    )
+    for row in rows:
+        summary[row["role"]] = {"count": row["count"], "oldest": row["oldest"]}
+    return summary
+
+
+def pending_for_role(role: str, *, now=None) -> list:
+    """
+    role의 결재 대기 문서 (오래 기다린 순, 쿼리 1회)
+    return: [{"approval", "route", "step", "waiting_since", "waiting_seconds"}, ...]
+    """
+    now = now or timezone.now()
+    steps = (
+        _waiting_steps()
+        .filter(role=role)
+        .select_related("route__approval")
+        .order_by("route__updated_at", "route_id")
+    )
+
+    items = []
+    for step in steps:
+        route = step.route
+        since = route.updated_at
+        items.append(
+            {
+                "approval": route.approval,
+                "route": route,
+                "step": step,
+                "waiting_since": since,
+                "waiting_seconds": int((now - since).total_seconds()) if since else 0,
+            }
+        )
+    return items
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from approvals.models import ApprovalRequest
+from approvals_v2.export import iter_approvals_by_ids, iter_export_zip
+from approvals_v2.filters import filter_approvals, read_list_filters
+
+
+class Command(BaseCommand):
+    help = "v2 문서 PDF를 ZIP으로 내보낸다. (예: 월말 완료 문서 묶음)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", required=True, help="저장할 zip 경로")
+        parser.add_argument("--status", default="all", help="all / in_progress / completed / rejected")
+        parser.add_argument("--q", default="", help="검색어 (제목/부서/기안자)")
+        parser.add_argument("--from", dest="date_from", default="", help="기안일 시작 YYYY-MM-DD")
+        parser.add_argument("--to", dest="date_to", default="", help="기안일 끝 YYYY-MM-DD (포함)")
+        parser.add_argument("--base-url", default="", help="이미지/정적파일 기준 URL")
+
+    def handle(self, *args, **options):
+        filters = read_list_filters({
+            "status": options["status"],
+            "q": options["q"],
+            "from": options["date_from"],
+            "to": options["date_to"],
+        })
+        if options["date_from"] and not filters["date_from"]:
+            raise CommandError("--from 형식은 YYYY-MM-DD")
+        if options["date_to"] and not filters["date_to"]:
+            raise CommandError("--to 형식은 YYYY-MM-DD")
+
+        ids = list(
+            filter_approvals(ApprovalRequest.objects.order_by("id"), **filters)
+            .values_list("id", flat=True)
+        )
+        base_url = options["base_url"] or getattr(settings, "APPROVAL_PDF_BASE_URL", "")
+
+        size = 0
+        with open(options["output"], "wb") as out:
+            for chunk in iter_export_zip(iter_approvals_by_ids(ids), base_url=base_url):
+                out.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(f"{len(ids)}건 → {options['output']} ({size // 1024} KB)")
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from approvals_v2.pdf import get_render_pool
+from approvals_v2.pdf_jobs import process_render_jobs
+
+
+class Command(BaseCommand):
+    help = "PdfRenderJob 대기열을 렌더 프로세스 풀로 처리한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="대기열을 한 번만 처리하고 종료")
+        parser.add_argument("--interval", type=float, default=1.0, help="대기열이 비었을 때 폴링 간격(초)")
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        interval = options["interval"]
+        workers = int(getattr(settings, "APPROVAL_PDF_RENDER_WORKERS", 2))
+
+        # 풀을 먼저 띄워 둔다
+        get_render_pool()
+        self.stdout.write(f"pdf render worker 시작 (processes={workers})")
+
+        while True:
+            result = process_render_jobs(batch_size=workers * 2)
+            if result["claimed"]:
+                self.stdout.write(
+                    f"claimed={result['claimed']} done={result['done']} failed={result['failed']}"
+                )
+
+            if once:
+                break
+
+            if not result["claimed"]:
+                time.sleep(interval)
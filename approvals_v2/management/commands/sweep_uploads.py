@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from approvals_v2.upload_sweeper import sweep_uploads
+
+
+def _human(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+class Command(BaseCommand):
+    help = "만료/사용된 임시 업로드(TempUploadImage, mobile_upload/)와 파일을 정리한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=200, help="한 번에 지울 행/파일 수")
+        parser.add_argument("--max-batches", type=int, default=50, help="이번 실행에서 처리할 최대 배치 수")
+        parser.add_argument("--dry-run", action="store_true", help="지우지 않고 대상만 집계")
+
+    def handle(self, *args, **options):
+        result = sweep_uploads(
+            batch_size=options["batch"],
+            max_batches=options["max_batches"],
+            dry_run=options["dry_run"],
+        )
+        temp, mobile, chunked = result["temp"], result["mobile"], result["chunked"]
+        prefix = "[dry-run] " if options["dry_run"] else ""
+
+        self.stdout.write(
+            f"{prefix}temp_uploads rows={temp['rows']} files={temp['files']} "
+            f"reclaimed={_human(temp['bytes'])} kept(referenced)={temp['kept']}"
+        )
+        self.stdout.write(
+            f"{prefix}mobile_upload files={mobile['files']} "
+            f"reclaimed={_human(mobile['bytes'])} kept(referenced)={mobile['kept']}"
+        )
+        self.stdout.write(
+            f"{prefix}chunked_uploads rows={chunked['rows']} files={chunked['files']} "
+            f"reclaimed={_human(chunked['bytes'])}"
+        )
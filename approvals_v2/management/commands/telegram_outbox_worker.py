@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from approvals.utils.telegram_client import get_metrics
+from approvals.utils.telegram_ratelimit import get_limiter
+from approvals_v2.outbox import outbox_depth, process_outbox
+
+
+class Command(BaseCommand):
+    help = "TelegramOutbox 대기열을 발송한다. (재시도/백오프 포함)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="대기열을 한 번만 처리하고 종료")
+        parser.add_argument("--interval", type=float, default=1.0, help="대기열이 비었을 때 폴링 간격(초)")
+        parser.add_argument("--batch", type=int, default=50, help="한 번에 선점할 메시지 수")
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        interval = options["interval"]
+        batch = options["batch"]
+
+        self.stdout.write(f"telegram outbox worker 시작 (pending={outbox_depth()})")
+
+        while True:
+            result = process_outbox(batch_size=batch)
+            if result["claimed"]:
+                http = get_metrics().get("sendMessage", {})
+                self.stdout.write(
+                    f"claimed={result['claimed']} sent={result['sent']} failed={result['failed']} "
+                    f"tg_avg_ms={http.get('avg_ms', 0)} tg_max_ms={http.get('max_ms', 0)} "
+                    f"pending={outbox_depth()} rate_waiting={get_limiter().stats()['waiting']}"
+                )
+
+            if once:
+                break
+
+            # 가득 찼던 배치면 바로 다음 배치, 아니면 잠깐 쉼
+            if result["claimed"] < batch:
+                time.sleep(interval)
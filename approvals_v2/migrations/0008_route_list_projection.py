@@ -0,0 +1,57 @@
+# Generated by Django 4.2.27 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+ROLE_LABEL = {
+    "drafter": "담당",
+    "admin": "총무",
+    "chairman": "회장",
+    "auditor": "감사",
+}
+
+
+def backfill_list_projection(apps, schema_editor):
+    ApprovalRouteInstance = apps.get_model("approvals_v2", "ApprovalRouteInstance")
+    ApprovalRouteStepInstance = apps.get_model("approvals_v2", "ApprovalRouteStepInstance")
+
+    role_by_key = {
+        (route_id, order): role
+        for route_id, order, role in ApprovalRouteStepInstance.objects.values_list("route_id", "order", "role")
+    }
+
+    for route in ApprovalRouteInstance.objects.all().iterator():
+        role = role_by_key.get((route.id, route.current_order), "")
+        if not role:
+            label = ""
+        elif route.status == "completed":
+            label = "완료"
+        elif route.status == "rejected":
+            label = "반려"
+        else:
+            label = f"{ROLE_LABEL.get(role, role)} 결재 대기"
+
+        route.current_role = role
+        route.current_step_label = label
+        route.save(update_fields=["current_role", "current_step_label"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0007_tempuploadimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalrouteinstance',
+            name='current_role',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='approvalrouteinstance',
+            name='current_step_label',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(backfill_list_projection, migrations.RunPython.noop),
+    ]
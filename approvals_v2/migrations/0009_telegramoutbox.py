@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-17 16:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_alter_approvalrequest_id'),
+        ('approvals_v2', '0008_route_list_projection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(blank=True, default='', max_length=20)),
+                ('kind', models.CharField(choices=[('dm', 'DM'), ('group', '단톡방')], max_length=10)),
+                ('role', models.CharField(blank=True, default='', max_length=20)),
+                ('chat_id', models.CharField(blank=True, default='', max_length=50)),
+                ('text', models.TextField()),
+                ('status', models.CharField(choices=[('pending', '대기'), ('sending', '발송중'), ('sent', '발송완료'), ('failed', '실패')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('approval', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='v2_outbox', to='approvals.approvalrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='approvals_v_status_6010b0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-17 16:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_alter_approvalrequest_id'),
+        ('approvals_v2', '0009_telegramoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfRenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_url', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(choices=[('pending', '대기'), ('running', '렌더중'), ('done', '완료'), ('failed', '실패')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('approval', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='v2_pdf_jobs', to='approvals.approvalrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='approvals_v_status_1946a1_idx')],
+            },
+        ),
+    ]
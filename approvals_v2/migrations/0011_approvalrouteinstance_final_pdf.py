@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0010_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalrouteinstance',
+            name='final_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='approval_v2/pdf/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,12 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # 휴대폰 업로드 전달용 DatabaseCache 테이블은 CACHES["handoff"]["LOCATION"]을 따르므로
+    # 마이그레이션이 아니라 배포 단계의 manage.py createcachetable로 만든다. (settings.CACHES 참고)
+
+    dependencies = [
+        ('approvals_v2', '0011_approvalrouteinstance_final_pdf'),
+    ]
+
+    operations = []
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0012_handoff_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tempuploadimage',
+            index=models.Index(fields=['is_used', 'created_at'], name='approvals_v_is_used_1b634c_idx'),
+        ),
+    ]
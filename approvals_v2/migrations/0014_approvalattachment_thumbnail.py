@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0013_tempuploadimage_sweep_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalattachment',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='approval_v2/attachments/thumbs/%Y/%m/'),
+        ),
+    ]
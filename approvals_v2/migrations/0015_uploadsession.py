@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_alter_approvalrequest_id'),
+        ('approvals_v2', '0014_approvalattachment_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='approvalattachment',
+            name='approval',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='v2_attachments', to='approvals.approvalrequest'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('original_name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('uploading', '업로드 중'), ('complete', '완료')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attachment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='approvals_v2.approvalattachment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='approvals_v_status_1db4fc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0016_attachmentblob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvalrouteinstance',
+            index=models.Index(fields=['status', 'approval'], name='approvals_v_status_76d954_idx'),
+        ),
+    ]
@@ -0,0 +1,159 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:31
+
+import html
+
+from django.db import OperationalError, migrations, models
+from django.utils.html import strip_tags
+import django.db.models.deletion
+
+# 이 마이그레이션 시점의 색인 정의 (approvals_v2.search가 바뀌어도 그대로 둔다)
+DOC_TABLE = "approvals_v2_approvalsearchdocument"
+FTS_TABLE = "approvals_v2_search_fts"
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, department, name, body, attachments,
+        content='{DOC_TABLE}', content_rowid='approval_id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, department, name, body, attachments)
+        VALUES (new.approval_id, new.title, new.department, new.name, new.body, new.attachments);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, department, name, body, attachments)
+        VALUES ('delete', old.approval_id, old.title, old.department, old.name, old.body, old.attachments);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, department, name, body, attachments)
+        VALUES ('delete', old.approval_id, old.title, old.department, old.name, old.body, old.attachments);
+        INSERT INTO {FTS_TABLE}(rowid, title, department, name, body, attachments)
+        VALUES (new.approval_id, new.title, new.department, new.name, new.body, new.attachments);
+    END
+    """,
+]
+SQLITE_FTS_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_INDEX_SQL = [
+    f"CREATE INDEX IF NOT EXISTS {DOC_TABLE}_ngrams_gin ON {DOC_TABLE} USING gin (to_tsvector('simple', ngrams))",
+]
+POSTGRES_INDEX_DROP_SQL = [f"DROP INDEX IF EXISTS {DOC_TABLE}_ngrams_gin"]
+
+
+def _html_to_text(value):
+    return " ".join(html.unescape(strip_tags(value or "")).split())
+
+
+def _ngrams(text, n=2):
+    out = []
+    for word in (text or "").lower().split():
+        if len(word) <= n:
+            out.append(word)
+        else:
+            out.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return " ".join(out)
+
+
+def _document_fields(*, vendor, title, department, name, content, attachment_names):
+    fields = {
+        "title": title or "",
+        "department": department or "",
+        "name": name or "",
+        "body": _html_to_text(content),
+        "attachments": "\n".join(n for n in attachment_names if n),
+    }
+    fields["ngrams"] = _ngrams(" ".join(fields.values())) if vendor == "postgresql" else ""
+    return fields
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite: FTS5 trigram 테이블 + 동기화 트리거 (SQLite 3.34 미만이면 건너뜀 → LIKE 검색)
+    # Postgres: ngrams tsvector GIN 인덱스
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            for sql in SQLITE_FTS_SQL:
+                schema_editor.execute(sql)
+        except OperationalError:
+            for sql in SQLITE_FTS_DROP_SQL:
+                schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_INDEX_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_INDEX_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+def backfill_search_documents(apps, schema_editor):
+    ApprovalRequest = apps.get_model("approvals", "ApprovalRequest")
+    ApprovalAttachment = apps.get_model("approvals_v2", "ApprovalAttachment")
+    ApprovalSearchDocument = apps.get_model("approvals_v2", "ApprovalSearchDocument")
+
+    names = {}
+    for approval_id, name in ApprovalAttachment.objects.filter(approval__isnull=False).order_by("id").values_list(
+        "approval_id", "original_name"
+    ):
+        names.setdefault(approval_id, []).append(name)
+
+    batch = []
+    for a in ApprovalRequest.objects.order_by("id").iterator(chunk_size=500):
+        batch.append(ApprovalSearchDocument(
+            approval_id=a.id,
+            **_document_fields(
+                vendor=schema_editor.connection.vendor,
+                title=a.title,
+                department=a.department,
+                name=a.name,
+                content=a.content,
+                attachment_names=names.get(a.id, []),
+            ),
+        ))
+        if len(batch) >= 500:
+            ApprovalSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ApprovalSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_alter_approvalrequest_id'),
+        ('approvals_v2', '0017_route_status_approval_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalSearchDocument',
+            fields=[
+                ('approval', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_doc', serialize=False, to='approvals.approvalrequest')),
+                ('title', models.CharField(blank=True, default='', max_length=200)),
+                ('department', models.CharField(blank=True, default='', max_length=100)),
+                ('name', models.CharField(blank=True, default='', max_length=50)),
+                ('body', models.TextField(blank=True, default='')),
+                ('attachments', models.TextField(blank=True, default='')),
+                ('ngrams', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
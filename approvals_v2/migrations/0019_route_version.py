@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0018_approvalsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalrouteinstance',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
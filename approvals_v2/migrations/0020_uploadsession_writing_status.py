@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0019_route_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('uploading', '업로드 중'), ('writing', '조각 쓰는 중'), ('complete', '완료')], default='uploading', max_length=20),
+        ),
+    ]
@@ -0,0 +1,95 @@
+import re
+
+from django.db import OperationalError, migrations
+
+# 이 마이그레이션 시점의 2-gram 색인 정의 (approvals_v2.search가 바뀌어도 그대로 둔다)
+DOC_TABLE = "approvals_v2_approvalsearchdocument"
+BIGRAM_TABLE = "approvals_v2_search_bigram"
+
+SQLITE_BIGRAM_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5(
+        ngrams,
+        content='{DOC_TABLE}', content_rowid='approval_id', tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}(rowid, ngrams) VALUES (new.approval_id, new.ngrams);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}, rowid, ngrams) VALUES ('delete', old.approval_id, old.ngrams);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}, rowid, ngrams) VALUES ('delete', old.approval_id, old.ngrams);
+        INSERT INTO {BIGRAM_TABLE}(rowid, ngrams) VALUES (new.approval_id, new.ngrams);
+    END
+    """,
+]
+SQLITE_BIGRAM_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_au",
+    f"DROP TABLE IF EXISTS {BIGRAM_TABLE}",
+]
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _ngrams(text, n=2):
+    out = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) <= n:
+            out.append(word)
+        else:
+            out.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return " ".join(out)
+
+
+def fill_ngrams(apps, schema_editor):
+    # 0018은 Postgres에서만 ngrams를 채웠고 단어를 공백으로만 나눴다 → 전부 다시 계산
+    ApprovalSearchDocument = apps.get_model("approvals_v2", "ApprovalSearchDocument")
+    batch = []
+    for doc in ApprovalSearchDocument.objects.order_by("approval_id").iterator(chunk_size=500):
+        doc.ngrams = _ngrams(" ".join([doc.title, doc.department, doc.name, doc.body, doc.attachments]))
+        batch.append(doc)
+        if len(batch) >= 500:
+            ApprovalSearchDocument.objects.bulk_update(batch, ["ngrams"])
+            batch = []
+    if batch:
+        ApprovalSearchDocument.objects.bulk_update(batch, ["ngrams"])
+
+
+def create_bigram_index(apps, schema_editor):
+    # SQLite: 2-gram FTS5 테이블 + 동기화 트리거, 기존 행은 rebuild로 색인 (FTS5 없으면 건너뜀 → LIKE 검색)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        for sql in SQLITE_BIGRAM_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}) VALUES ('rebuild')")
+    except OperationalError:
+        for sql in SQLITE_BIGRAM_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_bigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_BIGRAM_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_v2', '0020_uploadsession_writing_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_ngrams, migrations.RunPython.noop),
+        migrations.RunPython(create_bigram_index, drop_bigram_index),
+    ]
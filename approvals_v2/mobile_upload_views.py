@@ -1,6 +1,8 @@
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from .handoff import pop_upload, put_upload
+from .images import normalize_upload
 from .models import TempUploadImage
 import uuid
 
@@ -10,19 +12,19 @@ def mobile_upload_page(request, token):
 @csrf_exempt
 def mobile_upload_api(request, token):
     if request.method == "POST" and request.FILES.get("image"):
-        TempUploadImage.objects.create(
+        img = TempUploadImage.objects.create(
             token=token,
-            image=request.FILES["image"]
+            image=normalize_upload(request.FILES["image"])
         )
+        put_upload(token, img.image.url, upload_id=img.id)
         return JsonResponse({"ok": True})
     return JsonResponse({"ok": False})
 
 def mobile_upload_poll(request, token):
-    img = TempUploadImage.objects.filter(token=token, is_used=False).first()
-    if img:
-        img.is_used = True
-        img.save()
+    data = pop_upload(token)
+    if data:
+        TempUploadImage.objects.filter(pk=data["upload_id"]).update(is_used=True)
         return JsonResponse({
-            "image_url": img.image.url
+            "image_url": data["image_url"]
         })
     return JsonResponse({"image_url": None})
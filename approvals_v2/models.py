@@ -1,3 +1,5 @@
+import os
+
 from django.db import models
 from django.conf import settings
 from approvals.models import ApprovalRequest
@@ -6,16 +8,6 @@ from django.db import models
 from django.utils import timezone
 
 
-class TempUploadImage(models.Model):
-    token = models.UUIDField(default=uuid.uuid4, db_index=True)
-    image = models.ImageField(upload_to="temp_uploads/%Y/%m/")
-    created_at = models.DateTimeField(default=timezone.now)
-    is_used = models.BooleanField(default=False)
-
-    class Meta:
-        ordering = ["-created_at"]
-
-
 class TelegramRecipient(models.Model):
     ROLE_DRAFTER = "drafter"
     ROLE_ADMIN = "admin"
@@ -81,14 +73,42 @@ class ApprovalRouteInstance(models.Model):
     template_code = models.CharField(max_length=30)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_DRAFT)
     current_order = models.PositiveIntegerField(default=1)  # 현재 결재 단계(order)
+    # 상태 전이마다 +1. 전이는 "UPDATE ... WHERE version = 읽은 값"으로만 한다 (approvals_v2.routes)
+    version = models.PositiveIntegerField(default=0)
+
+    # 리스트 표시용 비정규화 필드 (routes의 상태 전이 함수에서 갱신)
+    current_role = models.CharField(max_length=20, blank=True, default="")
+    current_step_label = models.CharField(max_length=50, blank=True, default="")
 
     submitted_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     rejected_at = models.DateTimeField(null=True, blank=True)
 
+    # 완료/반려 시점에 미리 렌더해 둔 최종 PDF
+    final_pdf = models.FileField(upload_to="approval_v2/pdf/%Y/%m/", blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # 리스트 상태 필터 + approval id keyset 페이지
+            models.Index(fields=["status", "approval"]),
+        ]
+
+    @property
+    def is_closed(self) -> bool:
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_REJECTED)
+
+    @property
+    def route_template(self):
+        """
+        settings.APPROVAL_ROUTE_TEMPLATES 정의 (설정에서 빠진 예전 코드면 None)
+        """
+        from .route_templates import find_route_template
+
+        return find_route_template(self.template_code)
+
     def __str__(self) -> str:
         return f"Route({self.template_code}) for approval_id={self.approval_id}"
 
@@ -133,19 +153,77 @@ class ApprovalRouteStepInstance(models.Model):
     def __str__(self) -> str:
         return f"Step(order={self.order}, role={self.role}, state={self.state})"
 
+def blob_upload_to(instance, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return f"approval_v2/blobs/{instance.sha256[:2]}/{instance.sha256}{ext}"
+
+
+class AttachmentBlob(models.Model):
+    """
+    내용(SHA-256) 기준으로 한 번만 저장하는 첨부 파일 (approvals_v2.attachments).
+    ref_count = 이 blob을 쓰는 ApprovalAttachment 수, 0이 되면 파일과 함께 지운다.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_upload_to, max_length=255)
+    thumbnail = models.ImageField(upload_to="approval_v2/blobs/thumbs/", blank=True, null=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} ({self.size}B, refs={self.ref_count})"
+
+
 class ApprovalAttachment(models.Model):
+    # 분할 업로드로 먼저 만들어진 첨부는 품의서 저장 전까지 approval이 비어 있다
     approval = models.ForeignKey(
         ApprovalRequest,
         on_delete=models.CASCADE,
         related_name="v2_attachments",
+        null=True,
+        blank=True,
     )
     file = models.FileField(upload_to="approval_v2/attachments/%Y/%m/")
+    # 내용 중복 제거 저장소. 있으면 file/thumbnail은 blob의 파일을 가리킨다 (없으면 예전 방식의 개별 파일)
+    blob = models.ForeignKey(
+        AttachmentBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="attachments",
+    )
+    # 이미지 첨부만: 상세/PDF에서 쓰는 작은 미리보기 (approvals_v2.attachments.create_attachment)
+    thumbnail = models.ImageField(upload_to="approval_v2/attachments/thumbs/%Y/%m/", blank=True, null=True)
     original_name = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.original_name or self.file.name
 
+class ApprovalSearchDocument(models.Model):
+    """
+    v2_list 검색 색인 원본 (approvals_v2.search가 품의서/첨부 저장 시 갱신)
+    - SQLite: FTS5(trigram) 테이블과 ngrams용 FTS5(2글자 검색어) 테이블이 트리거로 이 테이블을 따라간다
+    - Postgres: ngrams 컬럼의 tsvector GIN 인덱스
+    """
+    approval = models.OneToOneField(
+        ApprovalRequest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_doc",
+    )
+    title = models.CharField(max_length=200, blank=True, default="")
+    department = models.CharField(max_length=100, blank=True, default="")
+    name = models.CharField(max_length=50, blank=True, default="")
+    body = models.TextField(blank=True, default="")          # 본문(HTML 제거)
+    attachments = models.TextField(blank=True, default="")   # 첨부 원본 파일명 (줄바꿈 구분)
+    ngrams = models.TextField(blank=True, default="")        # 단어별 2-gram (2글자 검색/Postgres 색인)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"SearchDocument(approval_id={self.approval_id})"
+
+
 class TempUploadImage(models.Model):
     token = models.UUIDField(default=uuid.uuid4, db_index=True)
     image = models.ImageField(upload_to="temp_uploads/%Y/%m/")
@@ -154,3 +232,144 @@ class TempUploadImage(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # manage.py sweep_uploads
+            models.Index(fields=["is_used", "created_at"]),
+        ]
+
+
+class UploadSession(models.Model):
+    """
+    이어받기 가능한 분할 업로드 (approvals_v2.chunked_upload).
+    조각은 CHUNKED_UPLOAD_DIR/<id>.part에 offset 순서대로 붙이고, 완료 시 ApprovalAttachment로 만든다.
+    writing: 한 요청이 .part 파일에 조각을 쓰는 중 (그동안 다른 조각/완료 요청은 거절)
+    """
+    STATUS_UPLOADING = "uploading"
+    STATUS_WRITING = "writing"
+    STATUS_COMPLETE = "complete"
+
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, "업로드 중"),
+        (STATUS_WRITING, "조각 쓰는 중"),
+        (STATUS_COMPLETE, "완료"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    original_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    attachment = models.ForeignKey(
+        ApprovalAttachment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # manage.py sweep_uploads
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"UploadSession({self.original_name}, {self.received}/{self.size}, {self.status})"
+
+
+class TelegramOutbox(models.Model):
+    """
+    텔레그램 발송 대기열.
+    결재 상태 변경과 같은 트랜잭션에서 쌓고, manage.py telegram_outbox_worker가 발송한다.
+    """
+    KIND_DM = "dm"
+    KIND_GROUP = "group"
+
+    KIND_CHOICES = [
+        (KIND_DM, "DM"),
+        (KIND_GROUP, "단톡방"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "대기"),
+        (STATUS_SENDING, "발송중"),
+        (STATUS_SENT, "발송완료"),
+        (STATUS_FAILED, "실패"),
+    ]
+
+    approval = models.ForeignKey(
+        ApprovalRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="v2_outbox",
+    )
+    event = models.CharField(max_length=20, blank=True, default="")  # submit/approve/reject
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    role = models.CharField(max_length=20, blank=True, default="")
+    chat_id = models.CharField(max_length=50, blank=True, default="")  # group은 발송 시점 env 사용
+    text = models.TextField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Outbox({self.kind}, {self.status}) to={self.chat_id or '-'}"
+
+
+class PdfRenderJob(models.Model):
+    """
+    PDF 렌더 작업 대기열. manage.py pdf_render_worker가 렌더 프로세스 풀로 처리한다.
+    APPROVAL_PDF_RENDER_MODE="service"에서만 쌓인다 (pdf_jobs.render_worker_enabled)
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "대기"),
+        (STATUS_RUNNING, "렌더중"),
+        (STATUS_DONE, "완료"),
+        (STATUS_FAILED, "실패"),
+    ]
+
+    approval = models.ForeignKey(
+        ApprovalRequest,
+        on_delete=models.CASCADE,
+        related_name="v2_pdf_jobs",
+    )
+    base_url = models.CharField(max_length=255, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"PdfRenderJob(approval_id={self.approval_id}, {self.status})"
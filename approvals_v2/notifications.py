@@ -1,5 +1,14 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List
-from .models import TelegramRecipient
+
+from django.conf import settings
+
+from .directory import get_directory
+from .models import TelegramOutbox, TelegramRecipient
+from .route_templates import NOTIFY_ADMIN_FINAL, NOTIFY_ADMIN_START, NOTIFY_NORMAL, find_route_template
+
+logger = logging.getLogger(__name__)
 
 
 def get_active_recipients(role: str, *, name: str = "", department: str = "") -> List[TelegramRecipient]:
@@ -8,16 +17,43 @@ def get_active_recipients(role: str, *, name: str = "", department: str = "") ->
     - 담당(drafter)은 department+name 우선, 없으면 name만 매칭
     - 총무/회장은 role + is_active 기준
     """
-    qs = TelegramRecipient.objects.filter(role=role, is_active=True)
+    directory = get_directory()
 
     if role == TelegramRecipient.ROLE_DRAFTER:
         # 운영 확정: drafter는 name만으로 매칭
         if name:
-            return list(qs.filter(name=name))
+            return directory.active(role, name=name)
         return []
 
 
-    return list(qs)
+    return directory.active(role)
+
+# 결재선 템플릿(settings.APPROVAL_ROUTE_TEMPLATES)의 notify 값 -> 이벤트별 DM 대상
+#   dm_roles: 역할 DM / dm_drafter: 기안자 DM / quiet_roles: 이 역할이 처리하면 기안자 DM 생략
+NOTIFY_POLICIES = {
+    # 담당 -> 총무(전결)
+    NOTIFY_ADMIN_FINAL: {
+        "submit": {"dm_roles": [TelegramRecipient.ROLE_ADMIN]},
+        "approve": {"dm_drafter": True},
+        "reject": {"dm_drafter": True},
+    },
+    # 담당 -> 총무 -> 회장
+    NOTIFY_NORMAL: {
+        "submit": {"dm_roles": [TelegramRecipient.ROLE_ADMIN]},
+        "approve": {},
+        "reject": {"dm_drafter": True, "quiet_roles": [TelegramRecipient.ROLE_CHAIRMAN]},
+    },
+    # 총무 -> (감사) -> 회장
+    NOTIFY_ADMIN_START: {
+        "submit": {},
+        "approve": {},
+        "reject": {"dm_drafter": True, "quiet_roles": [TelegramRecipient.ROLE_CHAIRMAN]},
+    },
+}
+
+# ✅ 요구사항: v2 모든 주요 이벤트를 "그룹방에도" 보내기
+FORCE_GROUP_EVENTS = {"submit", "approve", "reject"}
+
 
 def route_telegram_notifications(
     *,
@@ -30,57 +66,21 @@ def route_telegram_notifications(
     """
     알림을 '누구에게 보낼지'만 결정한다. (실제 발송 X)
     """
+    tpl = find_route_template(template_code)
+    policy = NOTIFY_POLICIES.get(tpl.notify, {}) if tpl else {}
+    rule = policy.get(event, {})
 
-    ADMIN_FINAL = "ADMIN_FINAL"                 # 담당 -> 총무(전결)
-    NORMAL = "NORMAL"                           # 담당 -> 총무 -> 회장
-    ADMIN_TO_CHAIR = "ADMIN_TO_CHAIR"           # 총무 -> 회장
-    ADMIN_TO_AUDITOR_CHAIR = "ADMIN_TO_AUDITOR_CHAIR"  # 총무 -> 감사 -> 회장
-
-    # ✅ 요구사항: v2 모든 주요 이벤트를 "그룹방에도" 보내기
-    FORCE_GROUP_EVENTS = {"submit", "approve", "reject"}
-
-    def with_group(payload: dict) -> dict:
-        if event in FORCE_GROUP_EVENTS:
-            payload["group"] = True
-        return payload
-
-    if template_code == ADMIN_FINAL:
-        if event == "submit":
-            return with_group({"dm_roles": [TelegramRecipient.ROLE_ADMIN], "dm_drafter": False, "group": False})
-        if event == "approve":
-            return with_group({"dm_roles": [], "dm_drafter": True, "group": False})
-        if event == "reject":
-            return with_group({"dm_roles": [], "dm_drafter": True, "group": False})
-
-    if template_code == NORMAL:
-        if event == "submit":
-            return with_group({"dm_roles": [TelegramRecipient.ROLE_ADMIN], "dm_drafter": False, "group": False})
-        if event == "approve":
-            # 기존엔 admin/chairman일 때만 group=True 였는데, 이제 항상 group=True
-            return with_group({"dm_roles": [], "dm_drafter": False, "group": True})
-        if event == "reject":
-            # 기존 정책 유지하되, 그룹도 항상 보냄
-            # (원하면 dm_drafter도 유지)
-            if actor_role == TelegramRecipient.ROLE_CHAIRMAN:
-                return with_group({"dm_roles": [], "dm_drafter": False, "group": True})
-            return with_group({"dm_roles": [], "dm_drafter": True, "group": False})
-
-    if template_code in (ADMIN_TO_CHAIR, ADMIN_TO_AUDITOR_CHAIR):
-        if event == "submit":
-            return with_group({"dm_roles": [], "dm_drafter": False, "group": True})
-        if event == "approve":
-            return with_group({"dm_roles": [], "dm_drafter": False, "group": True})
-        if event == "reject":
-            if actor_role == TelegramRecipient.ROLE_CHAIRMAN:
-                return with_group({"dm_roles": [], "dm_drafter": False, "group": True})
-            return with_group({"dm_roles": [], "dm_drafter": True, "group": False})
-
-    return with_group({"dm_roles": [], "dm_drafter": False, "group": False})
+    dm_drafter = bool(rule.get("dm_drafter")) and actor_role not in rule.get("quiet_roles", ())
+    return {
+        "dm_roles": list(rule.get("dm_roles", [])),
+        "dm_drafter": dm_drafter,
+        "group": event in FORCE_GROUP_EVENTS,
+    }
 
 from .telegram import send_dm, send_group
 
 
-def dispatch_notifications(
+def plan_messages(
     *,
     template_code: str,
     event: str,
@@ -88,10 +88,10 @@ def dispatch_notifications(
     drafter_department: str,
     text: str,
     actor_role: str = "",
-) -> dict:
+):
     """
-    라우터 결과를 기반으로 실제 발송(현재는 stub print)을 수행한다.
-    return: 실행 결과 요약(dict)
+    라우터 결과를 실제 발송 단위(메시지 목록)로 펼친다.
+    return: (routing, [{"kind": "dm"/"group", "role": ..., "chat_id": ..., "text": ...}, ...])
     """
     routing = route_telegram_notifications(
         template_code=template_code,
@@ -101,14 +101,12 @@ def dispatch_notifications(
         actor_role=actor_role,
     )
 
-    sent = {"dm": [], "group": False, "routing": routing}
+    messages = []
 
     # 1) role 기반 DM (총무/회장 등)
     for role in routing.get("dm_roles", []):
-        recipients = get_active_recipients(role)
-        for r in recipients:
-            ok = send_dm(r.chat_id, text)
-            sent["dm"].append({"role": role, "chat_id": r.chat_id, "ok": ok})
+        for r in get_active_recipients(role):
+            messages.append({"kind": "dm", "role": role, "chat_id": r.chat_id, "text": text})
 
     # 2) 담당(기안자) DM
     if routing.get("dm_drafter"):
@@ -118,13 +116,198 @@ def dispatch_notifications(
             department=drafter_department,
         )
         for r in drafters:
-            ok = send_dm(r.chat_id, text)
-            sent["dm"].append({"role": "drafter", "chat_id": r.chat_id, "ok": ok})
+            messages.append({"kind": "dm", "role": "drafter", "chat_id": r.chat_id, "text": text})
 
     # 3) 단톡방
     if routing.get("group"):
-        ok = send_group(text)
-        sent["group"] = ok
+        messages.append({"kind": "group", "role": "", "chat_id": "", "text": text})
+
+    return routing, messages
+
+
+def send_planned_message(message: dict) -> dict:
+    """
+    return: {"ok": bool, "error": str}
+    """
+    if message["kind"] == "group":
+        return send_group(message["text"])
+    return send_dm(message["chat_id"], message["text"])
+
+
+def _send_safely(message: dict) -> dict:
+    try:
+        return send_planned_message(message)
+    except Exception as e:
+        logger.exception("telegram 발송 예외 kind=%s chat_id=%s", message.get("kind"), message.get("chat_id"))
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"[:300]}
+
+
+def send_messages(messages: list, *, concurrency: int = None, on_result=None) -> List[dict]:
+    """
+    메시지 목록을 병렬로 발송하고, 입력 순서대로 결과({"ok", "error"}) 목록을 돌려준다.
+    - 동시 발송 상한: settings.TELEGRAM_FANOUT_CONCURRENCY (1이면 순차 발송)
+    - 스레드에서는 HTTP만 하고 DB는 건드리지 않는다
+    - on_result(index, result): 한 건이 끝날 때마다 호출자 스레드에서 호출 (outbox 결과 기록/락 갱신)
+    """
+    if concurrency is None:
+        concurrency = int(getattr(settings, "TELEGRAM_FANOUT_CONCURRENCY", 4))
+    concurrency = max(1, min(concurrency, len(messages)))
+    results = [None] * len(messages)
+
+    if concurrency == 1:
+        for i, m in enumerate(messages):
+            results[i] = _send_safely(m)
+            if on_result:
+                on_result(i, results[i])
+        return results
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tg-fanout") as pool:
+        futures = {pool.submit(_send_safely, m): i for i, m in enumerate(messages)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result:
+                on_result(i, results[i])
+    return results
+
+
+def dispatch_notifications(
+    *,
+    template_code: str,
+    event: str,
+    drafter_name: str,
+    drafter_department: str,
+    text: str,
+    actor_role: str = "",
+) -> dict:
+    """
+    라우터 결과를 기반으로 실제 발송을 즉시 수행한다. (DEBUG 테스트 엔드포인트용)
+    return: 실행 결과 요약(dict)
+    """
+    routing, messages = plan_messages(
+        template_code=template_code,
+        event=event,
+        drafter_name=drafter_name,
+        drafter_department=drafter_department,
+        text=text,
+        actor_role=actor_role,
+    )
+
+    sent = {"dm": [], "group": False, "routing": routing}
+
+    for m, res in zip(messages, send_messages(messages)):
+        if m["kind"] == "group":
+            sent["group"] = res["ok"]
+        else:
+            sent["dm"].append({"role": m["role"], "chat_id": m["chat_id"], "ok": res["ok"], "error": res["error"]})
 
     return sent
 
+
+def enqueue_notifications(
+    *,
+    template_code: str,
+    event: str,
+    drafter_name: str,
+    drafter_department: str,
+    text: str,
+    actor_role: str = "",
+    approval=None,
+) -> dict:
+    """
+    발송하지 않고 TelegramOutbox에 쌓는다.
+    호출자의 트랜잭션 안에서 실행되므로 결재 상태 변경과 함께 커밋/롤백된다.
+    return: 적재 결과 요약(dict) - dispatch_notifications와 같은 모양, ok 대신 queued
+    """
+    routing, messages = plan_messages(
+        template_code=template_code,
+        event=event,
+        drafter_name=drafter_name,
+        drafter_department=drafter_department,
+        text=text,
+        actor_role=actor_role,
+    )
+
+    TelegramOutbox.objects.bulk_create([
+        TelegramOutbox(
+            approval=approval,
+            event=event,
+            kind=m["kind"],
+            role=m["role"],
+            chat_id=str(m["chat_id"] or "").strip(),
+            text=m["text"],
+        )
+        for m in messages
+    ])
+
+    queued = {"dm": [], "group": False, "routing": routing}
+    for m in messages:
+        if m["kind"] == "group":
+            queued["group"] = True
+        else:
+            queued["dm"].append({"role": m["role"], "chat_id": m["chat_id"], "queued": True})
+    return queued
+
+
+def enqueue_batch_notifications(
+    *,
+    event: str,
+    actor_role: str,
+    entries: list,
+    header: str,
+    footer: str = "",
+) -> dict:
+    """
+    일괄 처리 알림. 문서마다 쌓던 알림을 받는 곳(단톡방/역할/기안자)별로 한 통씩 합쳐 outbox에 쌓는다.
+    entries: [{"template_code", "drafter_name", "drafter_department", "line"}, ...]
+    - 단톡방/역할 DM: header + 전체 line + footer
+    - 기안자 DM: header + 그 기안자 문서의 line + footer
+    return: {"group": bool, "dm": n}
+    """
+    group = False
+    dm_roles = []
+    drafter_lines = {}
+
+    for e in entries:
+        routing = route_telegram_notifications(
+            template_code=e["template_code"],
+            event=event,
+            drafter_name=e["drafter_name"],
+            drafter_department=e["drafter_department"],
+            actor_role=actor_role,
+        )
+        group = group or routing.get("group", False)
+        for role in routing.get("dm_roles", []):
+            if role not in dm_roles:
+                dm_roles.append(role)
+        if routing.get("dm_drafter"):
+            key = (e["drafter_name"], e["drafter_department"])
+            drafter_lines.setdefault(key, []).append(e["line"])
+
+    def compose(lines) -> str:
+        return "\n".join([header, *lines, *([footer] if footer else [])])
+
+    full_text = compose([e["line"] for e in entries])
+    outbox = []
+
+    if group:
+        outbox.append(TelegramOutbox(event=event, kind=TelegramOutbox.KIND_GROUP, text=full_text))
+
+    for role in dm_roles:
+        for r in get_active_recipients(role):
+            outbox.append(TelegramOutbox(
+                event=event, kind=TelegramOutbox.KIND_DM, role=role, chat_id=str(r.chat_id or "").strip(), text=full_text
+            ))
+
+    for (name, department), lines in drafter_lines.items():
+        for r in get_active_recipients(TelegramRecipient.ROLE_DRAFTER, name=name, department=department):
+            outbox.append(TelegramOutbox(
+                event=event,
+                kind=TelegramOutbox.KIND_DM,
+                role=TelegramRecipient.ROLE_DRAFTER,
+                chat_id=str(r.chat_id or "").strip(),
+                text=compose(lines),
+            ))
+
+    TelegramOutbox.objects.bulk_create(outbox)
+    return {"group": group, "dm": sum(1 for m in outbox if m.kind == TelegramOutbox.KIND_DM)}
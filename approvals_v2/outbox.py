@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TelegramOutbox
+from .notifications import send_messages
+
+# 워커가 죽어 sending 상태로 남은 메시지를 다시 집어가기까지의 최소 시간
+STALE_LOCK_SECONDS = 300
+
+
+def stale_lock_seconds() -> int:
+    """
+    sending 선점이 만료되는 시간.
+    process_outbox는 한 건이 끝날 때마다 남은 행의 locked_at을 갱신하므로,
+    메시지 한 건이 걸릴 수 있는 최대 시간(속도 제한 대기 + HTTP 타임아웃, 429 재시도 포함)보다 길면 된다.
+    """
+    wait = float(getattr(settings, "TELEGRAM_RATE_WAIT_TIMEOUT", 60))
+    http = float(getattr(settings, "TELEGRAM_CONNECT_TIMEOUT", 3.05)) + float(
+        getattr(settings, "TELEGRAM_READ_TIMEOUT", 5)
+    )
+    tries = int(getattr(settings, "TELEGRAM_MAX_429_RETRIES", 3)) + 1
+    return max(STALE_LOCK_SECONDS, int(tries * (wait + http)) + 60)
+
+
+def _max_attempts() -> int:
+    return int(getattr(settings, "TELEGRAM_OUTBOX_MAX_ATTEMPTS", 8))
+
+
+def _backoff_seconds(attempts: int) -> int:
+    """
+    재시도 간격: base * 2^(attempts-1), 최대 10분
+    """
+    base = int(getattr(settings, "TELEGRAM_OUTBOX_BACKOFF_SECONDS", 5))
+    return min(base * (2 ** max(attempts - 1, 0)), 600)
+
+
+def claim_due_messages(*, limit: int = 50) -> list:
+    """
+    발송 시각이 된 메시지를 sending 상태로 선점한다.
+    조건부 UPDATE로 선점하므로 워커가 여러 개여도 같은 메시지를 두 번 보내지 않는다.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=stale_lock_seconds())
+
+    candidate_ids = list(
+        TelegramOutbox.objects.filter(
+            Q(status=TelegramOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            | Q(status=TelegramOutbox.STATUS_SENDING, locked_at__lt=stale_before)
+        )
+        .order_by("next_attempt_at", "id")
+        .values_list("id", "status", "locked_at")[:limit]
+    )
+
+    claimed = []
+    for pk, status, locked_at in candidate_ids:
+        updated = TelegramOutbox.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=TelegramOutbox.STATUS_SENDING,
+            locked_at=now,
+        )
+        if updated:
+            claimed.append(pk)
+
+    return list(TelegramOutbox.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def renew_locks(ids) -> int:
+    """
+    아직 발송 중인 행의 선점 시각을 갱신한다. (다른 워커가 stale로 보고 다시 집어가지 않도록)
+    """
+    if not ids:
+        return 0
+    return TelegramOutbox.objects.filter(pk__in=list(ids), status=TelegramOutbox.STATUS_SENDING).update(
+        locked_at=timezone.now()
+    )
+
+
+def mark_result(row: TelegramOutbox, ok: bool, error: str = "") -> None:
+    now = timezone.now()
+    row.attempts += 1
+    row.locked_at = None
+
+    if ok:
+        row.status = TelegramOutbox.STATUS_SENT
+        row.sent_at = now
+        row.last_error = ""
+    elif row.attempts >= _max_attempts():
+        row.status = TelegramOutbox.STATUS_FAILED
+        row.last_error = error or "send failed"
+    else:
+        row.status = TelegramOutbox.STATUS_PENDING
+        row.next_attempt_at = now + timedelta(seconds=_backoff_seconds(row.attempts))
+        row.last_error = error or "send failed"
+
+    row.save(update_fields=["status", "attempts", "locked_at", "sent_at", "next_attempt_at", "last_error"])
+
+
+def _as_message(row: TelegramOutbox) -> dict:
+    return {"kind": row.kind, "role": row.role, "chat_id": row.chat_id, "text": row.text}
+
+
+def process_outbox(*, batch_size: int = 50) -> dict:
+    """
+    대기열을 한 번 비운다. 선점한 배치는 병렬 발송(send_messages), 결과 기록은 메인 스레드에서.
+    한 건이 끝날 때마다 결과를 바로 기록하고 남은 행의 선점을 갱신한다.
+    return: {"claimed": n, "sent": n, "failed": n}
+    """
+    rows = claim_due_messages(limit=batch_size)
+    result = {"claimed": len(rows), "sent": 0, "failed": 0}
+    if not rows:
+        return result
+
+    outstanding = {row.pk for row in rows}
+
+    def record(index: int, res: dict) -> None:
+        row = rows[index]
+        mark_result(row, res["ok"], res.get("error", ""))
+        result["sent" if res["ok"] else "failed"] += 1
+        outstanding.discard(row.pk)
+        renew_locks(outstanding)
+
+    send_messages([_as_message(row) for row in rows], on_result=record)
+    return result
+
+
+def outbox_depth() -> int:
+    return TelegramOutbox.objects.filter(
+        status__in=[TelegramOutbox.STATUS_PENDING, TelegramOutbox.STATUS_SENDING]
+    ).count()
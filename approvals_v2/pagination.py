@@ -0,0 +1,51 @@
+from django.conf import settings
+
+# 페이지 토큰
+#   "" : 첫 페이지(최신)
+#   "b<id>" : id보다 오래된 문서 (다음 페이지)
+#   "a<id>" : id보다 최신 문서 (이전 페이지)
+# 토큰은 경계 문서 id만 담으므로 새 문서가 올라와도 같은 토큰은 같은 위치를 가리킨다.
+
+
+def page_size() -> int:
+    return max(1, int(getattr(settings, "APPROVAL_LIST_PAGE_SIZE", 50)))
+
+
+def parse_page_token(token: str):
+    """
+    return: ("b" | "a", id) 또는 (None, None) (첫 페이지/잘못된 토큰)
+    """
+    token = (token or "").strip()
+    if len(token) > 1 and token[0] in ("a", "b") and token[1:].isdigit():
+        return token[0], int(token[1:])
+    return None, None
+
+
+def keyset_page(qs, token: str = "", *, per_page: int = None) -> dict:
+    """
+    id 내림차순 keyset 페이지. OFFSET을 쓰지 않으므로 몇 페이지 뒤라도 첫 페이지와 같은 비용.
+    return: {"items": [...], "next": 토큰|"", "prev": 토큰|""}
+    """
+    per_page = per_page or page_size()
+    direction, cursor = parse_page_token(token)
+
+    if direction == "a":
+        rows = list(qs.filter(id__gt=cursor).order_by("id")[: per_page + 1])
+        if len(rows) > per_page:
+            items = rows[:per_page][::-1]
+            return {"items": items, "next": f"b{items[-1].id}", "prev": f"a{items[0].id}"}
+        # 최신 쪽 끝에 닿음 → 첫 페이지를 꽉 채워 보여준다
+        direction = None
+
+    qs = qs.order_by("-id")
+    if direction == "b":
+        qs = qs.filter(id__lt=cursor)
+    rows = list(qs[: per_page + 1])
+    items = rows[:per_page]
+
+    has_next = len(rows) > per_page
+    return {
+        "items": items,
+        "next": f"b{items[-1].id}" if has_next else "",
+        "prev": f"a{items[0].id}" if direction == "b" and items else "",
+    }
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.template.loader import render_to_string
+
+from .pdf_renderer import get_renderer, renderer_config, warm_renderer
+
+
+def sanitize_content(raw: str) -> str:
+    """
+    content 내부 <html>, <body>, <style>, <script>, <link> 제거
+    """
+    raw = raw or ""
+    raw = re.sub(r"(?is)<style.*?>.*?</style>", "", raw)
+    raw = re.sub(r"(?is)<script.*?>.*?</script>", "", raw)
+    raw = re.sub(r"(?is)<link[^>]*>", "", raw)
+    raw = re.sub(r"(?is)</?(html|body|head)[^>]*>", "", raw)
+    return raw
+
+
+def pdf_version(approval, route, attachments) -> str:
+    """
+    PDF 캐시 버전 키
+    - route: 재상신(route 재생성) / 승인·반려(updated_at 갱신) 시 바뀜
+    - 본문/첨부 구성이 바뀌어도 바뀜
+    """
+    h = hashlib.sha1()
+    parts = [
+        str(approval.id),
+        approval.title or "",
+        approval.department or "",
+        approval.name or "",
+        approval.content or "",
+    ]
+    if route:
+        parts += [str(route.id), route.status, str(route.current_order), route.updated_at.isoformat()]
+    for f in attachments:
+        parts += [str(f.id), f.file.name or "", f.original_name or ""]
+
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:20]
+
+
+def cache_root() -> Path:
+    return Path(getattr(settings, "APPROVAL_PDF_CACHE_DIR", Path(settings.BASE_DIR) / "pdf_cache"))
+
+
+def cache_path(approval_id: int, version: str) -> Path:
+    return cache_root() / str(approval_id) / f"{version}.pdf"
+
+
+def invalidate_pdf_cache(approval_id: int) -> None:
+    """
+    해당 문서의 캐시된 PDF 전부 삭제 (수정/상태 전이 시)
+    """
+    shutil.rmtree(cache_root() / str(approval_id), ignore_errors=True)
+
+
+def _cleanup_other_versions(path: Path) -> None:
+    for old in path.parent.glob("*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def store_pdf(path: Path, pdf_bytes: bytes) -> Path:
+    """
+    임시파일에 쓰고 교체(원자적), 같은 문서의 다른 버전은 정리
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(pdf_bytes)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    _cleanup_other_versions(path)
+    return path
+
+
+def build_pdf_html(*, approval, route, attachments, request=None) -> str:
+    steps = route.steps.all().order_by("order") if route else []
+
+    return render_to_string(
+        "approvals_v2/pdf_template.html",
+        {
+            "approval": approval,
+            "route": route,
+            "steps": steps,
+            "content_html": sanitize_content(approval.content),
+            "attachments": attachments,
+        },
+        request=request,
+    )
+
+
+def render_pdf_bytes(*, approval, route, attachments, base_url: str, request=None) -> bytes:
+    html_string = build_pdf_html(approval=approval, route=route, attachments=attachments, request=request)
+    return get_renderer().write_pdf(html_string, base_url)
+
+
+def write_pdf_file(html_string: str, base_url: str, path: str) -> str:
+    """
+    렌더 프로세스 풀에서 실행되는 함수 (DB 접근 X, 인자/반환값 모두 pickle 가능).
+    결과를 path 옆 임시파일에 쓰고 교체한다.
+    렌더러는 풀 initializer(warm_renderer)가 프로세스마다 한 번 만들어 둔 것을 쓴다.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        get_renderer().write_pdf(html_string, base_url, tmp)
+        os.replace(tmp, target)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    _cleanup_other_versions(target)
+    return str(target)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    WeasyPrint 렌더 전용 프로세스 풀 (settings.APPROVAL_PDF_RENDER_WORKERS개)
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            workers = int(getattr(settings, "APPROVAL_PDF_RENDER_WORKERS", 2))
+            _pool = ProcessPoolExecutor(
+                max_workers=max(workers, 1),
+                initializer=warm_renderer,
+                initargs=(renderer_config(),),
+            )
+            _pool_pid = pid
+    return _pool
+
+
+def current_cache_path(approval) -> tuple:
+    """
+    return: (캐시 경로, route, attachments)
+    """
+    route = getattr(approval, "route_v2", None)
+    attachments = list(approval.v2_attachments.all().order_by("id"))
+    return cache_path(approval.id, pdf_version(approval, route, attachments)), route, attachments
+
+
+def get_cached_pdf(approval):
+    path, _, _ = current_cache_path(approval)
+    return path if path.exists() else None
+
+
+def get_or_render_pdf(approval, *, base_url: str, request=None) -> Path:
+    """
+    캐시에 있으면 그 경로, 없으면 렌더 후 캐시에 저장한 경로를 돌려준다.
+    """
+    path, route, attachments = current_cache_path(approval)
+    if path.exists():
+        return path
+
+    pdf_bytes = render_pdf_bytes(
+        approval=approval,
+        route=route,
+        attachments=attachments,
+        base_url=base_url,
+        request=request,
+    )
+    return store_pdf(path, pdf_bytes)
+
+
+def submit_render(approval, *, base_url: str):
+    """
+    캐시에 없으면 렌더 풀에 작업을 넘기고 Future를 돌려준다. 캐시에 있으면 None.
+    (HTML 생성까지는 호출 프로세스에서, CPU를 쓰는 레이아웃/PDF 생성은 풀에서)
+    """
+    path, route, attachments = current_cache_path(approval)
+    if path.exists():
+        return None
+
+    html_string = build_pdf_html(approval=approval, route=route, attachments=attachments)
+    return get_render_pool().submit(write_pdf_file, html_string, base_url, str(path))
+
+
+def store_final_pdf(route, path: Path) -> None:
+    """
+    완료/반려된 route에 최종 PDF를 파일로 붙인다.
+    updated_at은 건드리지 않는다(바꾸면 캐시 버전이 바뀜).
+    """
+    if not route or not route.is_closed or route.final_pdf:
+        return
+
+    with open(path, "rb") as fp:
+        route.final_pdf.save(f"approval_{route.approval_id}.pdf", File(fp), save=False)
+    route.save(update_fields=["final_pdf"])
@@ -0,0 +1,137 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from approvals.models import ApprovalRequest
+
+from .models import PdfRenderJob
+from .pdf import get_cached_pdf, store_final_pdf, submit_render
+
+logger = logging.getLogger(__name__)
+
+# 렌더 워커가 죽어 running으로 남은 작업을 다시 집어가기까지의 시간
+STALE_RUNNING_SECONDS = 600
+MAX_ATTEMPTS = 3
+
+
+def render_worker_enabled() -> bool:
+    """
+    APPROVAL_PDF_RENDER_MODE="service"일 때만 PdfRenderJob을 처리하는 manage.py pdf_render_worker가 떠 있다.
+    inline 모드에서 작업을 쌓으면 아무도 꺼내 가지 않는다.
+    """
+    return getattr(settings, "APPROVAL_PDF_RENDER_MODE", "inline") == "service"
+
+
+def enqueue_pdf_render(approval_id: int, *, base_url: str = "") -> PdfRenderJob:
+    """
+    대기 중인 작업이 이미 있으면 그대로 쓰고, 없으면 새로 만든다.
+    """
+    job = PdfRenderJob.objects.filter(
+        approval_id=approval_id,
+        status__in=[PdfRenderJob.STATUS_PENDING, PdfRenderJob.STATUS_RUNNING],
+    ).first()
+    if job:
+        return job
+    return PdfRenderJob.objects.create(
+        approval_id=approval_id,
+        base_url=base_url or getattr(settings, "APPROVAL_PDF_BASE_URL", ""),
+    )
+
+
+def enqueue_final_pdf_on_commit(route) -> None:
+    """
+    route가 완료/반려로 커밋되면 최종 PDF 렌더를 예약한다. (settings.APPROVAL_PDF_PRERENDER)
+    service 모드에서만 예약한다. inline 모드는 처음 PDF를 열거나 내보낼 때 렌더하면서 final_pdf를 붙인다.
+    """
+    if not getattr(settings, "APPROVAL_PDF_PRERENDER", True) or not render_worker_enabled():
+        return
+    approval_id = route.approval_id
+    transaction.on_commit(lambda: enqueue_pdf_render(approval_id))
+
+
+def latest_job(approval_id: int):
+    return PdfRenderJob.objects.filter(approval_id=approval_id).order_by("-id").first()
+
+
+def claim_render_jobs(*, limit: int) -> list:
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=STALE_RUNNING_SECONDS)
+
+    candidates = list(
+        PdfRenderJob.objects.filter(
+            Q(status=PdfRenderJob.STATUS_PENDING)
+            | Q(status=PdfRenderJob.STATUS_RUNNING, started_at__lt=stale_before)
+        )
+        .order_by("created_at", "id")
+        .values_list("id", "status", "started_at")[:limit]
+    )
+
+    claimed = []
+    for pk, status, started_at in candidates:
+        updated = PdfRenderJob.objects.filter(pk=pk, status=status, started_at=started_at).update(
+            status=PdfRenderJob.STATUS_RUNNING,
+            started_at=now,
+        )
+        if updated:
+            claimed.append(pk)
+
+    return list(PdfRenderJob.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def _finish(job: PdfRenderJob, ok: bool, error: str = "") -> None:
+    job.attempts += 1
+    if ok:
+        job.status = PdfRenderJob.STATUS_DONE
+        job.last_error = ""
+    elif job.attempts >= MAX_ATTEMPTS:
+        job.status = PdfRenderJob.STATUS_FAILED
+        job.last_error = error[:1000]
+    else:
+        job.status = PdfRenderJob.STATUS_PENDING
+        job.last_error = error[:1000]
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "attempts", "last_error", "finished_at"])
+
+
+def process_render_jobs(*, batch_size: int) -> dict:
+    """
+    작업을 선점해 렌더 풀에 한꺼번에 넘기고, 끝난 순서대로 결과를 기록한다.
+    return: {"claimed": n, "done": n, "failed": n}
+    """
+    jobs = claim_render_jobs(limit=batch_size)
+    result = {"claimed": len(jobs), "done": 0, "failed": 0}
+
+    futures = []
+    for job in jobs:
+        try:
+            approval = ApprovalRequest.objects.select_related("route_v2").get(pk=job.approval_id)
+            futures.append((job, approval, submit_render(approval, base_url=job.base_url)))
+        except Exception as e:
+            logger.exception("pdf 렌더 준비 실패 job=%s", job.id)
+            _finish(job, False, str(e))
+            result["failed"] += 1
+
+    for job, approval, future in futures:
+        try:
+            if future is not None:
+                future.result()
+
+            # ✅ 완료/반려 문서면 route에 최종 PDF로 붙여 둔다
+            route = getattr(approval, "route_v2", None)
+            if route and route.is_closed and not route.final_pdf:
+                path = get_cached_pdf(approval)
+                if path:
+                    store_final_pdf(route, path)
+
+            _finish(job, True)
+            result["done"] += 1
+        except Exception as e:
+            logger.exception("pdf 렌더 실패 job=%s", job.id)
+            _finish(job, False, str(e))
+            result["failed"] += 1
+
+    return result
@@ -0,0 +1,136 @@
+import logging
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+CSS_PATH = Path(__file__).resolve().parent / "templates" / "approvals_v2" / "pdf_template.css"
+
+
+def renderer_config() -> dict:
+    """
+    렌더러 설정 (pickle 가능, 렌더 프로세스 풀 initializer로 넘긴다)
+    - url_roots: [(URL prefix, [로컬 디렉터리, ...]), ...]
+    """
+    from django.conf import settings
+
+    static_roots = [str(settings.STATIC_ROOT)] if getattr(settings, "STATIC_ROOT", None) else []
+    static_roots += [str(d) for d in getattr(settings, "STATICFILES_DIRS", [])]
+    return {
+        "css_path": str(CSS_PATH),
+        "script_name": (getattr(settings, "FORCE_SCRIPT_NAME", "") or "").rstrip("/"),
+        "url_roots": [
+            (settings.STATIC_URL, static_roots),
+            (settings.MEDIA_URL, [str(settings.MEDIA_ROOT)]),
+        ],
+    }
+
+
+class LocalUrlFetcher:
+    """
+    STATIC_URL / MEDIA_URL 아래 주소는 디스크에서 바로 읽는다. (자기 서버로 HTTP 요청 X)
+    그 밖의 주소는 WeasyPrint 기본 fetcher로 넘긴다.
+    """
+
+    def __init__(self, url_roots, script_name: str = ""):
+        self.url_roots = []
+        for prefix, roots in url_roots:
+            if not prefix or not prefix.startswith("/"):
+                continue
+            prefixes = [prefix]
+            if script_name and not prefix.startswith(script_name + "/"):
+                prefixes.append(script_name + prefix)
+            self.url_roots.append((prefixes, [Path(r).resolve() for r in roots]))
+
+    def find(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https", "file"):
+            return None
+        path = unquote(parts.path)
+
+        for prefixes, roots in self.url_roots:
+            for prefix in prefixes:
+                if not path.startswith(prefix):
+                    continue
+                rel = path[len(prefix):]
+                for root in roots:
+                    candidate = (root / rel).resolve()
+                    # ✅ root 밖(../) 접근 차단
+                    if candidate.is_relative_to(root) and candidate.is_file():
+                        return candidate
+        return None
+
+    def __call__(self, url: str, timeout=10, ssl_context=None):
+        from weasyprint import default_url_fetcher
+
+        local = self.find(url)
+        if local is None:
+            return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+        mime_type, encoding = mimetypes.guess_type(local.name)
+        return {
+            "file_obj": open(local, "rb"),
+            "mime_type": mime_type or "application/octet-stream",
+            "encoding": encoding,
+            "redirected_url": url,
+            "filename": local.name,
+        }
+
+
+class PdfRenderer:
+    """
+    FontConfiguration / 파싱된 CSS / 로컬 URL fetcher를 프로세스 안에서 재사용하는 렌더러
+    """
+
+    def __init__(self, *, css_path: str, url_roots, script_name: str = ""):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        self.url_fetcher = LocalUrlFetcher(url_roots, script_name)
+        self.stylesheets = [
+            CSS(filename=css_path, font_config=self.font_config, url_fetcher=self.url_fetcher),
+        ]
+        # FontConfiguration은 스레드 간 공유가 보장되지 않아 렌더를 직렬화한다
+        self._lock = threading.Lock()
+
+    def write_pdf(self, html_string: str, base_url: str, target=None):
+        from weasyprint import HTML
+
+        html = HTML(string=html_string, base_url=base_url, url_fetcher=self.url_fetcher)
+        with self._lock:
+            return html.write_pdf(
+                target,
+                stylesheets=self.stylesheets,
+                font_config=self.font_config,
+            )
+
+
+_renderer = None
+_renderer_pid = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer(config: dict = None) -> PdfRenderer:
+    global _renderer, _renderer_pid
+
+    pid = os.getpid()
+    with _renderer_lock:
+        if _renderer is None or _renderer_pid != pid:
+            _renderer = PdfRenderer(**(config or renderer_config()))
+            _renderer_pid = pid
+    return _renderer
+
+
+def warm_renderer(config: dict = None) -> None:
+    """
+    프로세스 시작 시 렌더러를 미리 만들고 빈 문서를 한 번 렌더해 폰트 캐시를 채운다.
+    실패해도 프로세스는 계속 뜬다(첫 렌더 때 다시 시도).
+    """
+    try:
+        get_renderer(config).write_pdf("<p>warm-up</p>", base_url="http://localhost/")
+    except Exception:
+        logger.exception("pdf 렌더러 예열 실패")
@@ -0,0 +1,96 @@
+from django.db.models import Prefetch
+
+from .models import ApprovalRouteInstance, ApprovalRouteStepInstance
+from .route_templates import find_route_template
+
+
+class RouteSnapshot:
+    """
+    route와 그 단계들을 한 번 읽어 둔 읽기 전용 묶음.
+    상세 화면/알림 문구/수정 가능 여부 판단이 모두 이것만 보고 추가 쿼리 없이 답한다.
+    상태 전이(approve/reject/재상신) 후에는 load_route_snapshot으로 다시 만든다.
+    """
+
+    __slots__ = ("route", "steps", "_by_order")
+
+    def __init__(self, route: ApprovalRouteInstance, steps):
+        self.route = route
+        self.steps = tuple(sorted(steps, key=lambda s: s.order))
+        self._by_order = {s.order: s for s in self.steps}
+
+    @classmethod
+    def from_route(cls, route: ApprovalRouteInstance) -> "RouteSnapshot":
+        # prefetch 되어 있으면 쿼리 없음, 아니면 steps 1회
+        return cls(route, route.steps.all())
+
+    @property
+    def template_code(self) -> str:
+        return self.route.template_code
+
+    @property
+    def status(self) -> str:
+        return self.route.status
+
+    @property
+    def current_order(self) -> int:
+        return self.route.current_order
+
+    @property
+    def is_closed(self) -> bool:
+        return self.route.is_closed
+
+    @property
+    def drafter_role(self) -> str:
+        """
+        기안자 역할 (설정에서 빠진 예전 템플릿이면 첫 단계 역할)
+        """
+        tpl = find_route_template(self.template_code)
+        if tpl:
+            return tpl.drafter_role
+        return self.steps[0].role if self.steps else ""
+
+    def step(self, order: int):
+        return self._by_order.get(order)
+
+    @property
+    def current_step(self):
+        return self._by_order.get(self.current_order)
+
+    @property
+    def current_role(self) -> str:
+        step = self.current_step
+        return step.role if step else ""
+
+    def approver_roles(self) -> list:
+        """
+        기안자 역할을 제외한 결재자 role (order 순)
+        """
+        drafter = self.drafter_role
+        return [s.role for s in self.steps if s.role != drafter]
+
+    def state_by_role(self) -> dict:
+        return {s.role: s.state for s in self.steps}
+
+    def approver_acted(self) -> bool:
+        """
+        기안자 외 결재자 중 누구라도 승인/반려했는지
+        """
+        drafter = self.drafter_role
+        return any(
+            s.role != drafter and s.state != ApprovalRouteStepInstance.STATE_PENDING
+            for s in self.steps
+        )
+
+
+def load_route_snapshot(approval_id: int) -> RouteSnapshot:
+    """
+    route 1회 + steps 1회 (prefetch)
+    raise ApprovalRouteInstance.DoesNotExist
+    """
+    route = (
+        ApprovalRouteInstance.objects
+        .select_related("approval")
+        .prefetch_related(Prefetch("steps", queryset=ApprovalRouteStepInstance.objects.order_by("order")))
+        .get(approval_id=approval_id)
+    )
+    return RouteSnapshot.from_route(route)
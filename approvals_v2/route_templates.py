@@ -0,0 +1,97 @@
+import functools
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import TelegramRecipient
+
+ROLE_CODES = {code for code, _ in TelegramRecipient.ROLE_CHOICES}
+
+NOTIFY_ADMIN_FINAL = "admin_final"
+NOTIFY_NORMAL = "normal"
+NOTIFY_ADMIN_START = "admin_start"
+
+
+@dataclass(frozen=True)
+class RouteTemplate:
+    """
+    settings.APPROVAL_ROUTE_TEMPLATES 한 항목을 컴파일한 읽기 전용 결재선 정의
+    """
+
+    code: str
+    label: str
+    roles: tuple
+    notify: str
+
+    @property
+    def drafter_role(self) -> str:
+        # 첫 단계 역할 = 기안자 (상신 시 자동 승인)
+        return self.roles[0]
+
+    @property
+    def approver_roles(self) -> tuple:
+        # 기안자를 제외한 결재자 역할 (order 순)
+        return self.roles[1:]
+
+    @property
+    def starts_with_admin(self) -> bool:
+        return self.drafter_role == TelegramRecipient.ROLE_ADMIN
+
+    @property
+    def delegated_final(self) -> bool:
+        # 총무가 최종 결재 = 전결
+        return self.roles[-1] == TelegramRecipient.ROLE_ADMIN
+
+
+def _compile(item) -> RouteTemplate:
+    code = str(item.get("code") or "").strip()
+    roles = tuple(item.get("roles") or ())
+    if not code or len(code) > 30:
+        raise ImproperlyConfigured(f"APPROVAL_ROUTE_TEMPLATES: invalid code {code!r}")
+    if len(roles) < 2:
+        raise ImproperlyConfigured(f"APPROVAL_ROUTE_TEMPLATES[{code}]: roles needs 2+ steps")
+    unknown = [r for r in roles if r not in ROLE_CODES]
+    if unknown:
+        raise ImproperlyConfigured(f"APPROVAL_ROUTE_TEMPLATES[{code}]: unknown roles {unknown}")
+
+    notify = item.get("notify") or (
+        NOTIFY_ADMIN_START if roles[0] == TelegramRecipient.ROLE_ADMIN else NOTIFY_NORMAL
+    )
+    return RouteTemplate(code=code, label=str(item.get("label") or code), roles=roles, notify=notify)
+
+
+@functools.lru_cache(maxsize=None)
+def _registry() -> dict:
+    templates = {}
+    for item in getattr(settings, "APPROVAL_ROUTE_TEMPLATES", []):
+        tpl = _compile(item)
+        if tpl.code in templates:
+            raise ImproperlyConfigured(f"APPROVAL_ROUTE_TEMPLATES: duplicate code {tpl.code}")
+        templates[tpl.code] = tpl
+    return templates
+
+
+def route_templates() -> list:
+    """
+    설정 순서대로의 RouteTemplate 목록 (작성 폼 선택지)
+    """
+    return list(_registry().values())
+
+
+def find_route_template(code: str):
+    """
+    return: RouteTemplate 또는 None (설정에서 빠진 예전 코드)
+    """
+    return _registry().get(code or "")
+
+
+def get_route_template(code: str) -> RouteTemplate:
+    tpl = find_route_template(code)
+    if tpl is None:
+        raise ValueError(f"unknown template_code: {code}")
+    return tpl
+
+
+def reset_route_templates() -> None:
+    _registry.cache_clear()
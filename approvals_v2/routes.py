@@ -1,90 +1,155 @@
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F, Prefetch, Q
 
+from .directory import get_directory
 from .models import ApprovalRouteInstance, ApprovalRouteStepInstance, TelegramRecipient
+from .pdf import invalidate_pdf_cache
+from .pdf_jobs import enqueue_final_pdf_on_commit
+from .route_snapshot import RouteSnapshot
+from .route_templates import get_route_template
+
+ROLE_LABEL = {
+    TelegramRecipient.ROLE_DRAFTER: "담당",
+    TelegramRecipient.ROLE_ADMIN: "총무",
+    TelegramRecipient.ROLE_CHAIRMAN: "회장",
+    TelegramRecipient.ROLE_AUDITOR: "감사",
+}
+
+
+def build_step_label(*, status: str, role: str) -> str:
+    """
+    리스트의 '현재 단계' 배지 문구
+    """
+    if not role:
+        return ""
+    if status == ApprovalRouteInstance.STATUS_COMPLETED:
+        return "완료"
+    if status == ApprovalRouteInstance.STATUS_REJECTED:
+        return "반려"
+    return f"{ROLE_LABEL.get(role, role)} 결재 대기"
+
+
+def set_list_projection(route: ApprovalRouteInstance, *, role: str) -> list:
+    """
+    route의 리스트용 비정규화 필드(current_role/current_step_label)를 갱신한다.
+    저장은 호출자가 하며, save(update_fields=...)에 더할 필드명 목록을 돌려준다.
+    """
+    route.current_role = role or ""
+    route.current_step_label = build_step_label(status=route.status, role=route.current_role)
+    return ["current_role", "current_step_label"]
+
+
+class RouteConflict(Exception):
+    """
+    다른 요청이 먼저 이 결재선을 전이시킴 (읽은 version과 다름) → 화면에는 "이미 처리됨"
+    """
+
+
+def _claim_route(route: ApprovalRouteInstance, *, expected_version: int, **changes) -> None:
+    """
+    compare-and-swap: route.version이 expected_version일 때만 changes를 반영하고 version+1.
+    행 잠금 없이 모든 DB에서 같은 의미. 실패하면 RouteConflict.
+    """
+    changes["updated_at"] = timezone.now()
+    updated = ApprovalRouteInstance.objects.filter(
+        pk=route.pk,
+        version=expected_version,
+        status=ApprovalRouteInstance.STATUS_IN_PROGRESS,
+    ).update(version=F("version") + 1, **changes)
+    if not updated:
+        raise RouteConflict(f"route {route.pk} already processed (version {expected_version})")
+
+    for field, value in changes.items():
+        setattr(route, field, value)
+    route.version = expected_version + 1
+
+
+def _projection(*, status: str, role: str) -> dict:
+    """
+    set_list_projection과 같은 값을 route를 바꾸지 않고 dict로 (CAS update용)
+    """
+    return {
+        "current_role": role or "",
+        "current_step_label": build_step_label(status=status, role=role or ""),
+    }
+
+
+def invalidate_pdf_on_commit(route: ApprovalRouteInstance) -> None:
+    """
+    상태 전이/재상신이 커밋되면 캐시된 PDF를 지운다.
+    """
+    approval_id = route.approval_id
+    transaction.on_commit(lambda: invalidate_pdf_cache(approval_id))
 
 
 @transaction.atomic
-def build_route_for_approval(*, approval, template_code: str) -> ApprovalRouteInstance:
+def build_route_for_approval(
+    *,
+    approval,
+    template_code: str,
+    acted_ip: str = "",
+    acted_device: str = "",
+    acted_anon_id: str = "",
+    version: int = 0,
+) -> ApprovalRouteInstance:
     """
     approval(기존 approvals.ApprovalRequest)에 대해 v2 결재라인 인스턴스를 생성한다.
     상신 후 수정 불가 원칙을 위해, 이미 route가 있으면 예외로 막는다.
+
+    단계는 settings.APPROVAL_ROUTE_TEMPLATES(approvals_v2.route_templates) 정의를 따르고,
+    기안자(첫 단계)는 상신 시점에 자동 승인된 상태로 한 번에 insert 한다.
+    version: 재상신 시 이전 route보다 큰 값을 넘겨, 예전 화면에서 보낸 요청이 새 route에 먹히지 않게 한다.
     """
     if hasattr(approval, "route_v2"):
         raise ValueError("route already exists for this approval")
 
-    route = ApprovalRouteInstance.objects.create(
+    tpl = get_route_template(template_code)
+    now = timezone.now()
+
+    route = ApprovalRouteInstance(
         approval=approval,
-        template_code=template_code,
+        template_code=tpl.code,
         status=ApprovalRouteInstance.STATUS_IN_PROGRESS,
-        current_order=1,
-        submitted_at=timezone.now(),
+        current_order=2,
+        version=version,
+        submitted_at=now,
     )
+    set_list_projection(route, role=tpl.roles[1])
+    route.save()
 
-    # 템플릿별 결재 단계 정의
-    if template_code == ApprovalRouteInstance.TEMPLATE_ADMIN_FINAL:
-        steps = [
-            (1, TelegramRecipient.ROLE_DRAFTER),
-            (2, TelegramRecipient.ROLE_ADMIN),
-        ]
-    elif template_code == ApprovalRouteInstance.TEMPLATE_NORMAL:
-        steps = [
-            (1, TelegramRecipient.ROLE_DRAFTER),
-            (2, TelegramRecipient.ROLE_ADMIN),
-            (3, TelegramRecipient.ROLE_CHAIRMAN),
-        ]
-    elif template_code == ApprovalRouteInstance.TEMPLATE_ADMIN_TO_CHAIR:
-        steps = [
-            (1, TelegramRecipient.ROLE_ADMIN),
-            (2, TelegramRecipient.ROLE_CHAIRMAN),
-        ]
-    # ✅ 신규: 총무 → 감사 → 회장
-    elif template_code == "ADMIN_TO_AUDITOR_CHAIR":
-        steps = [
-            (1, TelegramRecipient.ROLE_ADMIN),
-            (2, TelegramRecipient.ROLE_AUDITOR),
-            (3, TelegramRecipient.ROLE_CHAIRMAN),
-        ]
-    else:
-        raise ValueError(f"unknown template_code: {template_code}")
-
-    # 1) steps 생성
-    for order, role in steps:
-        ApprovalRouteStepInstance.objects.create(route=route, order=order, role=role)
-
-    # 2) ✅ v2 정책: 상신 시점에 drafter 단계는 자동 승인 처리
-    #    - drafter가 1번 단계일 때만
-    #    - 이미 current_order가 2 이상이면 중복 적용 방지
-    first = route.steps.filter(order=1).first()
-    if (
-        first
-        and first.role == TelegramRecipient.ROLE_DRAFTER
-        and first.state == ApprovalRouteStepInstance.STATE_PENDING
-        and route.current_order == 1
-    ):
-        first.state = ApprovalRouteStepInstance.STATE_APPROVED
-        first.acted_at = timezone.now()
-
-        # ✅ drafter 도장 스냅샷 저장 (name 매칭)
-        recipient = TelegramRecipient.objects.filter(
-            role=TelegramRecipient.ROLE_DRAFTER,
-            is_active=True,
-            name=approval.name,
-        ).first()
-        if recipient and recipient.stamp_image:
-            first.stamp_image = recipient.stamp_image
-
-        first.save(update_fields=["state", "acted_at", "stamp_image"])
-
-        # 다음 단계가 있으면 current_order=2로 이동
-        if route.steps.filter(order=2).exists():
-            route.current_order = 2
-            route.save(update_fields=["current_order", "updated_at"])
+    # ✅ v2 정책: 상신 시점에 기안자 단계는 자동 승인 + 도장 스냅샷
+    #    - 담당 기안: name 매칭 / 총무 기안: 활성 총무
+    drafter_name = approval.name if tpl.drafter_role == TelegramRecipient.ROLE_DRAFTER else None
+    recipient = get_directory().first_active(tpl.drafter_role, name=drafter_name)
 
+    first = ApprovalRouteStepInstance(
+        route=route,
+        order=1,
+        role=tpl.drafter_role,
+        state=ApprovalRouteStepInstance.STATE_APPROVED,
+        acted_at=now,
+        acted_ip=acted_ip or None,
+        acted_device=acted_device,
+        acted_anon_id=acted_anon_id,
+    )
+    if recipient and recipient.stamp_image:
+        first.stamp_image.name = recipient.stamp_image.name
+
+    steps = [first] + [
+        ApprovalRouteStepInstance(route=route, order=order, role=role)
+        for order, role in enumerate(tpl.approver_roles, start=2)
+    ]
+    ApprovalRouteStepInstance.objects.bulk_create(steps)
+
+    invalidate_pdf_on_commit(route)
     return route
 
 
 def get_current_actor_role(route: ApprovalRouteInstance) -> str:
+    """
+    여러 값을 함께 볼 때는 approvals_v2.route_snapshot.RouteSnapshot.current_role
+    """
     step = route.steps.filter(order=route.current_order).first()
     return step.role if step else ""
 
@@ -96,33 +161,53 @@ def approve_current_step(
     acted_ip: str = "",
     acted_device: str = "",
     acted_anon_id: str = "",
+    expected_version: int = None,
 ) -> ApprovalRouteStepInstance:
     """
     현재 단계(route.current_order)를 승인 처리하고 다음 단계로 이동한다.
     마지막 단계 승인 시 route를 completed로 만든다.
+    expected_version: 화면을 그릴 때의 route.version (없으면 지금 읽은 route.version)
+    raise RouteConflict: 그사이 다른 요청이 먼저 처리함 (중복 클릭/동시 결재)
     """
-    step = route.steps.select_for_update().get(order=route.current_order)
+    version = route.version if expected_version is None else expected_version
+
+    # 현재 단계와 다음 단계를 한 번에
+    steps = list(
+        route.steps.filter(order__in=[route.current_order, route.current_order + 1]).order_by("order")
+    )
+    if not steps or steps[0].order != route.current_order:
+        raise ApprovalRouteStepInstance.DoesNotExist(f"no step order={route.current_order}")
+    step = steps[0]
+    next_step = steps[1] if len(steps) > 1 else None
 
-    # 이미 처리된 단계면 그대로 반환(중복 클릭 방지)
     if step.state != ApprovalRouteStepInstance.STATE_PENDING:
-        return step
+        raise RouteConflict(f"step {step.pk} already {step.state}")
 
+    now = timezone.now()
+
+    # 1) route 선점 (CAS) - 여기서 진 요청은 아무것도 쓰지 않고 끝난다
+    if next_step:
+        projection = _projection(status=route.status, role=next_step.role)
+        _claim_route(route, expected_version=version, current_order=next_step.order, **projection)
+    else:
+        status = ApprovalRouteInstance.STATUS_COMPLETED
+        projection = _projection(status=status, role=step.role)
+        _claim_route(route, expected_version=version, status=status, completed_at=now, **projection)
+
+    # 2) 단계 기록
     step.state = ApprovalRouteStepInstance.STATE_APPROVED
-    step.acted_at = timezone.now()
+    step.acted_at = now
     step.acted_ip = acted_ip or None
     step.acted_device = acted_device
     step.acted_anon_id = acted_anon_id
 
     # ✅ 결재자 도장 이미지 스냅샷 저장
-    recipient_qs = TelegramRecipient.objects.filter(role=step.role, is_active=True)
-
     # drafter일 가능성까지 안전하게 처리
+    drafter_name = None
     if step.role == TelegramRecipient.ROLE_DRAFTER:
-        drafter_name = getattr(route.approval, "name", "") or ""
-        if drafter_name:
-            recipient_qs = recipient_qs.filter(name=drafter_name)
+        drafter_name = getattr(route.approval, "name", "") or None
 
-    recipient = recipient_qs.first()
+    recipient = get_directory().first_active(step.role, name=drafter_name)
     if recipient and recipient.stamp_image:
         step.stamp_image.name = recipient.stamp_image.name
 
@@ -130,19 +215,95 @@ def approve_current_step(
         "state", "acted_at", "acted_ip", "acted_device", "acted_anon_id", "stamp_image"
     ])
 
-    # 다음 단계 처리
-    has_next = route.steps.filter(order=route.current_order + 1).exists()
-    if has_next:
-        route.current_order = route.current_order + 1
-        route.save(update_fields=["current_order", "updated_at"])
-    else:
-        route.status = ApprovalRouteInstance.STATUS_COMPLETED
-        route.completed_at = timezone.now()
-        route.save(update_fields=["status", "completed_at", "updated_at"])
-
+    invalidate_pdf_on_commit(route)
+    if route.is_closed:
+        enqueue_final_pdf_on_commit(route)
     return step
 
 
+@transaction.atomic
+def approve_current_steps(
+    *,
+    approval_ids,
+    role: str,
+    acted_ip: str = "",
+    acted_device: str = "",
+    acted_anon_id: str = "",
+) -> list:
+    """
+    여러 문서에서 지금 role 차례인 단계를 한 번에 승인한다. (일괄 승인)
+    문서 수와 무관하게 route(+approval) 1 + steps 1 + 선점 1 + step update 1 + route update 1 쿼리.
+    이미 처리됐거나 다른 역할 차례인 문서는 건너뛴다.
+    선점: 읽은 version 그대로인 route만 한 번의 UPDATE로 version+1. 하나라도 그사이 바뀌었으면
+    RouteConflict로 전체를 되돌린다 (호출자가 다시 읽어 재시도 → 바뀐 문서는 건너뛰게 됨)
+    return: [(RouteSnapshot, 승인한 step), ...] (전이 후 상태)
+    """
+    routes = list(
+        ApprovalRouteInstance.objects.select_related("approval")
+        .prefetch_related(Prefetch("steps", queryset=ApprovalRouteStepInstance.objects.order_by("order")))
+        .filter(approval_id__in=approval_ids, status=ApprovalRouteInstance.STATUS_IN_PROGRESS)
+        .order_by("approval_id")
+    )
+
+    now = timezone.now()
+    recipient = get_directory().first_active(role)
+    stamp_name = recipient.stamp_image.name if recipient and recipient.stamp_image else None
+
+    done = []
+    for route in routes:
+        snapshot = RouteSnapshot.from_route(route)
+        step = snapshot.current_step
+        if step is None or step.role != role or step.state != ApprovalRouteStepInstance.STATE_PENDING:
+            continue
+
+        step.state = ApprovalRouteStepInstance.STATE_APPROVED
+        step.acted_at = now
+        step.acted_ip = acted_ip or None
+        step.acted_device = acted_device
+        step.acted_anon_id = acted_anon_id
+        step.stamp_image.name = stamp_name
+
+        next_step = snapshot.step(step.order + 1)
+        if next_step:
+            route.current_order = next_step.order
+            set_list_projection(route, role=next_step.role)
+        else:
+            route.status = ApprovalRouteInstance.STATUS_COMPLETED
+            route.completed_at = now
+            set_list_projection(route, role=step.role)
+        route.updated_at = now
+        done.append((snapshot, step))
+
+    if not done:
+        return []
+
+    claim = Q()
+    for snapshot, _ in done:
+        claim |= Q(pk=snapshot.route.pk, version=snapshot.route.version)
+    claimed = ApprovalRouteInstance.objects.filter(
+        claim, status=ApprovalRouteInstance.STATUS_IN_PROGRESS
+    ).update(version=F("version") + 1)
+    if claimed != len(done):
+        raise RouteConflict(f"{len(done) - claimed} of {len(done)} routes changed while approving")
+    for snapshot, _ in done:
+        snapshot.route.version += 1
+
+    ApprovalRouteStepInstance.objects.bulk_update(
+        [step for _, step in done],
+        ["state", "acted_at", "acted_ip", "acted_device", "acted_anon_id", "stamp_image"],
+    )
+    ApprovalRouteInstance.objects.bulk_update(
+        [snapshot.route for snapshot, _ in done],
+        ["current_order", "status", "completed_at", "updated_at", "current_role", "current_step_label"],
+    )
+
+    for snapshot, _ in done:
+        invalidate_pdf_on_commit(snapshot.route)
+        if snapshot.is_closed:
+            enqueue_final_pdf_on_commit(snapshot.route)
+    return done
+
+
 @transaction.atomic
 def reject_current_step(
     *,
@@ -151,18 +312,26 @@ def reject_current_step(
     acted_ip: str = "",
     acted_device: str = "",
     acted_anon_id: str = "",
+    expected_version: int = None,
 ) -> ApprovalRouteStepInstance:
     """
     현재 단계(route.current_order)를 반려 처리하고 route를 rejected로 만든다.
+    raise RouteConflict: 그사이 다른 요청이 먼저 처리함
     """
-    step = route.steps.select_for_update().get(order=route.current_order)
+    version = route.version if expected_version is None else expected_version
+    step = route.steps.get(order=route.current_order)
 
     if step.state != ApprovalRouteStepInstance.STATE_PENDING:
-        return step
+        raise RouteConflict(f"step {step.pk} already {step.state}")
+
+    now = timezone.now()
+    status = ApprovalRouteInstance.STATUS_REJECTED
+    projection = _projection(status=status, role=step.role)
+    _claim_route(route, expected_version=version, status=status, rejected_at=now, **projection)
 
     step.state = ApprovalRouteStepInstance.STATE_REJECTED
     step.reject_reason = reason or ""
-    step.acted_at = timezone.now()
+    step.acted_at = now
     step.acted_ip = acted_ip or None
     step.acted_device = acted_device
     step.acted_anon_id = acted_anon_id
@@ -170,8 +339,7 @@ def reject_current_step(
         "state", "reject_reason", "acted_at", "acted_ip", "acted_device", "acted_anon_id"
     ])
 
-    route.status = ApprovalRouteInstance.STATUS_REJECTED
-    route.rejected_at = timezone.now()
-    route.save(update_fields=["status", "rejected_at", "updated_at"])
+    invalidate_pdf_on_commit(route)
+    enqueue_final_pdf_on_commit(route)
 
     return step
@@ -0,0 +1,352 @@
+import html
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+
+from approvals.models import ApprovalRequest
+
+from .models import ApprovalAttachment, ApprovalSearchDocument
+
+DOC_TABLE = ApprovalSearchDocument._meta.db_table
+FTS_TABLE = "approvals_v2_search_fts"
+BIGRAM_TABLE = "approvals_v2_search_bigram"
+FTS_COLUMNS = ("title", "department", "name", "body", "attachments")
+
+# 스니펫 강조 표시 (본문을 escape한 뒤 <mark>로 바꾼다)
+_MARK_OPEN = "\x02"
+_MARK_CLOSE = "\x03"
+SNIPPET_CHARS = 80
+
+# SQLite FTS5: 외부 content 테이블(DOC_TABLE)을 트리거로 따라가는 trigram 색인
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {", ".join(FTS_COLUMNS)},
+        content='{DOC_TABLE}', content_rowid='approval_id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.approval_id, {", ".join("new." + c for c in FTS_COLUMNS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.approval_id, {", ".join("old." + c for c in FTS_COLUMNS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.approval_id, {", ".join("old." + c for c in FTS_COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.approval_id, {", ".join("new." + c for c in FTS_COLUMNS)});
+    END
+    """,
+]
+SQLITE_FTS_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# SQLite FTS5: ngrams 컬럼(단어별 2-gram)을 토큰 단위로 색인 → trigram이 못 찾는 2글자 검색어용
+SQLITE_BIGRAM_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5(
+        ngrams,
+        content='{DOC_TABLE}', content_rowid='approval_id', tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}(rowid, ngrams) VALUES (new.approval_id, new.ngrams);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}, rowid, ngrams) VALUES ('delete', old.approval_id, old.ngrams);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}, rowid, ngrams) VALUES ('delete', old.approval_id, old.ngrams);
+        INSERT INTO {BIGRAM_TABLE}(rowid, ngrams) VALUES (new.approval_id, new.ngrams);
+    END
+    """,
+]
+SQLITE_BIGRAM_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_au",
+    f"DROP TABLE IF EXISTS {BIGRAM_TABLE}",
+]
+
+# Postgres: 2-gram 문자열의 tsvector GIN 인덱스
+POSTGRES_INDEX_SQL = [
+    f"CREATE INDEX IF NOT EXISTS {DOC_TABLE}_ngrams_gin ON {DOC_TABLE} USING gin (to_tsvector('simple', ngrams))",
+]
+POSTGRES_INDEX_DROP_SQL = [f"DROP INDEX IF EXISTS {DOC_TABLE}_ngrams_gin"]
+
+
+def html_to_text(value: str) -> str:
+    return " ".join(html.unescape(strip_tags(value or "")).split())
+
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def ngrams(text: str, n: int = 2) -> str:
+    """
+    단어별 n-gram (한글은 띄어쓰기와 무관하게 부분 일치가 필요하므로)
+    '회의비 지출' -> '회의 의비 지출'
+    단어는 문자/숫자 연속 구간 (FTS5 unicode61 토큰 경계와 같게)
+    """
+    out = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) <= n:
+            out.append(word)
+        else:
+            out.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return " ".join(out)
+
+
+def document_fields(*, title: str, department: str, name: str, content: str, attachment_names) -> dict:
+    """
+    색인 행 값 (마이그레이션 백필에서도 사용)
+    """
+    fields = {
+        "title": title or "",
+        "department": department or "",
+        "name": name or "",
+        "body": html_to_text(content),
+        "attachments": "\n".join(n for n in attachment_names if n),
+    }
+    fields["ngrams"] = ngrams(" ".join(fields.values()))
+    return fields
+
+
+def index_approval(approval) -> None:
+    fields = document_fields(
+        title=approval.title,
+        department=approval.department,
+        name=approval.name,
+        content=approval.content,
+        attachment_names=ApprovalAttachment.objects.filter(approval_id=approval.pk)
+        .order_by("id")
+        .values_list("original_name", flat=True),
+    )
+    ApprovalSearchDocument.objects.update_or_create(approval_id=approval.pk, defaults=fields)
+
+
+def index_approval_id(approval_id) -> None:
+    """
+    품의서가 (cascade 등으로) 이미 지워졌으면 아무것도 하지 않는다.
+    """
+    approval = ApprovalRequest.objects.filter(pk=approval_id).first()
+    if approval is not None:
+        index_approval(approval)
+
+
+def index_approval_on_commit(approval_id) -> None:
+    if approval_id:
+        transaction.on_commit(lambda: index_approval_id(approval_id))
+
+
+_backend = None
+
+
+def search_backend() -> str:
+    """
+    "fts5" / "postgres" / "" (색인 없음 → LIKE)
+    """
+    global _backend
+    if _backend is None:
+        if connection.vendor == "postgresql":
+            _backend = "postgres"
+        elif connection.vendor == "sqlite" and {FTS_TABLE, BIGRAM_TABLE} <= set(
+            connection.introspection.table_names()
+        ):
+            _backend = "fts5"
+        else:
+            _backend = ""
+    return _backend
+
+
+def _terms(q: str) -> list:
+    return [t for t in (q or "").split() if t]
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_terms(q: str):
+    """
+    사용자 입력 -> (trigram MATCH 식, bigram MATCH 식, LIKE로 찾을 단어들)
+    각 단어를 문자열로 감싸 AND (FTS 문법 문자 무력화)
+    - 3글자 이상: trigram 색인
+    - 2글자 (문자/숫자만): ngrams 2-gram 색인
+    - 그 밖(1글자, 기호 섞인 2글자): LIKE
+    """
+    trigram, bigram, like = [], [], []
+    for t in _terms(q):
+        if len(t) >= 3:
+            trigram.append(_quote(t))
+        elif len(t) == 2 and _WORD_RE.fullmatch(t):
+            bigram.append(_quote(t.lower()))
+        else:
+            like.append(t)
+    return " ".join(trigram), " ".join(bigram), like
+
+
+def _like_filter(terms) -> Q:
+    cond = Q()
+    for term in terms:
+        cond &= (
+            Q(title__icontains=term)
+            | Q(department__icontains=term)
+            | Q(name__icontains=term)
+            | Q(search_doc__body__icontains=term)
+            | Q(search_doc__attachments__icontains=term)
+        )
+    return cond
+
+
+def filter_search(qs, q: str):
+    """
+    ApprovalRequest queryset을 검색어로 거른다. (순서는 호출자가 정한다)
+    제목/부서/기안자/본문/첨부 파일명, 여러 단어는 AND
+    """
+    backend = search_backend()
+    if backend == "fts5":
+        trigram, bigram, like = _fts_terms(q)
+        if trigram:
+            qs = qs.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [trigram]))
+        if bigram:
+            qs = qs.filter(id__in=RawSQL(f"SELECT rowid FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH %s", [bigram]))
+        return qs.filter(_like_filter(like))
+    elif backend == "postgres":
+        grams = ngrams(q)
+        if grams:
+            return qs.filter(id__in=RawSQL(
+                f"SELECT approval_id FROM {DOC_TABLE} "
+                f"WHERE to_tsvector('simple', ngrams) @@ plainto_tsquery('simple', %s)",
+                [grams],
+            ))
+    return qs.filter(_like_filter(_terms(q)))
+
+
+def _render_snippet(raw: str) -> str:
+    return escape(raw).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def _plain_snippet(text: str, q: str, width: int = SNIPPET_CHARS) -> str:
+    """
+    첫 일치 위치 주변 width 글자를 잘라 검색어 전체를 강조
+    (FTS snippet()은 토큰 수로 자르므로 trigram에서는 몇 글자밖에 안 남는다)
+    """
+    lowered = text.lower()
+    hits = [(lowered.find(t.lower()), t) for t in _terms(q)]
+    hits = [(pos, t) for pos, t in hits if pos >= 0]
+    if not hits:
+        return ""
+    pos, term = min(hits)
+    start = max(0, pos - width // 2)
+    piece = text[start:start + width]
+    raw = ("…" if start else "") + piece + ("…" if start + width < len(text) else "")
+    for t in _terms(q):
+        raw = _replace_ci(raw, t)
+    return _render_snippet(raw)
+
+
+def _replace_ci(text: str, term: str) -> str:
+    out, lowered, needle, i = [], text.lower(), term.lower(), 0
+    while True:
+        j = lowered.find(needle, i)
+        if j < 0:
+            out.append(text[i:])
+            return "".join(out)
+        out.append(text[i:j] + _MARK_OPEN + text[j:j + len(term)] + _MARK_CLOSE)
+        i = j + len(term)
+
+
+def search_snippets(ids, q: str) -> dict:
+    """
+    return: {approval_id: 강조 표시된 HTML 스니펫} (본문/첨부에서 일치한 문서만)
+    """
+    ids = [int(x) for x in ids]
+    if not ids or not _terms(q):
+        return {}
+
+    out = {}
+    for pk, body, attachments in ApprovalSearchDocument.objects.filter(approval_id__in=ids).values_list(
+        "approval_id", "body", "attachments"
+    ):
+        snippet = _plain_snippet(body, q) or _plain_snippet(attachments.replace("\n", " · "), q)
+        if snippet:
+            out[pk] = snippet
+    return out
+
+
+def search_hits(q: str, *, limit: int = 10) -> list:
+    """
+    검색창 자동완성용 관련도 순 상위 문서
+    return: [{"id", "title", "department", "name", "snippet"}, ...]
+    """
+    if not _terms(q):
+        return []
+
+    backend = search_backend()
+    trigram, bigram, like = _fts_terms(q) if backend == "fts5" else ("", "", None)
+    if trigram and not like:
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            + (f"AND rowid IN (SELECT rowid FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH %s) " if bigram else "")
+            # 제목/부서/기안자 일치에 가중치
+            + f"ORDER BY bm25({FTS_TABLE}, 10.0, 3.0, 3.0, 1.0, 2.0) LIMIT %s"
+        )
+        params = [trigram, *([bigram] if bigram else []), limit]
+    elif bigram and not like:
+        sql = (
+            f"SELECT rowid FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH %s "
+            f"ORDER BY bm25({BIGRAM_TABLE}) LIMIT %s"
+        )
+        params = [bigram, limit]
+    elif backend == "postgres" and ngrams(q):
+        sql = (
+            f"SELECT approval_id FROM {DOC_TABLE}, plainto_tsquery('simple', %s) query "
+            f"WHERE to_tsvector('simple', ngrams) @@ query "
+            f"ORDER BY ts_rank(to_tsvector('simple', ngrams), query) DESC, approval_id DESC LIMIT %s"
+        )
+        params = [ngrams(q), limit]
+    else:
+        ids = list(
+            filter_search(ApprovalRequest.objects.all(), q).order_by("-id").values_list("id", flat=True)[:limit]
+        )
+        sql = None
+
+    if sql:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ids = [row[0] for row in cursor.fetchall()]
+
+    rows = ApprovalRequest.objects.in_bulk(ids)
+    snippets = search_snippets(ids, q)
+    return [
+        {
+            "id": pk,
+            "title": rows[pk].title,
+            "department": rows[pk].department,
+            "name": rows[pk].name,
+            "snippet": snippets.get(pk, ""),
+        }
+        for pk in ids
+        if pk in rows
+    ]
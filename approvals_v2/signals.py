@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from approvals.models import ApprovalRequest
+from approvals.signals import telegram_requested
+
+from .attachments import release_blob
+from .directory import invalidate_directory
+from .models import ApprovalAttachment, TelegramOutbox, TelegramRecipient
+from .route_templates import reset_route_templates
+from .search import index_approval, index_approval_on_commit
+
+
+@receiver(post_delete, sender=ApprovalAttachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    # 첨부 삭제(직접/queryset/품의서 cascade 모두) 시 blob 참조 반납, 마지막 참조면 파일 삭제
+    release_blob(instance.blob_id)
+
+
+@receiver(post_save, sender=ApprovalRequest)
+def index_approval_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_approval(instance)
+
+
+@receiver(post_save, sender=ApprovalAttachment)
+@receiver(post_delete, sender=ApprovalAttachment)
+def index_attachment_search(sender, instance, raw=False, **kwargs):
+    # 품의서 cascade 삭제 중이면 커밋 후 품의서가 없어 index_approval_id가 아무것도 하지 않는다
+    if not raw:
+        index_approval_on_commit(instance.approval_id)
+
+
+@receiver(post_save, sender=TelegramRecipient)
+@receiver(post_delete, sender=TelegramRecipient)
+def invalidate_recipient_directory(sender, **kwargs):
+    # 커밋 전 값을 다른 요청이 다시 캐시하지 않도록 커밋 후에도 한 번 더
+    invalidate_directory()
+    transaction.on_commit(invalidate_directory)
+
+
+@receiver(telegram_requested)
+def enqueue_v1_telegram(sender, *, text, approval, chat_id, event, **kwargs):
+    # v1 알림도 v2와 같은 outbox 워커가 보낸다
+    TelegramOutbox.objects.create(
+        approval=approval,
+        event=event,
+        kind=TelegramOutbox.KIND_DM,
+        chat_id=chat_id,
+        text=text,
+    )
+    return True
+
+
+@receiver(setting_changed)
+def reload_route_templates(sender, setting, **kwargs):
+    if setting == "APPROVAL_ROUTE_TEMPLATES":
+        reset_route_templates()
@@ -1,71 +1,60 @@
+import logging
 import os
-from typing import Optional
 
-import requests
+from approvals.utils.telegram_client import send_message
+
+logger = logging.getLogger(__name__)
 
 
 def _env(name: str) -> str:
     return (os.environ.get(name) or "").strip()
 
 
-def _send_message(*, chat_id: str, text: str) -> bool:
+def _result(ok: bool, error: str = "") -> dict:
+    return {"ok": ok, "error": error}
+
+
+def _send_message(*, chat_id: str, text: str) -> dict:
     """
     텔레그램 sendMessage 호출.
-    실패해도 예외로 서비스가 죽지 않게 하고 False 반환.
+    실패해도 예외로 서비스가 죽지 않게 하고 실패 사유를 돌려준다.
+    return: {"ok": bool, "error": str} (error는 outbox last_error에 기록)
     """
     token = _env("TELEGRAM_BOT_TOKEN")
     if not token:
-        print("⚠️ [TG] missing TELEGRAM_BOT_TOKEN")
-        return False
+        logger.warning("telegram missing TELEGRAM_BOT_TOKEN")
+        return _result(False, "missing TELEGRAM_BOT_TOKEN")
     if not chat_id:
-        print("⚠️ [TG] missing chat_id")
-        return False
-
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    try:
-        r = requests.post(
-            url,
-            data={"chat_id": chat_id, "text": text},
-            timeout=5,
-        )
-        print(f"🔥 TG_HTTP status={r.status_code} body={r.text[:300]}")
-        if r.status_code != 200:
-            print(f"⚠️ [TG] sendMessage HTTP {r.status_code}: {r.text[:200]}")
-            return False
-        data = r.json()
-        if not data.get("ok"):
-            print(f"⚠️ [TG] sendMessage not ok: {str(data)[:200]}")
-            return False
-        return True
-    except Exception as e:
-        print(f"⚠️ [TG] sendMessage exception: {e}")
-        return False
-
-
-def send_dm(chat_id: str, text: str) -> bool:
+        logger.warning("telegram missing chat_id")
+        return _result(False, "missing chat_id")
+
+    res = send_message(token=token, chat_id=chat_id, data={"chat_id": chat_id, "text": text})
+    if res["error"]:
+        logger.warning("telegram sendMessage exception chat_id=%s: %s", chat_id, res["error"])
+        return _result(False, res["error"])
+    if res["status"] != 200:
+        logger.warning("telegram sendMessage HTTP %s chat_id=%s: %s", res["status"], chat_id, res["text"][:200])
+        return _result(False, f"HTTP {res['status']}: {res['text'][:200]}")
+    if not res["ok"]:
+        logger.warning("telegram sendMessage not ok chat_id=%s: %s", chat_id, str(res["data"])[:200])
+        return _result(False, f"not ok: {str(res['data'])[:200]}")
+    return _result(True)
+
+
+def send_dm(chat_id: str, text: str) -> dict:
     """
-    v2 전용 DM 발송.
+    v2 전용 DM 발송. return: {"ok", "error"}
     """
-    print("🔥 TG_RUNTIME_ENV:",
-      "BOT=", bool(os.environ.get("TELEGRAM_BOT_TOKEN")),
-      "GRP=", bool(os.environ.get("TELEGRAM_GROUP_CHAT_ID")),
-      "CHAT=", bool(os.environ.get("TELEGRAM_CHAT_ID")))
-    
-    print(f"📩 [DM] to={chat_id} text={text}")
-    ok = _send_message(chat_id=str(chat_id).strip(), text=text)
-    return ok
+    logger.debug("telegram dm to=%s chars=%s", chat_id, len(text))
+    return _send_message(chat_id=str(chat_id).strip(), text=text)
 
 
-def send_group(text: str) -> bool:
+def send_group(text: str) -> dict:
     """
-    v2 전용 단톡방 발송.
+    v2 전용 단톡방 발송. return: {"ok", "error"}
     """
-    print("🔥 TG_RUNTIME_ENV:",
-      "BOT=", bool(os.environ.get("TELEGRAM_BOT_TOKEN")),
-      "GRP=", bool(os.environ.get("TELEGRAM_GROUP_CHAT_ID")),
-      "CHAT=", bool(os.environ.get("TELEGRAM_CHAT_ID")))
-    
     group_chat_id = _env("TELEGRAM_GROUP_CHAT_ID")
-    print(f"📣 [GROUP] to={group_chat_id or '(missing TELEGRAM_GROUP_CHAT_ID)'} text={text}")
-    ok = _send_message(chat_id=group_chat_id, text=text)
-    return ok
\ No newline at end of file
+    if not group_chat_id:
+        logger.warning("telegram missing TELEGRAM_GROUP_CHAT_ID")
+    logger.debug("telegram group to=%s chars=%s", group_chat_id, len(text))
+    return _send_message(chat_id=group_chat_id, text=text)
@@ -0,0 +1,25 @@
+from django import template
+
+from approvals_v2.downloads import attachment_url as _attachment_url, signed_media_url
+
+register = template.Library()
+
+
+@register.filter
+def signed_url(fieldfile):
+    """
+    {{ f.thumbnail|signed_url }} → 짧게 유효한 서명 주소 (프록시가 파일 전송)
+    """
+    if not fieldfile:
+        return ""
+    return signed_media_url(fieldfile.name)
+
+
+@register.filter
+def attachment_url(attachment):
+    """
+    {{ f|attachment_url }} → 서명된 첨부 다운로드 주소 (품의서 화면을 연 사람만 받게)
+    """
+    if not attachment:
+        return ""
+    return _attachment_url(attachment)
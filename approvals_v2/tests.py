@@ -1,3 +1,1246 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from approvals.models import ApprovalRequest
+from approvals.utils.telegram import enqueue_telegram
+
+from . import handoff, pdf, pdf_renderer, views
+from .attachments import create_attachment, release_blob
+from .chunked_upload import (
+    STALE_WRITE_SECONDS,
+    OffsetMismatch,
+    UploadError,
+    complete_session,
+    part_path,
+    start_session,
+    write_chunk,
+)
+from .directory import RecipientDirectory, get_directory, invalidate_directory
+from .downloads import attachment_url
+from .filters import count_by_status
+from .images import is_image_name, make_thumbnail, normalize_image, normalize_upload
+from .inbox import inbox_summary, pending_for_role
+from .models import (
+    ApprovalAttachment,
+    ApprovalRouteInstance,
+    ApprovalRouteStepInstance,
+    AttachmentBlob,
+    PdfRenderJob,
+    TelegramOutbox,
+    TelegramRecipient,
+    TempUploadImage,
+    UploadSession,
+)
+from .notifications import send_messages
+from .outbox import claim_due_messages, mark_result, process_outbox, renew_locks, stale_lock_seconds
+from .pagination import keyset_page, parse_page_token
+from .pdf import (
+    current_cache_path,
+    get_or_render_pdf,
+    get_render_pool,
+    pdf_version,
+    store_pdf,
+    submit_render,
+    write_pdf_file,
+)
+from .pdf_jobs import STALE_RUNNING_SECONDS, claim_render_jobs, enqueue_pdf_render, process_render_jobs
+from .pdf_renderer import LocalUrlFetcher, get_renderer, warm_renderer
+from .route_snapshot import RouteSnapshot, load_route_snapshot
+from .route_templates import NOTIFY_ADMIN_START, NOTIFY_NORMAL, find_route_template, route_templates
+from .routes import (
+    RouteConflict,
+    approve_current_step,
+    approve_current_steps,
+    build_route_for_approval,
+    reject_current_step,
+)
+from .search import filter_search, index_approval, search_backend, search_hits, search_snippets
+from .upload_sweeper import referenced_upload_names, sweep_temp_uploads
+
+
+def _image_file(name, size, *, mode="RGB", fmt="JPEG", orientation=None) -> ContentFile:
+    from PIL import Image
+
+    img = Image.new(mode, size, "red")
+    buf = io.BytesIO()
+    if orientation:
+        exif = img.getexif()
+        exif[0x0112] = orientation
+        img.save(buf, format=fmt, exif=exif)
+    else:
+        img.save(buf, format=fmt)
+    return ContentFile(buf.getvalue(), name=name)
+
+
+def _image_size(f) -> tuple:
+    from PIL import Image
+
+    f.seek(0)
+    with Image.open(f) as img:
+        return img.format, img.size
+
+
+def _outbox(**kwargs) -> TelegramOutbox:
+    fields = {"kind": TelegramOutbox.KIND_DM, "chat_id": "100", "text": "hello"}
+    fields.update(kwargs)
+    return TelegramOutbox.objects.create(**fields)
+
+
+@override_settings(TELEGRAM_FANOUT_CONCURRENCY=1)
+class OutboxTests(TestCase):
+    def test_claim_takes_each_message_once(self):
+        row = _outbox()
+
+        self.assertEqual([r.pk for r in claim_due_messages()], [row.pk])
+        self.assertEqual(claim_due_messages(), [])
+
+        row.refresh_from_db()
+        self.assertEqual(row.status, TelegramOutbox.STATUS_SENDING)
+
+    def test_stale_lock_is_reclaimed_only_after_window(self):
+        now = timezone.now()
+        window = stale_lock_seconds()
+        fresh = _outbox(status=TelegramOutbox.STATUS_SENDING, locked_at=now - timedelta(seconds=window - 30))
+        stale = _outbox(status=TelegramOutbox.STATUS_SENDING, locked_at=now - timedelta(seconds=window + 30))
+
+        self.assertEqual([r.pk for r in claim_due_messages()], [stale.pk])
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, TelegramOutbox.STATUS_SENDING)
+
+    @override_settings(TELEGRAM_RATE_WAIT_TIMEOUT=600, TELEGRAM_MAX_429_RETRIES=3)
+    def test_stale_window_covers_rate_limited_send(self):
+        self.assertGreater(stale_lock_seconds(), 4 * 600)
+
+    def test_renew_locks_only_touches_sending_rows(self):
+        old = timezone.now() - timedelta(hours=1)
+        sending = _outbox(status=TelegramOutbox.STATUS_SENDING, locked_at=old)
+        sent = _outbox(status=TelegramOutbox.STATUS_SENT, locked_at=old)
+
+        self.assertEqual(renew_locks([sending.pk, sent.pk]), 1)
+        sending.refresh_from_db()
+        sent.refresh_from_db()
+        self.assertGreater(sending.locked_at, old)
+        self.assertEqual(sent.locked_at, old)
+
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        row = _outbox()
+        with self.settings(TELEGRAM_OUTBOX_MAX_ATTEMPTS=2):
+            mark_result(row, False, "HTTP 400: chat not found")
+            self.assertEqual(row.status, TelegramOutbox.STATUS_PENDING)
+            self.assertGreater(row.next_attempt_at, timezone.now())
+
+            mark_result(row, False, "HTTP 400: chat not found")
+            self.assertEqual(row.status, TelegramOutbox.STATUS_FAILED)
+        self.assertEqual(row.last_error, "HTTP 400: chat not found")
+
+    def test_process_records_send_error_and_renews_remaining_locks(self):
+        first = _outbox(chat_id="1")
+        second = _outbox(chat_id="2")
+        seen = {}
+
+        def fake_send(message):
+            # 첫 건 결과가 기록되면서 둘째 건의 선점이 갱신되어 있어야 한다
+            seen[message["chat_id"]] = TelegramOutbox.objects.get(pk=second.pk).locked_at
+            if message["chat_id"] == "2":
+                return {"ok": False, "error": "HTTP 403: bot was blocked by the user"}
+            return {"ok": True, "error": ""}
+
+        with mock.patch("approvals_v2.notifications.send_planned_message", side_effect=fake_send):
+            result = process_outbox()
+
+        self.assertEqual(result, {"claimed": 2, "sent": 1, "failed": 1})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, TelegramOutbox.STATUS_SENT)
+        self.assertEqual(second.status, TelegramOutbox.STATUS_PENDING)
+        self.assertEqual(second.last_error, "HTTP 403: bot was blocked by the user")
+        self.assertGreater(seen["2"], seen["1"])
+
+    def test_v1_notification_is_queued_through_signal(self):
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+
+        with mock.patch.dict(os.environ, {"TELEGRAM_CHAT_ID": "42"}):
+            enqueue_telegram("signed", approval=approval)
+
+        row = TelegramOutbox.objects.get()
+        self.assertEqual((row.chat_id, row.event, row.text, row.approval_id), ("42", "v1_sign", "signed", approval.id))
+        self.assertEqual(row.status, TelegramOutbox.STATUS_PENDING)
+
+    def test_send_exception_is_recorded(self):
+        row = _outbox()
+        with mock.patch("approvals_v2.notifications.send_planned_message", side_effect=RuntimeError("boom")):
+            with self.assertLogs("approvals_v2.notifications", "ERROR"):
+                process_outbox()
+
+        row.refresh_from_db()
+        self.assertEqual(row.last_error, "RuntimeError: boom")
+
+
+class HandoffTests(TestCase):
+    def tearDown(self):
+        handoff._cache().clear()
+
+    def test_puts_keep_every_entry_and_pop_in_order(self):
+        for i in range(3):
+            handoff.put_upload("tok", f"/u/{i}", upload_id=i)
+
+        self.assertEqual(handoff.latest_upload("tok")["upload_id"], 2)
+        self.assertEqual([handoff.pop_upload("tok")["upload_id"] for _ in range(3)], [0, 1, 2])
+        self.assertIsNone(handoff.pop_upload("tok"))
+
+    def test_put_skips_slot_taken_by_concurrent_put(self):
+        # 다른 워커가 tail 힌트를 올리기 전에 같은 자리를 먼저 잡은 상황
+        handoff._cache().add(handoff._entry_key("tok", 1), {"image_url": "/other", "seq": 1})
+
+        entry = handoff.put_upload("tok", "/mine")
+
+        self.assertEqual(entry["seq"], 2)
+        self.assertEqual([e["image_url"] for _, e in handoff._entries("tok")], ["/other", "/mine"])
+
+    def test_keeps_only_recent_entries(self):
+        for i in range(handoff.MAX_ENTRIES_PER_TOKEN + 5):
+            handoff.put_upload("tok", f"/u/{i}")
+
+        entries = handoff._entries("tok")
+        self.assertEqual(len(entries), handoff.MAX_ENTRIES_PER_TOKEN)
+        self.assertEqual(entries[0][1]["image_url"], "/u/5")
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(CHUNKED_UPLOAD_DIR=self.tmp, MEDIA_ROOT=self.tmp)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_chunks_assemble_into_attachment(self):
+        session = start_session(name="a.txt", size=10)
+        self.assertEqual(write_chunk(session, offset=0, stream=io.BytesIO(b"hello")), 5)
+        self.assertEqual(write_chunk(session, offset=5, stream=io.BytesIO(b"world")), 10)
+
+        attachment = complete_session(session)
+        with attachment.file.open("rb") as fp:
+            self.assertEqual(fp.read(), b"helloworld")
+        self.assertFalse(part_path(session).exists())
+
+    def test_duplicate_chunk_does_not_touch_part_file(self):
+        session = start_session(name="a.txt", size=10)
+        stale = UploadSession.objects.get(pk=session.pk)
+        write_chunk(session, offset=0, stream=io.BytesIO(b"hello"))
+        write_chunk(session, offset=5, stream=io.BytesIO(b"world"))
+
+        # 재전송된 첫 조각: 진 쪽은 .part를 쓰거나 자르지 않는다
+        stale.received = 0
+        with self.assertRaises(OffsetMismatch) as cm:
+            write_chunk(stale, offset=0, stream=io.BytesIO(b"HELLO-AGAIN"))
+
+        self.assertEqual(cm.exception.offset, 10)
+        self.assertEqual(part_path(session).read_bytes(), b"helloworld")
+        self.assertEqual(list(part_path(session).parent.glob("*.chunk")), [])
+
+    def test_chunk_is_rejected_while_another_request_writes(self):
+        session = start_session(name="a.txt", size=10)
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.STATUS_WRITING)
+
+        with self.assertRaises(OffsetMismatch):
+            write_chunk(session, offset=0, stream=io.BytesIO(b"hello"))
+        self.assertEqual(part_path(session).read_bytes(), b"")
+
+        with self.assertRaises(UploadError):
+            complete_session(UploadSession.objects.get(pk=session.pk))
+
+    def test_stale_writer_claim_is_taken_over(self):
+        session = start_session(name="a.txt", size=5)
+        UploadSession.objects.filter(pk=session.pk).update(
+            status=UploadSession.STATUS_WRITING,
+            updated_at=timezone.now() - timedelta(seconds=STALE_WRITE_SECONDS + 1),
+        )
+
+        self.assertEqual(write_chunk(session, offset=0, stream=io.BytesIO(b"hello")), 5)
+        session.refresh_from_db()
+        self.assertEqual(session.status, UploadSession.STATUS_UPLOADING)
+
+    def test_complete_twice_returns_same_attachment(self):
+        session = start_session(name="a.txt", size=5)
+        stale = UploadSession.objects.get(pk=session.pk)
+        write_chunk(session, offset=0, stream=io.BytesIO(b"hello"))
+        stale.received = 5
+
+        first = complete_session(session)
+        self.assertEqual(complete_session(stale).pk, first.pk)
+
+
+class AttachmentBlobTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.tmp)
+        self.override.enable()
+        self.approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _attach(self, data=b"same bytes", name="a.txt"):
+        return create_attachment(self.approval, ContentFile(data, name=name))
+
+    def test_same_content_is_stored_once(self):
+        first = self._attach(name="a.txt")
+        second = self._attach(name="b.txt")
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 2)
+        self.assertEqual(second.original_name, "b.txt")
+
+    def test_file_is_deleted_with_last_reference(self):
+        first = self._attach()
+        second = self._attach()
+        name = first.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_cascade_delete_releases_blobs(self):
+        self._attach()
+        self._attach(b"other bytes")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.approval.delete()
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+    def test_release_keeps_blob_still_referenced(self):
+        attachment = self._attach()
+        # 참조 수가 어긋나 있어도 실제로 쓰는 첨부가 있으면 지우지 않는다
+        AttachmentBlob.objects.update(ref_count=1)
+
+        self.assertFalse(release_blob(attachment.blob_id))
+        self.assertTrue(AttachmentBlob.objects.filter(pk=attachment.blob_id).exists())
+        self.assertTrue(ApprovalAttachment.objects.filter(pk=attachment.pk).exists())
+
+    def test_acquire_does_not_reuse_blob_released_meanwhile(self):
+        first = self._attach()
+        stale = AttachmentBlob.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        # 잠그고 읽은 직후 다른 요청이 blob을 지운 상황: 읽은 행은 남아 있지만 update는 0건
+        locked = mock.Mock()
+        locked.filter.return_value.first.return_value = stale
+        with mock.patch.object(AttachmentBlob.objects, "select_for_update", return_value=locked):
+            second = self._attach()
+
+        blob = AttachmentBlob.objects.get()
+        self.assertNotEqual(blob.pk, stale.pk)
+        self.assertEqual((second.blob_id, blob.ref_count), (blob.pk, 1))
+        self.assertTrue(default_storage.exists(second.file.name))
+
+    def test_photo_is_stored_normalized_with_thumbnail(self):
+        attachment = self._attach(_image_file("photo.png", (3000, 1500)).read(), name="photo.png")
+
+        self.assertEqual(attachment.original_name, "photo.png")
+        self.assertTrue(attachment.file.name.endswith(".jpg"))
+        self.assertEqual(_image_size(attachment.file)[1], (2000, 1000))
+        self.assertEqual(_image_size(attachment.thumbnail)[1], (480, 240))
+
+    def test_download_needs_signed_url(self):
+        attachment = self._attach(name="report.txt")
+
+        response = self.client.get(attachment_url(attachment))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"same bytes")
+        response.close()
+
+        self.assertEqual(self.client.get(f"/v2/attachments/{attachment.pk}/").status_code, 404)
+
+    def test_expired_download_url_is_refused(self):
+        url = attachment_url(self._attach())
+
+        with override_settings(APPROVAL_SIGNED_URL_TTL=-1):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class ImageNormalizeTests(SimpleTestCase):
+    def test_photo_is_rotated_shrunk_and_reencoded(self):
+        # 휴대폰 세로 사진: 가로로 저장되고 EXIF로 90도 회전 표시
+        photo = _image_file("IMG_0001.jpg", (400, 200), orientation=6)
+
+        normalized = normalize_image(photo, max_edge=100)
+
+        self.assertEqual(normalized.name, "IMG_0001.jpg")
+        self.assertEqual(_image_size(normalized), ("JPEG", (50, 100)))
+
+    def test_transparent_image_stays_png(self):
+        normalized = normalize_image(_image_file("stamp.png", (300, 300), mode="RGBA", fmt="PNG"), max_edge=120)
+
+        self.assertEqual(normalized.name, "stamp.png")
+        self.assertEqual(_image_size(normalized), ("PNG", (120, 120)))
+
+    @override_settings(IMAGE_THUMB_EDGE=64)
+    def test_thumbnail_uses_thumb_edge(self):
+        thumb = make_thumbnail(_image_file("scan.bmp", (640, 320), fmt="BMP"))
+
+        self.assertEqual(thumb.name, "scan_thumb.jpg")
+        self.assertEqual(_image_size(thumb), ("JPEG", (64, 32)))
+
+    def test_non_image_upload_is_left_alone(self):
+        doc = ContentFile(b"%PDF-1.4", name="report.pdf")
+        fake = ContentFile(b"not an image", name="photo.jpg")
+
+        self.assertIs(normalize_upload(doc), doc)
+        self.assertIs(normalize_upload(fake), fake)
+        self.assertEqual(fake.tell(), 0)
+        self.assertIsNone(make_thumbnail(fake))
+
+    def test_image_name(self):
+        self.assertTrue(is_image_name("a.JPG"))
+        self.assertTrue(is_image_name("scan.heic"))
+        self.assertFalse(is_image_name("a.pdf"))
+        self.assertFalse(is_image_name(""))
+
+
+class ListProjectionTests(TestCase):
+    def _route(self, template_code="NORMAL") -> ApprovalRouteInstance:
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        return build_route_for_approval(approval=approval, template_code=template_code)
+
+    def _projection(self, route) -> tuple:
+        route.refresh_from_db()
+        return route.current_role, route.current_step_label
+
+    def test_projection_follows_transitions(self):
+        route = self._route()
+        self.assertEqual(self._projection(route), ("admin", "총무 결재 대기"))
+
+        approve_current_step(route=route)
+        self.assertEqual(self._projection(route), ("chairman", "회장 결재 대기"))
+
+        approve_current_step(route=route)
+        self.assertEqual(self._projection(route), ("chairman", "완료"))
+
+    def test_projection_on_reject(self):
+        route = self._route()
+        reject_current_step(route=route, reason="no")
+        self.assertEqual(self._projection(route), ("admin", "반려"))
+
+    def test_backfill_matches_live_projection(self):
+        routes = [self._route(), self._route(), self._route("ADMIN_FINAL")]
+        approve_current_step(route=routes[1])
+        reject_current_step(route=routes[2], reason="no")
+        expected = [self._projection(r) for r in routes]
+        ApprovalRouteInstance.objects.update(current_role="", current_step_label="")
+
+        migration = import_module("approvals_v2.migrations.0008_route_list_projection")
+        migration.backfill_list_projection(apps, None)
+
+        self.assertEqual([self._projection(r) for r in routes], expected)
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        self._route()
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get("/v2/")
+
+        for template_code in ("NORMAL", "ADMIN_FINAL", "ADMIN_TO_CHAIR", "ADMIN_TO_AUDITOR_CHAIR"):
+            self._route(template_code)
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get("/v2/")
+        self.assertContains(response, "감사 결재 대기")
+
+
+class RecipientDirectoryTests(TestCase):
+    def setUp(self):
+        invalidate_directory()
+        self.addCleanup(invalidate_directory)
+
+    def _recipient(self, role="admin", name="kim", **kwargs) -> TelegramRecipient:
+        return TelegramRecipient.objects.create(role=role, name=name, chat_id="1", **kwargs)
+
+    def test_index_skips_inactive_and_orders_options_by_name(self):
+        park = self._recipient(name="park")
+        kim = self._recipient(name="kim", department="ops")
+        self._recipient(name="lee", is_active=False)
+
+        directory = RecipientDirectory(TelegramRecipient.objects.all())
+
+        self.assertEqual(directory.active("admin"), [park, kim])
+        self.assertEqual(directory.first_active("admin", name="kim"), kim)
+        self.assertIsNone(directory.first_active("admin", name="lee"))
+        self.assertIsNone(directory.first_active("chairman"))
+        self.assertEqual(
+            directory.form_options("admin"),
+            [{"role": "admin", "name": "kim", "department": "ops"}, {"role": "admin", "name": "park", "department": ""}],
+        )
+
+    def test_cache_is_shared_until_recipient_changes(self):
+        recipient = self._recipient()
+        first = get_directory()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_directory(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipient.is_active = False
+            recipient.save()
+        self.assertIsNone(get_directory().first_active("admin"))
+
+    @override_settings(RECIPIENT_DIRECTORY_TTL=60)
+    def test_changes_from_other_workers_show_up_after_ttl(self):
+        now = time.monotonic()
+        with mock.patch("approvals_v2.directory.time.monotonic", return_value=now) as monotonic:
+            get_directory()
+            # 다른 워커의 저장은 이 프로세스의 signal을 거치지 않는다
+            TelegramRecipient.objects.bulk_create([TelegramRecipient(role="admin", name="kim", chat_id="1")])
+
+            monotonic.return_value = now + 59
+            self.assertIsNone(get_directory().first_active("admin"))
+            monotonic.return_value = now + 60
+            self.assertEqual(get_directory().first_active("admin").name, "kim")
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        self.ids = [
+            ApprovalRequest.objects.create(department="d", name="n", title=f"t{i}", content="c").id
+            for i in range(7)
+        ]
+        self.qs = ApprovalRequest.objects.all()
+
+    def _ids(self, page):
+        return [a.id for a in page["items"]]
+
+    def test_walks_forward_and_back(self):
+        newest = self.ids[::-1]
+
+        first = keyset_page(self.qs, "", per_page=3)
+        self.assertEqual(self._ids(first), newest[:3])
+        self.assertEqual(first["prev"], "")
+
+        second = keyset_page(self.qs, first["next"], per_page=3)
+        self.assertEqual(self._ids(second), newest[3:6])
+
+        last = keyset_page(self.qs, second["next"], per_page=3)
+        self.assertEqual(self._ids(last), newest[6:])
+        self.assertEqual(last["next"], "")
+
+        back = keyset_page(self.qs, last["prev"], per_page=3)
+        self.assertEqual(self._ids(back), newest[3:6])
+        self.assertEqual(back["next"], second["next"])
+
+    def test_prev_at_newest_end_returns_full_first_page(self):
+        newest = self.ids[::-1]
+        page = keyset_page(self.qs, f"a{newest[1]}", per_page=3)
+
+        self.assertEqual(self._ids(page), newest[:3])
+        self.assertEqual(page["prev"], "")
+
+    def test_token_is_stable_when_new_documents_arrive(self):
+        first = keyset_page(self.qs, "", per_page=3)
+        before = self._ids(keyset_page(self.qs, first["next"], per_page=3))
+
+        ApprovalRequest.objects.create(department="d", name="n", title="new", content="c")
+        self.assertEqual(self._ids(keyset_page(self.qs, first["next"], per_page=3)), before)
+
+    def test_bad_token_means_first_page(self):
+        self.assertEqual(parse_page_token("x12"), (None, None))
+        self.assertEqual(parse_page_token("b"), (None, None))
+        self.assertEqual(self._ids(keyset_page(self.qs, "b-1", per_page=3)), self.ids[::-1][:3])
+
+    def test_count_by_status_ignores_status_filter(self):
+        ApprovalRouteInstance.objects.create(
+            approval_id=self.ids[0], template_code="NORMAL", status=ApprovalRouteInstance.STATUS_COMPLETED
+        )
+
+        counts = count_by_status(self.qs, status="completed")
+        self.assertEqual(counts["all"], 7)
+        self.assertEqual(counts["completed"], 1)
+        self.assertEqual(counts["in_progress"], 0)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.meeting = ApprovalRequest.objects.create(
+            department="총무팀", name="김", title="회의비 지출", content="<p>분기 testing 결과 보고</p>"
+        )
+        self.travel = ApprovalRequest.objects.create(
+            department="영업팀", name="이", title="출장 신청", content="<p>부산 출장</p>"
+        )
+        for approval in (self.meeting, self.travel):
+            index_approval(approval)
+        self.qs = ApprovalRequest.objects.all()
+
+    def _ids(self, q):
+        return sorted(filter_search(self.qs, q).values_list("id", flat=True))
+
+    def test_uses_fts_index(self):
+        self.assertEqual(search_backend(), "fts5")
+
+    def test_trigram_and_two_char_terms(self):
+        self.assertEqual(self._ids("회의비"), [self.meeting.id])
+        self.assertEqual(self._ids("의비"), [self.meeting.id])
+        self.assertEqual(self._ids("출장"), [self.travel.id])
+        self.assertEqual(self._ids("회의비 출장"), [])
+        self.assertEqual([h["id"] for h in search_hits("회의")], [self.meeting.id])
+
+    def test_single_char_term_falls_back_to_like(self):
+        self.assertEqual(self._ids("팀"), [self.meeting.id, self.travel.id])
+        self.assertEqual(self._ids("출장 이"), [self.travel.id])
+
+    def test_like_backend_matches_fts(self):
+        with mock.patch("approvals_v2.search.search_backend", return_value=""):
+            self.assertEqual(self._ids("의비"), [self.meeting.id])
+            self.assertEqual(self._ids("testing"), [self.meeting.id])
+            self.assertEqual([h["id"] for h in search_hits("출장")], [self.travel.id])
+
+    def test_snippet_marks_whole_term(self):
+        snippets = search_snippets([self.meeting.id, self.travel.id], "testing")
+
+        self.assertEqual(list(snippets), [self.meeting.id])
+        self.assertIn("<mark>testing</mark>", snippets[self.meeting.id])
+        self.assertIn("결과 보고", snippets[self.meeting.id])
+
+
+class RouteVersionTests(TestCase):
+    def _route(self, template_code="NORMAL") -> ApprovalRouteInstance:
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        return build_route_for_approval(approval=approval, template_code=template_code)
+
+    def _pending(self, route) -> list:
+        return list(
+            route.steps.filter(state=ApprovalRouteStepInstance.STATE_PENDING).order_by("order").values_list("order", flat=True)
+        )
+
+    def test_stale_version_is_rejected(self):
+        route = self._route()
+        seen = route.version
+        approve_current_step(route=route)
+
+        again = ApprovalRouteInstance.objects.get(pk=route.pk)
+        with self.assertRaises(RouteConflict):
+            approve_current_step(route=again, expected_version=seen)
+
+        again.refresh_from_db()
+        self.assertEqual(again.version, seen + 1)
+        self.assertEqual(again.current_order, 3)
+        self.assertEqual(self._pending(again), [3])
+
+    def test_double_post_redirects_to_already(self):
+        route = self._route()
+        url = f"/v2/{route.approval_id}/approve/"
+
+        first = self.client.post(url, {"version": route.version})
+        second = self.client.post(url, {"version": route.version})
+
+        self.assertEqual(first.url, f"/approval/v2/{route.approval_id}/")
+        self.assertEqual(second.url, f"/approval/v2/{route.approval_id}/?already=1")
+        self.assertEqual(self._pending(route), [3])
+
+    @override_settings(DEBUG=True)
+    def test_debug_endpoints_handle_conflict(self):
+        # 테스트 엔드포인트 URL은 DEBUG로 기동할 때만 등록되므로 뷰를 직접 부른다
+        route = self._route("ADMIN_FINAL")
+        factory = RequestFactory()
+        # 토큰/chat_id가 없는 테스트 환경이라 발송은 경고만 남기고 건너뛴다
+        with self.assertLogs("approvals_v2.telegram", "WARNING"):
+            views.v2_test_approve_and_notify(factory.get("/"), route.approval_id)
+
+        again = views.v2_test_approve_and_notify(factory.get("/"), route.approval_id)
+        rejected = views.v2_test_reject(factory.post("/"), route.approval_id)
+
+        self.assertEqual(again.url, f"/approval/v2/{route.approval_id}/?already=1")
+        self.assertEqual(rejected.url, f"/approval/v2/{route.approval_id}/?already=1")
+        route.refresh_from_db()
+        self.assertEqual(route.status, ApprovalRouteInstance.STATUS_COMPLETED)
+
+    def test_batch_conflict_rolls_back_every_route(self):
+        routes = [self._route(), self._route()]
+        original = RouteSnapshot.from_route
+
+        def from_route(route):
+            # 읽은 뒤 다른 요청이 두 번째 문서를 전이시킨 것처럼 version을 올린다
+            if route.pk == routes[1].pk:
+                ApprovalRouteInstance.objects.filter(pk=route.pk).update(version=F("version") + 1)
+            return original(route)
+
+        with mock.patch("approvals_v2.routes.RouteSnapshot.from_route", side_effect=from_route):
+            with self.assertRaises(RouteConflict):
+                approve_current_steps(approval_ids=[r.approval_id for r in routes], role="admin")
+
+        for route in routes:
+            self.assertEqual(self._pending(route), [2, 3])
+
+    def test_inbox_retry_skips_document_approved_meanwhile(self):
+        routes = [self._route(), self._route()]
+        original = views._batch_approve
+        calls = []
+
+        def batch_approve(request, **kwargs):
+            calls.append(kwargs["ids"])
+            if len(calls) == 1:
+                # 첫 시도 중 다른 요청이 첫 문서를 먼저 승인함
+                approve_current_step(route=ApprovalRouteInstance.objects.get(pk=routes[0].pk))
+                raise RouteConflict("changed")
+            return original(request, **kwargs)
+
+        with mock.patch("approvals_v2.views._batch_approve", side_effect=batch_approve):
+            response = self.client.post(
+                "/v2/inbox/admin/approve/", {"approval_ids": [r.approval_id for r in routes]}
+            )
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(response.url, "/approval/v2/inbox/admin/?approved=1&skipped=1")
+        for route in routes:
+            self.assertEqual(self._pending(route), [3])
+
+    def test_resubmit_starts_with_newer_version(self):
+        route = self._route()
+        approval = route.approval
+        approval.refresh_from_db()
+
+        new_route = views.rebuild_route_after_edit(RequestFactory().post("/"), approval, "NORMAL")
+
+        self.assertEqual(new_route.version, route.version + 1)
+        with self.assertRaises(RouteConflict):
+            approve_current_step(route=new_route, expected_version=route.version)
+
+
+LONG_ROUTE = {"code": "LONG", "label": "긴 결재선", "roles": ["drafter", "admin", "auditor", "chairman"]}
+
+
+class RouteTemplateTests(TestCase):
+    def _build(self, template_code) -> ApprovalRouteInstance:
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        return build_route_for_approval(approval=approval, template_code=template_code)
+
+    @override_settings(APPROVAL_ROUTE_TEMPLATES=[LONG_ROUTE, {"code": "SHORT", "roles": ["admin", "chairman"]}])
+    def test_routes_follow_configured_templates(self):
+        self.assertEqual([t.code for t in route_templates()], ["LONG", "SHORT"])
+        short = find_route_template("SHORT")
+        self.assertEqual((short.label, short.notify), ("SHORT", NOTIFY_ADMIN_START))
+        self.assertEqual(find_route_template("LONG").notify, NOTIFY_NORMAL)
+        self.assertIsNone(find_route_template("NORMAL"))
+
+        route = self._build("LONG")
+        self.assertEqual(
+            list(route.steps.order_by("order").values_list("role", "state")),
+            [("drafter", "approved"), ("admin", "pending"), ("auditor", "pending"), ("chairman", "pending")],
+        )
+        with self.assertRaises(ValueError):
+            self._build("NORMAL")
+
+    def test_invalid_templates_are_refused(self):
+        for templates in (
+            [LONG_ROUTE, LONG_ROUTE],
+            [{"code": "X", "roles": ["drafter", "president"]}],
+            [{"code": "X", "roles": ["drafter"]}],
+            [{"code": "", "roles": ["drafter", "admin"]}],
+        ):
+            with self.subTest(templates=templates), self.settings(APPROVAL_ROUTE_TEMPLATES=templates):
+                with self.assertRaises(ImproperlyConfigured):
+                    route_templates()
+
+    @override_settings(APPROVAL_ROUTE_TEMPLATES=[LONG_ROUTE, {"code": "SHORT", "roles": ["drafter", "admin"]}])
+    def test_steps_are_inserted_in_one_query(self):
+        get_directory()
+        self.addCleanup(invalidate_directory)
+        with CaptureQueriesContext(connection) as short:
+            self._build("SHORT")
+
+        with self.assertNumQueries(len(short)):
+            self._build("LONG")
+
+
+class RouteSnapshotTests(TestCase):
+    def _route(self, template_code="NORMAL") -> ApprovalRouteInstance:
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        return build_route_for_approval(approval=approval, template_code=template_code)
+
+    def test_snapshot_answers_without_more_queries(self):
+        route = self._route()
+        approve_current_step(route=route)
+
+        with self.assertNumQueries(2):
+            snapshot = load_route_snapshot(route.approval_id)
+            self.assertEqual(snapshot.route.approval.title, "t")
+            self.assertEqual([s.order for s in snapshot.steps], [1, 2, 3])
+            self.assertEqual(snapshot.current_role, "chairman")
+            self.assertEqual(snapshot.drafter_role, "drafter")
+            self.assertEqual(snapshot.approver_roles(), ["admin", "chairman"])
+            self.assertEqual(snapshot.state_by_role(), {"drafter": "approved", "admin": "approved", "chairman": "pending"})
+            self.assertTrue(snapshot.approver_acted())
+            self.assertFalse(snapshot.is_closed)
+
+    def test_missing_route_raises(self):
+        with self.assertRaises(ApprovalRouteInstance.DoesNotExist):
+            load_route_snapshot(0)
+
+    def test_detail_query_count_does_not_grow_with_steps(self):
+        short = self._route("ADMIN_FINAL")
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(f"/v2/{short.approval_id}/")
+
+        long = self._route("ADMIN_TO_AUDITOR_CHAIR")
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get(f"/v2/{long.approval_id}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class InboxTests(TestCase):
+    def _route(self, template_code="NORMAL", *, waited_minutes=0) -> ApprovalRouteInstance:
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        route = build_route_for_approval(approval=approval, template_code=template_code)
+        ApprovalRouteInstance.objects.filter(pk=route.pk).update(
+            updated_at=timezone.now() - timedelta(minutes=waited_minutes)
+        )
+        return route
+
+    def test_only_current_pending_steps_are_listed(self):
+        newer = self._route(waited_minutes=5)
+        older = self._route(waited_minutes=30)
+        moved_on = self._route()
+        approve_current_step(route=moved_on)
+        rejected = self._route()
+        reject_current_step(route=rejected, reason="no")
+
+        with self.assertNumQueries(1):
+            items = pending_for_role("admin")
+        self.assertEqual([i["approval"].id for i in items], [older.approval_id, newer.approval_id])
+        self.assertGreaterEqual(items[0]["waiting_seconds"], 30 * 60)
+
+        with self.assertNumQueries(1):
+            summary = inbox_summary()
+        self.assertEqual(summary["admin"]["count"], 2)
+        self.assertEqual(summary["chairman"]["count"], 1)
+        self.assertEqual(summary["auditor"], {"count": 0, "oldest": None})
+        self.assertEqual(summary["admin"]["oldest"], ApprovalRouteInstance.objects.get(pk=older.pk).updated_at)
+
+    def test_inbox_page_query_count_does_not_grow_with_rows(self):
+        self._route()
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get("/v2/inbox/admin/")
+
+        for _ in range(4):
+            self._route()
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get("/v2/inbox/admin/")
+        self.assertEqual(len(response.context["items"]), 5)
+
+    def test_inbox_opens_first_role_with_waiting_documents(self):
+        self._route("ADMIN_TO_AUDITOR_CHAIR")
+
+        self.assertEqual(self.client.get("/v2/inbox/").context["role"], "auditor")
+        self.assertEqual(self.client.get("/v2/inbox/drafter/").status_code, 404)
+
+
+class PdfPrerenderTests(TestCase):
+    def _complete_route(self):
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        route = build_route_for_approval(approval=approval, template_code="ADMIN_FINAL")
+        with self.captureOnCommitCallbacks(execute=True):
+            approve_current_step(route=route)
+        return route
+
+    @override_settings(APPROVAL_PDF_RENDER_MODE="inline", APPROVAL_PDF_PRERENDER=True)
+    def test_inline_mode_does_not_queue_jobs(self):
+        self._complete_route()
+        self.assertFalse(PdfRenderJob.objects.exists())
+
+    @override_settings(APPROVAL_PDF_RENDER_MODE="service", APPROVAL_PDF_PRERENDER=True)
+    def test_service_mode_queues_final_pdf_once(self):
+        route = self._complete_route()
+
+        job = PdfRenderJob.objects.get()
+        self.assertEqual(job.approval_id, route.approval_id)
+        self.assertEqual(enqueue_pdf_render(route.approval_id).pk, job.pk)
+
+
+class PdfCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(APPROVAL_PDF_CACHE_DIR=self.tmp, MEDIA_ROOT=self.tmp)
+        self.override.enable()
+        self.approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        self.route = build_route_for_approval(approval=self.approval, template_code="NORMAL")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _version(self) -> str:
+        approval = ApprovalRequest.objects.get(pk=self.approval.pk)
+        route = ApprovalRouteInstance.objects.get(pk=self.route.pk)
+        return pdf_version(approval, route, list(approval.v2_attachments.order_by("id")))
+
+    def test_version_is_stable_until_document_changes(self):
+        first = self._version()
+        self.assertEqual(self._version(), first)
+
+        ApprovalRequest.objects.filter(pk=self.approval.pk).update(content="edited")
+        edited = self._version()
+        self.assertNotEqual(edited, first)
+
+        create_attachment(self.approval, ContentFile(b"bytes", name="a.txt"))
+        attached = self._version()
+        self.assertNotEqual(attached, edited)
+
+        approve_current_step(route=self.route)
+        self.assertNotEqual(self._version(), attached)
+
+    def test_store_replaces_other_versions(self):
+        old = store_pdf(current_cache_path(self.approval)[0], b"%PDF-old")
+        approve_current_step(route=self.route)
+
+        self.approval.refresh_from_db()
+        new = store_pdf(current_cache_path(self.approval)[0], b"%PDF-new")
+
+        self.assertNotEqual(old, new)
+        self.assertFalse(old.exists())
+        self.assertEqual(new.read_bytes(), b"%PDF-new")
+
+    def test_cached_pdf_is_not_rendered_again(self):
+        with mock.patch("approvals_v2.pdf.render_pdf_bytes", return_value=b"%PDF-1") as render:
+            first = get_or_render_pdf(self.approval, base_url="/")
+            second = get_or_render_pdf(self.approval, base_url="/")
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_cache_is_dropped_after_transition_commits(self):
+        path = store_pdf(current_cache_path(self.approval)[0], b"%PDF-old")
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            approve_current_step(route=self.route)
+        # 커밋 전에는 남아 있어야 한다 (롤백되면 그대로 유효)
+        self.assertTrue(path.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(path.parent.exists())
+
+
+class RenderPoolTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(APPROVAL_PDF_CACHE_DIR=self.tmp, MEDIA_ROOT=self.tmp)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _approval(self, template_code=None):
+        approval = ApprovalRequest.objects.create(department="d", name="n", title="t", content="c")
+        if template_code:
+            route = build_route_for_approval(approval=approval, template_code=template_code)
+            approve_current_step(route=route)
+        return ApprovalRequest.objects.select_related("route_v2").get(pk=approval.pk)
+
+    def test_pool_is_created_once_per_process(self):
+        with mock.patch.object(pdf, "_pool", None), mock.patch.object(pdf, "_pool_pid", None), \
+                mock.patch("approvals_v2.pdf.ProcessPoolExecutor") as executor, \
+                mock.patch("approvals_v2.pdf.os.getpid", return_value=100) as getpid:
+            first = get_render_pool()
+            self.assertIs(get_render_pool(), first)
+
+            # fork된 자식 프로세스는 부모의 풀을 쓰지 않는다
+            getpid.return_value = 200
+            get_render_pool()
+
+        self.assertEqual(executor.call_count, 2)
+
+    def test_submit_skips_cached_pdf(self):
+        cached = self._approval()
+        store_pdf(current_cache_path(cached)[0], b"%PDF")
+        missing = self._approval()
+
+        with mock.patch("approvals_v2.pdf.get_render_pool") as pool:
+            self.assertIsNone(submit_render(cached, base_url="http://x/"))
+            future = submit_render(missing, base_url="http://x/")
+
+        self.assertIs(future, pool.return_value.submit.return_value)
+        fn, _html, base_url, path = pool.return_value.submit.call_args.args
+        self.assertIs(fn, write_pdf_file)
+        self.assertEqual((base_url, path), ("http://x/", str(current_cache_path(missing)[0])))
+
+    def test_done_job_attaches_final_pdf(self):
+        approval = self._approval("ADMIN_FINAL")
+        store_pdf(current_cache_path(approval)[0], b"%PDF-final")
+        job = enqueue_pdf_render(approval.id)
+
+        with mock.patch("approvals_v2.pdf_jobs.submit_render", return_value=None):
+            result = process_render_jobs(batch_size=10)
+
+        self.assertEqual(result, {"claimed": 1, "done": 1, "failed": 0})
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfRenderJob.STATUS_DONE)
+        route = ApprovalRouteInstance.objects.get(approval=approval)
+        self.assertEqual(route.final_pdf.read(), b"%PDF-final")
+
+    def test_failed_job_is_retried_then_given_up(self):
+        job = enqueue_pdf_render(self._approval().id)
+        future = mock.Mock()
+        future.result.side_effect = RuntimeError("render crashed")
+
+        with mock.patch("approvals_v2.pdf_jobs.submit_render", return_value=future), \
+                self.assertLogs("approvals_v2.pdf_jobs", "ERROR"):
+            for expected in (PdfRenderJob.STATUS_PENDING, PdfRenderJob.STATUS_PENDING, PdfRenderJob.STATUS_FAILED):
+                self.assertEqual(process_render_jobs(batch_size=10)["failed"], 1)
+                job.refresh_from_db()
+                self.assertEqual(job.status, expected)
+
+        self.assertEqual((job.attempts, job.last_error), (3, "render crashed"))
+        self.assertEqual(process_render_jobs(batch_size=10)["claimed"], 0)
+
+    def test_stale_running_job_is_reclaimed(self):
+        now = timezone.now()
+        fresh = enqueue_pdf_render(self._approval().id)
+        stale = enqueue_pdf_render(self._approval().id)
+        PdfRenderJob.objects.filter(pk=fresh.pk).update(
+            status=PdfRenderJob.STATUS_RUNNING, started_at=now - timedelta(seconds=STALE_RUNNING_SECONDS - 30)
+        )
+        PdfRenderJob.objects.filter(pk=stale.pk).update(
+            status=PdfRenderJob.STATUS_RUNNING, started_at=now - timedelta(seconds=STALE_RUNNING_SECONDS + 30)
+        )
+
+        self.assertEqual([j.pk for j in claim_render_jobs(limit=10)], [stale.pk])
+        self.assertEqual(claim_render_jobs(limit=10), [])
+
+
+class PdfRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.static = os.path.join(self.tmp, "static")
+        self.media = os.path.join(self.tmp, "media")
+        os.makedirs(os.path.join(self.media, "stamps"))
+        os.makedirs(self.static)
+        for path in (os.path.join(self.static, "app.css"), os.path.join(self.media, "stamps", "a.png")):
+            with open(path, "wb") as fp:
+                fp.write(b"x")
+        with open(os.path.join(self.tmp, "secret.txt"), "wb") as fp:
+            fp.write(b"x")
+        self.fetcher = LocalUrlFetcher(
+            [("/static/", [self.static]), ("/media/", [self.media])], script_name="/approval"
+        )
+
+    def test_static_and_media_urls_are_read_from_disk(self):
+        self.assertEqual(self.fetcher.find("http://host/static/app.css").name, "app.css")
+        self.assertEqual(self.fetcher.find("https://host/media/stamps/a.png").name, "a.png")
+        # FORCE_SCRIPT_NAME 아래로 나간 주소도 같은 파일
+        self.assertEqual(self.fetcher.find("http://host/approval/media/stamps/a.png").name, "a.png")
+
+    def test_other_urls_fall_back_to_default_fetcher(self):
+        self.assertIsNone(self.fetcher.find("http://host/media/../secret.txt"))
+        self.assertIsNone(self.fetcher.find("http://host/media/%2e%2e/secret.txt"))
+        self.assertIsNone(self.fetcher.find("http://host/media/missing.png"))
+        self.assertIsNone(self.fetcher.find("http://host/other/app.css"))
+        self.assertIsNone(self.fetcher.find("data:image/png;base64,AAAA"))
+
+    def test_renderer_is_reused_per_process(self):
+        config = {"css_path": "x.css", "url_roots": []}
+        with mock.patch.object(pdf_renderer, "_renderer", None), \
+                mock.patch.object(pdf_renderer, "_renderer_pid", None), \
+                mock.patch("approvals_v2.pdf_renderer.PdfRenderer") as renderer, \
+                mock.patch("approvals_v2.pdf_renderer.os.getpid", return_value=100) as getpid:
+            first = get_renderer(config)
+            self.assertIs(get_renderer(config), first)
+
+            getpid.return_value = 200
+            get_renderer(config)
+
+        self.assertEqual(renderer.call_count, 2)
+        renderer.assert_called_with(css_path="x.css", url_roots=[])
+
+    def test_warm_up_failure_is_logged(self):
+        with mock.patch("approvals_v2.pdf_renderer.get_renderer", side_effect=OSError("no fonts")), \
+                self.assertLogs("approvals_v2.pdf_renderer", "ERROR"):
+            warm_renderer({})
+
+
+class ExportZipTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(APPROVAL_PDF_CACHE_DIR=self.tmp, MEDIA_ROOT=self.tmp)
+        self.override.enable()
+        self.ids = [
+            ApprovalRequest.objects.create(department="d", name="n", title=f"t{i}", content="c").id
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _fake_render(self, approval, *, base_url, request=None):
+        path = os.path.join(self.tmp, f"{approval.id}.pdf")
+        with open(path, "wb") as fp:
+            fp.write(b"%PDF-fake")
+        return path
+
+    def _export(self):
+        response = self.client.get("/v2/export/zip/")
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        return response, archive
+
+    @override_settings(APPROVAL_PDF_RENDER_MODE="inline", APPROVAL_EXPORT_MAX_DOCS=2)
+    def test_inline_mode_renders_and_reports_omitted(self):
+        with mock.patch("approvals_v2.export.get_or_render_pdf", side_effect=self._fake_render) as render, \
+                mock.patch("approvals_v2.export.get_render_pool") as pool:
+            response, archive = self._export()
+
+        self.assertEqual(render.call_count, 2)
+        pool.assert_not_called()
+        self.assertEqual(response["X-Export-Omitted"], "1")
+        names = archive.namelist()
+        self.assertIn(f"{self.ids[0]}_t0.pdf", names)
+        self.assertIn(f"{self.ids[1]}_t1.pdf", names)
+        self.assertIn("omitted.txt", names)
+        self.assertNotIn("pending.txt", names)
+        self.assertFalse(PdfRenderJob.objects.exists())
+
+    @override_settings(APPROVAL_PDF_RENDER_MODE="service")
+    def test_service_mode_queues_missing_pdfs(self):
+        with mock.patch("approvals_v2.export.get_or_render_pdf") as render:
+            response, archive = self._export()
+
+        render.assert_not_called()
+        self.assertFalse(response.has_header("X-Export-Omitted"))
+        self.assertEqual(archive.namelist(), ["pending.txt"])
+        self.assertEqual(sorted(PdfRenderJob.objects.values_list("approval_id", flat=True)), self.ids)
+
+
+class UploadSweepTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.tmp)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _upload(self, *, hours_ago, is_used):
+        row = TempUploadImage(is_used=is_used, created_at=timezone.now() - timedelta(hours=hours_ago))
+        row.image.save("a.png", ContentFile(b"png"), save=False)
+        row.save()
+        return row
+
+    def _sweep(self):
+        return sweep_temp_uploads(batch_size=50, max_batches=5, dry_run=False)
+
+    @override_settings(UPLOAD_SWEEP_USED_AFTER_HOURS=1, UPLOAD_SWEEP_UNUSED_AFTER_HOURS=24)
+    def test_used_upload_is_kept_as_long_as_unused_one(self):
+        draft = self._upload(hours_ago=2, is_used=True)
+        old = self._upload(hours_ago=25, is_used=True)
+
+        result = self._sweep()
+
+        self.assertEqual(result["rows"], 1)
+        self.assertTrue(TempUploadImage.objects.filter(pk=draft.pk).exists())
+        self.assertTrue(default_storage.exists(draft.image.name))
+        self.assertFalse(default_storage.exists(old.image.name))
+
+    @override_settings(UPLOAD_SWEEP_USED_AFTER_HOURS=1, UPLOAD_SWEEP_UNUSED_AFTER_HOURS=1)
+    def test_file_referenced_by_saved_approval_is_kept(self):
+        kept = self._upload(hours_ago=3, is_used=True)
+        gone = self._upload(hours_ago=3, is_used=False)
+        ApprovalRequest.objects.create(
+            department="d", name="n", title="t", content=f'<p><img src="/media/{kept.image.name}"></p>'
+        )
+
+        result = self._sweep()
+
+        self.assertEqual((result["rows"], result["files"], result["kept"]), (2, 1, 1))
+        self.assertTrue(default_storage.exists(kept.image.name))
+        self.assertFalse(default_storage.exists(gone.image.name))
+
+    def test_reference_check_reads_only_matching_content(self):
+        ApprovalRequest.objects.create(department="d", name="n", title="t", content='<img src="/media/temp_uploads/x.png">')
+        ApprovalRequest.objects.create(department="d", name="n", title="t", content='<img src="/media/temp_uploads/y.png">')
+
+        with self.assertNumQueries(1):
+            found = referenced_upload_names(["temp_uploads/x.png", "temp_uploads/z.png"])
+        self.assertEqual(found, {"temp_uploads/x.png"})
+
+
+class SendMessagesTests(TestCase):
+    def _messages(self, n):
+        return [{"kind": "dm", "role": "admin", "chat_id": str(i), "text": "t"} for i in range(n)]
+
+    def test_results_keep_input_order_and_report_in_caller_thread(self):
+        delays = {"0": 0.05, "1": 0.0, "2": 0.02}
+        caller = threading.get_ident()
+        seen = []
+
+        def send(message):
+            time.sleep(delays[message["chat_id"]])
+            return {"ok": message["chat_id"] != "1", "error": "" if message["chat_id"] != "1" else "HTTP 400"}
+
+        with mock.patch("approvals_v2.notifications.send_planned_message", side_effect=send):
+            results = send_messages(
+                self._messages(3), concurrency=3, on_result=lambda i, res: seen.append((i, threading.get_ident()))
+            )
+
+        self.assertEqual([r["ok"] for r in results], [True, False, True])
+        self.assertEqual(results[1]["error"], "HTTP 400")
+        self.assertEqual(sorted(i for i, _ in seen), [0, 1, 2])
+        self.assertEqual({ident for _, ident in seen}, {caller})
+
+    def test_concurrency_is_capped(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def send(message):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            return {"ok": True, "error": ""}
+
+        with mock.patch("approvals_v2.notifications.send_planned_message", side_effect=send):
+            results = send_messages(self._messages(6), concurrency=2)
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(state["peak"], 2)
+
+    def test_exception_becomes_failed_result(self):
+        def send(message):
+            if message["chat_id"] == "0":
+                raise ConnectionError("boom")
+            return {"ok": True, "error": ""}
+
+        with mock.patch("approvals_v2.notifications.send_planned_message", side_effect=send), \
+                self.assertLogs("approvals_v2.notifications", "ERROR"):
+            results = send_messages(self._messages(2), concurrency=2)
+
+        self.assertEqual(results[0], {"ok": False, "error": "ConnectionError: boom"})
+        self.assertTrue(results[1]["ok"])
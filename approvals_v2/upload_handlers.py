@@ -0,0 +1,32 @@
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class _Sha256Mixin:
+    """
+    multipart 업로드를 받는 동안 SHA-256을 같이 계산해 업로드 파일의 .sha256에 붙인다.
+    (approvals_v2.attachments.file_sha256이 파일을 다시 읽지 않도록)
+    """
+
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        if f is not None:
+            f.sha256 = self._sha256.hexdigest()
+        return f
+
+
+class HashingMemoryFileUploadHandler(_Sha256Mixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(_Sha256Mixin, TemporaryFileUploadHandler):
+    pass
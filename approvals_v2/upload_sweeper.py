@@ -0,0 +1,281 @@
+import logging
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from approvals.models import ApprovalRequest
+
+from .chunked_upload import chunk_paths, part_path
+from .models import ApprovalAttachment, TempUploadImage, UploadSession
+
+logger = logging.getLogger(__name__)
+
+MOBILE_UPLOAD_DIR = "mobile_upload"
+
+# 본문(content)에 <img src="/media/...">로 박혀 있는 업로드 경로
+_MEDIA_REF_RE = re.compile(r"((?:temp_uploads|mobile_upload)/[^\"'\s<>)?#]+)")
+
+# 본문 참조 확인 1회 쿼리에 넣는 후보 파일 수
+REFERENCE_CHECK_BATCH = 50
+
+
+def _cutoffs(now):
+    """
+    return: (사용된 업로드 기준 시각, 사용 안 된 업로드 기준 시각)
+    사용됨(is_used)은 PC 작성 화면이 받아 갔다는 뜻일 뿐 아직 저장 전일 수 있으므로
+    미사용 기준과 휴대폰 업로드 전달 TTL보다 먼저 지우지 않는다.
+    """
+    used_hours = int(getattr(settings, "UPLOAD_SWEEP_USED_AFTER_HOURS", 72))
+    unused_hours = int(getattr(settings, "UPLOAD_SWEEP_UNUSED_AFTER_HOURS", 24))
+    handoff_seconds = int(getattr(settings, "MOBILE_UPLOAD_HANDOFF_TTL", 1800))
+    used_seconds = max(used_hours * 3600, unused_hours * 3600, handoff_seconds)
+    return now - timedelta(seconds=used_seconds), now - timedelta(hours=unused_hours)
+
+
+def referenced_upload_names(names) -> set:
+    """
+    names 중 품의서 본문에서 참조 중인 업로드 파일 이름 (이 파일들은 지우지 않는다)
+    후보 이름이 들어 있는 본문만 읽는다.
+    """
+    names = sorted({n for n in names if n})
+    found = set()
+    for i in range(0, len(names), REFERENCE_CHECK_BATCH):
+        chunk = names[i:i + REFERENCE_CHECK_BATCH]
+        cond = Q()
+        for name in chunk:
+            cond |= Q(content__contains=name) | Q(content__contains=quote(name))
+        refs = set()
+        for content in ApprovalRequest.objects.filter(cond).values_list("content", flat=True).iterator(chunk_size=100):
+            for m in _MEDIA_REF_RE.finditer(content or ""):
+                refs.add(unquote(m.group(1)))
+        found.update(refs.intersection(chunk))
+    return found
+
+
+def _file_size(name: str) -> int:
+    try:
+        return default_storage.size(name)
+    except (OSError, NotImplementedError):
+        return 0
+
+
+def _delete_file(name: str, result: dict, *, dry_run: bool) -> None:
+    size = _file_size(name)
+    if not dry_run:
+        default_storage.delete(name)
+    result["files"] += 1
+    result["bytes"] += size
+
+
+def sweep_temp_uploads(*, batch_size: int, max_batches: int, dry_run: bool, now=None) -> dict:
+    """
+    만료된 TempUploadImage 행과 파일을 batch_size씩 지운다.
+    - 사용됨(is_used): UPLOAD_SWEEP_USED_AFTER_HOURS 경과 (_cutoffs 참고)
+    - 미사용: UPLOAD_SWEEP_UNUSED_AFTER_HOURS 경과
+    본문에서 참조 중인 파일은 남기고 행만 지운다.
+    """
+    now = now or timezone.now()
+    used_before, unused_before = _cutoffs(now)
+    result = {"rows": 0, "files": 0, "bytes": 0, "kept": 0}
+
+    last_id = 0
+    for _ in range(max_batches):
+        # (is_used, created_at) 인덱스를 타도록 조건을 나눠서 id만 가져온다
+        used_ids = TempUploadImage.objects.filter(
+            is_used=True, created_at__lt=used_before, id__gt=last_id
+        ).values_list("id", flat=True).order_by("id")[:batch_size]
+        unused_ids = TempUploadImage.objects.filter(
+            is_used=False, created_at__lt=unused_before, id__gt=last_id
+        ).values_list("id", flat=True).order_by("id")[:batch_size]
+        ids = sorted(set(used_ids) | set(unused_ids))[:batch_size]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        rows = list(TempUploadImage.objects.filter(pk__in=ids).values_list("id", "image"))
+        referenced = referenced_upload_names(name for _pk, name in rows)
+        for _pk, name in rows:
+            if not name:
+                continue
+            if name in referenced:
+                result["kept"] += 1
+                continue
+            _delete_file(name, result, dry_run=dry_run)
+
+        if not dry_run:
+            TempUploadImage.objects.filter(pk__in=ids).delete()
+        result["rows"] += len(rows)
+
+    return result
+
+
+def _remove_empty_dir(name: str) -> None:
+    try:
+        os.rmdir(default_storage.path(name))
+    except (OSError, NotImplementedError):
+        pass
+
+
+def sweep_mobile_upload_files(*, batch_size: int, max_batches: int, dry_run: bool, now=None) -> dict:
+    """
+    mobile_upload/<token>/ 파일 중 사용된 업로드 기준이 지났고 본문에서 참조하지 않는 것을 지운다.
+    (DB 행이 없어 PC 화면이 받아 갔는지 모르므로 긴 쪽 기준, 저장소의 수정 시각으로 판단)
+    """
+    now = now or timezone.now()
+    before, _ = _cutoffs(now)
+    result = {"files": 0, "bytes": 0, "kept": 0}
+    limit = batch_size * max_batches
+
+    try:
+        token_dirs, _ = default_storage.listdir(MOBILE_UPLOAD_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return result
+
+    for token in token_dirs:
+        if result["files"] >= limit:
+            break
+        token_dir = f"{MOBILE_UPLOAD_DIR}/{token}"
+        _, files = default_storage.listdir(token_dir)
+        remaining = len(files)
+
+        expired = []
+        for filename in files:
+            name = f"{token_dir}/{filename}"
+            try:
+                if default_storage.get_modified_time(name) < before:
+                    expired.append(name)
+            except (OSError, NotImplementedError):
+                continue
+
+        referenced = referenced_upload_names(expired)
+        for name in expired:
+            if result["files"] >= limit:
+                break
+            if name in referenced:
+                result["kept"] += 1
+                continue
+            _delete_file(name, result, dry_run=dry_run)
+            remaining -= 1
+
+        if not remaining and not dry_run:
+            _remove_empty_dir(token_dir)
+
+    return result
+
+
+def sweep_chunked_uploads(*, batch_size: int, max_batches: int, dry_run: bool, now=None) -> dict:
+    """
+    UPLOAD_SWEEP_UNUSED_AFTER_HOURS 동안
+    - 진행이 없는 분할 업로드 세션과 .part 파일
+    - 어느 품의서에도 연결되지 않은 첨부(완료 후 폼을 저장하지 않은 것)와 파일
+    - 완료된 세션 행 (첨부는 남김)
+    을 지운다.
+    """
+    now = now or timezone.now()
+    _, before = _cutoffs(now)
+    result = {"rows": 0, "files": 0, "bytes": 0}
+
+    for _ in range(max_batches):
+        sessions = list(
+            UploadSession.objects.filter(
+                status__in=[UploadSession.STATUS_UPLOADING, UploadSession.STATUS_WRITING], updated_at__lt=before
+            )
+            .order_by("updated_at")[:batch_size]
+        )
+        if not sessions:
+            break
+        for session in sessions:
+            for path in [part_path(session), *chunk_paths(session)]:
+                if path.exists():
+                    result["files"] += 1
+                    result["bytes"] += path.stat().st_size
+                    if not dry_run:
+                        path.unlink(missing_ok=True)
+        if not dry_run:
+            UploadSession.objects.filter(pk__in=[x.pk for x in sessions]).delete()
+        result["rows"] += len(sessions)
+        if dry_run:
+            break
+
+    for _ in range(max_batches):
+        orphans = list(
+            ApprovalAttachment.objects.filter(approval__isnull=True, uploaded_at__lt=before)
+            .order_by("id")
+            .values_list("id", "file", "thumbnail", "blob_id")[:batch_size]
+        )
+        if not orphans:
+            break
+        for _pk, name, thumb, blob_id in orphans:
+            # blob 파일은 행 삭제 시 signals.release_attachment_blob이 마지막 참조일 때만 지운다
+            if blob_id:
+                continue
+            for n in (name, thumb):
+                if n:
+                    _delete_file(n, result, dry_run=dry_run)
+        if not dry_run:
+            ids = [x[0] for x in orphans]
+            UploadSession.objects.filter(attachment_id__in=ids).delete()
+            ApprovalAttachment.objects.filter(pk__in=ids).delete()
+        result["rows"] += len(orphans)
+        if dry_run:
+            break
+
+    if not dry_run:
+        for _ in range(max_batches):
+            ids = list(
+                UploadSession.objects.filter(status=UploadSession.STATUS_COMPLETE, updated_at__lt=before)
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            UploadSession.objects.filter(pk__in=ids).delete()
+            result["rows"] += len(ids)
+
+    return result
+
+
+def sweep_uploads(*, batch_size: int = 200, max_batches: int = 50, dry_run: bool = False) -> dict:
+    """
+    return: {"temp": {...}, "mobile": {...}, "chunked": {...}}
+    """
+    now = timezone.now()
+    return {
+        "temp": sweep_temp_uploads(batch_size=batch_size, max_batches=max_batches, dry_run=dry_run, now=now),
+        "mobile": sweep_mobile_upload_files(batch_size=batch_size, max_batches=max_batches, dry_run=dry_run, now=now),
+        "chunked": sweep_chunked_uploads(batch_size=batch_size, max_batches=max_batches, dry_run=dry_run, now=now),
+    }
+
+
+_sweeper_thread = None
+
+
+def _sweep_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            result = sweep_uploads()
+            logger.info("upload sweep: %s", result)
+        except Exception:
+            logger.exception("upload sweep 실패")
+
+
+def start_sweeper_thread() -> None:
+    """
+    settings.UPLOAD_SWEEP_INTERVAL_SECONDS > 0이면 웹 프로세스 안에서 주기적으로 sweep (프로세스당 1개)
+    cron으로 manage.py sweep_uploads를 돌린다면 꺼 둔다.
+    """
+    global _sweeper_thread
+
+    interval = float(getattr(settings, "UPLOAD_SWEEP_INTERVAL_SECONDS", 0))
+    if interval <= 0 or _sweeper_thread is not None:
+        return
+    _sweeper_thread = threading.Thread(target=_sweep_loop, args=(interval,), name="upload-sweeper", daemon=True)
+    _sweeper_thread.start()
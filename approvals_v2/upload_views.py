@@ -0,0 +1,79 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from .chunked_upload import OffsetMismatch, UploadError, complete_session, start_session, write_chunk
+from .models import UploadSession
+
+
+def _session_json(session: UploadSession, **extra) -> dict:
+    return {
+        "id": str(session.id),
+        "name": session.original_name,
+        "size": session.size,
+        "offset": session.received,
+        "complete": session.status == UploadSession.STATUS_COMPLETE,
+        **extra,
+    }
+
+
+@require_POST
+def upload_start(request):
+    """
+    POST {"name": ..., "size": ...} → 업로드 세션 생성
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+        session = start_session(name=data.get("name", ""), size=int(data.get("size") or 0))
+    except (ValueError, TypeError):
+        return JsonResponse({"ok": False, "error": "invalid request"}, status=400)
+    except UploadError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    chunk_size = int(getattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 2 * 1024 * 1024))
+    return JsonResponse({"ok": True, "chunk_size": chunk_size, **_session_json(session)}, status=201)
+
+
+@require_GET
+def upload_status(request, upload_id):
+    """
+    이어받기: 서버가 받은 offset 확인
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    return JsonResponse({"ok": True, **_session_json(session)})
+
+
+@require_POST
+def upload_chunk(request, upload_id):
+    """
+    본문 = 원본 바이트 조각, 헤더 X-Upload-Offset = 이 조각의 시작 위치
+    offset이 어긋나면 409와 함께 서버 offset을 돌려준다.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    try:
+        offset = int(request.headers.get("X-Upload-Offset", ""))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "X-Upload-Offset required"}, status=400)
+
+    try:
+        new_offset = write_chunk(session, offset=offset, stream=request)
+    except OffsetMismatch as e:
+        return JsonResponse({"ok": False, "error": str(e), "offset": e.offset}, status=409)
+    except UploadError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    return JsonResponse({"ok": True, "offset": new_offset})
+
+
+@require_POST
+def upload_complete(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    try:
+        attachment = complete_session(session)
+    except UploadError as e:
+        return JsonResponse({"ok": False, "error": str(e), "offset": session.received}, status=409)
+
+    return JsonResponse({"ok": True, "attachment_id": attachment.id, **_session_json(session)})
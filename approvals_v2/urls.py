@@ -2,6 +2,7 @@ from django.urls import path
 from . import views
 from django.conf import settings
 from . import mobile_upload_views
+from . import upload_views
 
 
 
@@ -11,13 +12,25 @@ app_name = "approvals_v2"
 urlpatterns = [
     path("", views.v2_list, name="list"),
     path("new/", views.v2_new, name="new"),
+    path("search/", views.v2_search, name="search"),
+    path("inbox/", views.v2_inbox, name="inbox"),
+    path("inbox/<str:role>/", views.v2_inbox, name="inbox_role"),
+    path("inbox/<str:role>/approve/", views.v2_inbox_approve, name="inbox_approve"),
+    path("export/zip/", views.v2_export_zip, name="export_zip"),
     path("<int:pk>/edit/", views.v2_edit, name="edit"),
     path("<int:pk>/approve/", views.v2_approve, name="approve"),
     path("<int:pk>/reject/", views.v2_reject, name="reject"),
     path("<int:pk>/", views.v2_detail, name="detail"),
     path("mobile-upload/<str:token>/", views.mobile_upload_page, name="v2_mobile_upload_page"),
     path("mobile-upload/<str:token>/poll/", views.mobile_upload_poll, name="v2_mobile_upload_poll"),
+    path("mobile-upload/<str:token>/events/", views.mobile_upload_events, name="v2_mobile_upload_events"),
     path("<int:pk>/pdf/", views.approval_pdf, name="approval_pdf"),
+    path("attachments/<str:token>/", views.attachment_download, name="attachment_download"),
+    path("media/<str:token>/", views.signed_media, name="signed_media"),
+    path("uploads/", upload_views.upload_start, name="upload_start"),
+    path("uploads/<uuid:upload_id>/", upload_views.upload_status, name="upload_status"),
+    path("uploads/<uuid:upload_id>/chunk/", upload_views.upload_chunk, name="upload_chunk"),
+    path("uploads/<uuid:upload_id>/complete/", upload_views.upload_complete, name="upload_complete"),
 ]
 
 # ✅ DEBUG에서만 테스트 엔드포인트 노출
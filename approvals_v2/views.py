@@ -1,24 +1,50 @@
 from django.conf import settings
+from django.core import signing
 from django.core.files.storage import default_storage
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.template.loader import render_to_string
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
+import asyncio
+import json
 import logging
+import os
+import time
 import traceback
 from django.db import transaction
 
 from approvals.models import ApprovalRequest
-from approvals_v2.models import ApprovalAttachment, TelegramRecipient
-from approvals_v2.notifications import dispatch_notifications
+from approvals_v2.attachments import create_attachment
+from approvals_v2.chunked_upload import attach_uploads
+from approvals_v2.directory import get_directory
+from approvals_v2.downloads import (
+    read_attachment_token,
+    read_signed_media_token,
+    sendfile_response,
+    storage_sendfile_response,
+)
+from approvals_v2.export import export_filename, iter_approvals_by_ids, iter_export_zip, web_render_mode
+from approvals_v2.filters import count_by_status, filter_approvals, read_list_filters
+from approvals_v2.handoff import alatest_upload, latest_upload, put_upload
+from approvals_v2.images import normalize_upload
+from approvals_v2.inbox import INBOX_ROLES, inbox_summary, pending_for_role
+from approvals_v2.models import ApprovalAttachment, ApprovalRouteInstance, PdfRenderJob, TelegramRecipient
+from approvals_v2.notifications import dispatch_notifications, enqueue_batch_notifications, enqueue_notifications
+from approvals_v2.pagination import keyset_page, page_size
+from approvals_v2.pdf import get_cached_pdf, get_or_render_pdf, store_final_pdf
+from approvals_v2.pdf_jobs import enqueue_pdf_render, latest_job
+from approvals_v2.route_snapshot import RouteSnapshot, load_route_snapshot
+from approvals_v2.route_templates import find_route_template, route_templates
 from approvals_v2.routes import (
+    ROLE_LABEL,
     build_route_for_approval,
     approve_current_step,
-    get_current_actor_role,
+    approve_current_steps,
     reject_current_step,
+    RouteConflict,
 )
+from approvals_v2.search import search_hits, search_snippets
 
 # =========================
 # ✅ 텔레그램 메시지 포맷
@@ -58,8 +84,7 @@ def drafter_role_kr_by_template(template_code: str) -> str:
     - 총무 시작 템플릿: 총무
     - 그 외: 담당
     """
-    admin_start = {"ADMIN_TO_CHAIR", "ADMIN_TO_AUDITOR_CHAIR"}
-    return "총무" if template_code in admin_start else "담당"
+    return role_kr(drafter_role_code_by_template(template_code))
 
 
 def drafter_role_code_by_template(template_code: str) -> str:
@@ -68,11 +93,11 @@ def drafter_role_code_by_template(template_code: str) -> str:
     - 총무 시작 템플릿: admin (총무가 기안자)
     - 그 외: drafter (담당이 기안자)
     """
-    admin_start = {"ADMIN_TO_CHAIR", "ADMIN_TO_AUDITOR_CHAIR"}
-    return "admin" if template_code in admin_start else "drafter"
+    tpl = find_route_template(template_code)
+    return tpl.drafter_role if tpl else TelegramRecipient.ROLE_DRAFTER
 
 
-def get_approver_roles(route, template_code: str):
+def get_approver_roles(snapshot: RouteSnapshot):
     """
     ✅ '기안자 역할'을 제외한 결재자 role들을 order 순서로 반환
     예)
@@ -80,26 +105,24 @@ def get_approver_roles(route, template_code: str):
       - ADMIN_TO_CHAIR(총무 기안): [chairman]
       - ADMIN_TO_AUDITOR_CHAIR(총무 기안): [auditor, chairman]
     """
-    if not route:
+    if not snapshot:
         return []
-    drafter_code = drafter_role_code_by_template(template_code)
-    return list(
-        route.steps.exclude(role=drafter_code).order_by("order").values_list("role", flat=True)
-    )
+    return snapshot.approver_roles()
 
 
-def get_step_state_by_role(route):
+def get_step_state_by_role(snapshot: RouteSnapshot):
     """
     role -> state 매핑
     """
-    if not route:
+    if not snapshot:
         return {}
-    return {s.role: s.state for s in route.steps.all()}
+    return snapshot.state_by_role()
 
 
 def build_tg_text(*, kind: str, approval, route, template_code: str, actor_role: str, actor_action_kr: str, request):
     """
     kind: submit / approve / reject
+    route: 전이 후의 RouteSnapshot (approve/reject일 때만 사용, 단계 정보를 다시 조회하지 않음)
     actor_action_kr: 승인/반려 (approve/reject일 때만 사용)
     규칙:
     - (v2) 제거
@@ -110,10 +133,6 @@ def build_tg_text(*, kind: str, approval, route, template_code: str, actor_role:
     """
     base_url = request.build_absolute_uri(f"/approval/v2/{approval.id}/")
 
-    # ✅ route 최신상태 기준으로 계산(중요)
-    approver_roles = get_approver_roles(route, template_code)  # ✅ 기안자 역할 제외
-    state_by_role = get_step_state_by_role(route)
-
     lines = []
     lines.append("내쇼날새천년 전자결재")
     lines.append(f"상신일 : {fmt_submit_date(approval.created_at)}")
@@ -121,6 +140,10 @@ def build_tg_text(*, kind: str, approval, route, template_code: str, actor_role:
     lines.append(f"기안자 : {drafter_role_kr_by_template(template_code)}")
 
     if kind in {"approve", "reject"}:
+        # ✅ route 최신상태 기준으로 계산(중요)
+        approver_roles = get_approver_roles(route)  # ✅ 기안자 역할 제외
+        state_by_role = get_step_state_by_role(route)
+
         # 결재자가 0명인 예외 방어
         if not approver_roles:
             lines.append(f"처리자 : {role_kr(actor_role)}[{actor_action_kr}]")
@@ -156,60 +179,60 @@ def build_tg_text(*, kind: str, approval, route, template_code: str, actor_role:
     lines.append(f"바로가기 : {base_url}")
     return "\n".join(lines)
 
-ADMIN_START_TEMPLATES = {"ADMIN_TO_CHAIR", "ADMIN_TO_AUDITOR_CHAIR"}
-
-
 def get_form_base_context():
-    drafters = list(
-        TelegramRecipient.objects.filter(
-            is_active=True,
-            role=TelegramRecipient.ROLE_DRAFTER,
-        )
-        .order_by("name")
-        .values("role", "name", "department")
-    )
-
-    admins = list(
-        TelegramRecipient.objects.filter(
-            is_active=True,
-            role=TelegramRecipient.ROLE_ADMIN,
-        )
-        .order_by("name")
-        .values("role", "name", "department")
-    )
+    directory = get_directory()
+    drafters = directory.form_options(TelegramRecipient.ROLE_DRAFTER)
+    admins = directory.form_options(TelegramRecipient.ROLE_ADMIN)
 
     admin_name_ui = admins[0]["name"] if admins else ""
 
+    templates = route_templates()
+
     return {
         "drafters": drafters,
         "admins": admins,
         "admin_name": admin_name_ui,
+        "route_templates": templates,
+        # 휴대폰 업로드 완료 수신: SSE(ASGI 배포) 또는 폴링
+        "mobile_upload_sse": getattr(settings, "MOBILE_UPLOAD_SSE", False),
+        "route_templates_data": {
+            t.code: {
+                # 서명란 머리글: 담당 기안이면 첫 칸은 "기안"
+                "labels": [
+                    "기안" if i == 0 and role == TelegramRecipient.ROLE_DRAFTER else ROLE_LABEL.get(role, role)
+                    for i, role in enumerate(t.roles)
+                ],
+                "admin_start": t.starts_with_admin,
+            }
+            for t in templates
+        },
     }
 
 
-def can_edit_approval(route) -> bool:
+def can_edit_approval(snapshot: RouteSnapshot) -> bool:
     """
     수정 가능 조건
     - 진행중 문서
     - 최초 상신 이후, 아직 '기안자 외 결재자' 누구도 승인/반려하지 않은 상태
     """
-    if not route:
+    if not snapshot:
         return False
 
-    if route.status != "in_progress":
+    if snapshot.status != "in_progress":
         return False
 
-    drafter_role_code = drafter_role_code_by_template(route.template_code)
-
-    acted_approver_exists = route.steps.exclude(role=drafter_role_code).exclude(state="pending").exists()
-    return not acted_approver_exists
+    return not snapshot.approver_acted()
 
 
 def apply_form_values(template_code: str, department: str, name: str, title: str, content: str, admin_name: str):
     if not all([template_code, department, title, content]):
         return {"ok": False, "message": "필수값 누락"}
 
-    if template_code in ADMIN_START_TEMPLATES:
+    tpl = find_route_template(template_code)
+    if tpl is None:
+        return {"ok": False, "message": "알 수 없는 결재라인입니다."}
+
+    if tpl.starts_with_admin:
         if not admin_name:
             return {"ok": False, "message": "총무 계정이 설정되어 있지 않습니다."}
         name = admin_name
@@ -230,16 +253,20 @@ def apply_form_values(template_code: str, department: str, name: str, title: str
     }
 
 
+@transaction.atomic
 def rebuild_route_after_edit(request, approval, template_code: str):
     """
     기존 route/step 제거 후 현재 입력값 기준으로 다시 상신
     - reverse one-to-one 캐시 꼬임 방지
-    - 알림 실패가 수정 저장 자체를 막지 않도록 분리
+    - 알림은 outbox에 적재(같은 트랜잭션), 적재 실패가 수정 저장 자체를 막지 않도록 분리
     """
     old_route = getattr(approval, "route_v2", None)
+    # 새 route는 이전 route보다 큰 version으로 시작 (수정 전 화면에서 보낸 결재 요청은 충돌 처리)
+    version = 0
 
     if old_route:
         old_route_id = old_route.id
+        version = old_route.version + 1
 
         # 1) step 먼저 삭제
         old_route.steps.all().delete()
@@ -251,39 +278,36 @@ def rebuild_route_after_edit(request, approval, template_code: str):
         if hasattr(approval, "_state") and hasattr(approval._state, "fields_cache"):
             approval._state.fields_cache.pop("route_v2", None)
 
-    # 4) 새 결재선 생성
-    route = build_route_for_approval(approval=approval, template_code=template_code)
-
-    # 5) 총무 시작 템플릿 자동 승인 유지
-    if route.template_code in ADMIN_START_TEMPLATES:
-        current_role = get_current_actor_role(route)
-        if current_role == "admin":
-            approve_current_step(
-                route=route,
-                acted_ip=get_client_ip(request),
-                acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
-                acted_anon_id=request.COOKIES.get("anon_id", ""),
-            )
-            route.refresh_from_db()
+    # 4) 새 결재선 생성 (기안자 단계는 담당/총무 시작 모두 자동 승인된 상태로 생성)
+    route = build_route_for_approval(
+        approval=approval,
+        template_code=template_code,
+        acted_ip=get_client_ip(request),
+        acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
+        acted_anon_id=request.COOKIES.get("anon_id", ""),
+        version=version,
+    )
 
-    # 6) 알림 실패는 저장을 막지 않음
+    # 5) 알림 실패는 저장을 막지 않음 (savepoint로 분리)
     try:
-        dispatch_notifications(
-            template_code=route.template_code,
-            event="submit",
-            actor_role="",
-            drafter_name=approval.name,
-            drafter_department=approval.department,
-            text=build_tg_text(
-                kind="submit",
+        with transaction.atomic():
+            enqueue_notifications(
                 approval=approval,
-                route=route,
                 template_code=route.template_code,
+                event="submit",
                 actor_role="",
-                actor_action_kr="",
-                request=request,
-            ),
-        )
+                drafter_name=approval.name,
+                drafter_department=approval.department,
+                text=build_tg_text(
+                    kind="submit",
+                    approval=approval,
+                    route=None,  # 상신 문구는 단계 정보를 쓰지 않음
+                    template_code=route.template_code,
+                    actor_role="",
+                    actor_action_kr="",
+                    request=request,
+                ),
+            )
     except Exception:
         logger.exception("v2 edit 재상신 알림 실패")
 
@@ -296,78 +320,220 @@ def v2_list(request):
     """
     v2 문서 리스트
     - 상태 필터: all / in_progress / completed / rejected
-    - 검색: 제목/부서/기안자(name)
+    - 검색: 제목/부서/기안자(name)/본문/첨부 파일명 (approvals_v2.search)
+    - 기안일 범위: from / to
+    - 페이지: page 토큰 (approvals_v2.pagination, id keyset)
     """
-    status = (request.GET.get("status") or "all").strip()
-    q = (request.GET.get("q") or "").strip()
-
-    qs = ApprovalRequest.objects.select_related("route_v2").order_by("-id")
+    filters = read_list_filters(request.GET)
 
-    if status in {"in_progress", "completed", "rejected"}:
-        qs = qs.filter(route_v2__status=status)
+    qs = filter_approvals(
+        ApprovalRequest.objects.select_related("route_v2"),
+        **filters,
+    )
 
-    if q:
-        from django.db.models import Q
+    page = keyset_page(qs, request.GET.get("page", ""))
+    approvals = page["items"]
 
-        qs = qs.filter(
-            Q(title__icontains=q) |
-            Q(department__icontains=q) |
-            Q(name__icontains=q)
-        )
+    # 페이지 토큰을 뺀 현재 조건 (내보내기/페이지 링크 공통)
+    export_params = request.GET.copy()
+    export_params.pop("page", None)
 
-    approvals = qs[:200]
-
-    role_label = {
-        "drafter": "담당",
-        "admin": "총무",
-        "chairman": "회장",
-        "auditor": "감사",
-    }
+    snippets = search_snippets([a.id for a in approvals], filters["q"]) if filters["q"] else {}
 
+    # ✅ 현재 단계는 route의 비정규화 필드 사용 (행마다 step 조회 X)
     approvals_ctx = []
     for a in approvals:
         route = getattr(a, "route_v2", None)
-        current_role = ""
-        current_role_kr = ""
-        current_step_label = ""
-
-        if route:
-            step = route.steps.filter(order=route.current_order).first()
-            if step:
-                current_role = step.role
-                current_role_kr = role_label.get(current_role, current_role)
-                if route.status == "completed":
-                    current_step_label = "완료"
-                elif route.status == "rejected":
-                    current_step_label = "반려"
-                else:
-                    current_step_label = f"{current_role_kr} 결재 대기"
-
         approvals_ctx.append(
             {
                 "a": a,
                 "route": route,
-                "current_role": current_role,
-                "current_role_kr": current_role_kr,
-                "current_step_label": current_step_label,
+                "current_role": route.current_role if route else "",
+                "current_role_kr": role_kr(route.current_role) if route else "",
+                "current_step_label": route.current_step_label if route else "",
+                "snippet": snippets.get(a.id, ""),
             }
         )
 
     return render(
         request,
         "approvals_v2/list.html",
-        {"approvals_ctx": approvals_ctx, "status": status, "q": q},
+        {
+            "approvals_ctx": approvals_ctx,
+            "status": filters["status"],
+            "q": filters["q"],
+            "date_from": filters["date_from"],
+            "date_to": filters["date_to"],
+            "export_query": export_params.urlencode(),
+            "status_counts": count_by_status(ApprovalRequest.objects.all(), **filters),
+            "next_query": _page_query(export_params, page["next"]),
+            "prev_query": _page_query(export_params, page["prev"]),
+            "page_size": page_size(),
+        },
+    )
+
+
+def _page_query(params, token: str) -> str:
+    if not token:
+        return ""
+    params = params.copy()
+    params["page"] = token
+    return params.urlencode()
+
+
+# =========================
+# v2 inbox (역할별 결재함)
+# =========================
+def v2_inbox(request, role: str = ""):
+    """
+    총무/감사/회장 결재 대기함
+    - 탭: 역할별 대기 건수 + 가장 오래 기다린 시간
+    - 목록: 지금 그 역할 차례인 문서만 (오래 기다린 순)
+    """
+    summary = inbox_summary()
+    if role not in INBOX_ROLES:
+        if role:
+            raise Http404()
+        # 대기 문서가 있는 첫 역할
+        role = next((r for r in INBOX_ROLES if summary[r]["count"]), INBOX_ROLES[0])
+
+    return render(
+        request,
+        "approvals_v2/inbox.html",
+        {
+            "role": role,
+            "role_kr": role_kr(role),
+            "tabs": [
+                {"role": r, "role_kr": role_kr(r), **summary[r]}
+                for r in INBOX_ROLES
+            ],
+            "items": pending_for_role(role),
+            "approved": request.GET.get("approved", ""),
+            "skipped": request.GET.get("skipped", ""),
+            "already": bool(request.GET.get("already")),
+        },
+    )
+
+
+def v2_inbox_approve(request, role: str):
+    """
+    결재함 일괄 승인
+    - 선택한 문서 중 지금 role 차례인 것만 한 트랜잭션으로 승인 (routes.approve_current_steps)
+    - 알림은 문서별로 보내지 않고 단톡방 1통(+정책상 필요한 DM)으로 합친다
+    """
+    if request.method != "POST":
+        return HttpResponse("Method not allowed", status=405)
+    if role not in INBOX_ROLES:
+        raise Http404()
+
+    limit = int(getattr(settings, "APPROVAL_BATCH_APPROVE_MAX", 200))
+    ids = sorted({int(x) for x in request.POST.getlist("approval_ids") if x.strip().isdigit()})[:limit]
+    if not ids:
+        return redirect(f"/approval/v2/inbox/{role}/")
+
+    # 읽은 뒤 다른 요청이 문서를 먼저 처리하면 전체를 되돌리고 한 번 더 읽어 재시도
+    # (재시도에서는 그 문서가 이미 처리됐으므로 건너뛴다)
+    for attempt in range(2):
+        try:
+            done = _batch_approve(request, role=role, ids=ids)
+            break
+        except RouteConflict:
+            if attempt:
+                return redirect(f"/approval/v2/inbox/{role}/?already=1")
+
+    return redirect(f"/approval/v2/inbox/{role}/?approved={len(done)}&skipped={len(ids) - len(done)}")
+
+
+def _batch_approve(request, *, role: str, ids: list) -> list:
+    """
+    일괄 승인 + 알림 적재 (한 트랜잭션). raise RouteConflict
+    """
+    with transaction.atomic():
+        done = approve_current_steps(
+            approval_ids=ids,
+            role=role,
+            acted_ip=get_client_ip(request),
+            acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
+            acted_anon_id=request.COOKIES.get("anon_id", ""),
+        )
+
+        # 기안자 외 결재자의 승인만 알림 (v2_approve와 같은 기준)
+        entries = []
+        for snapshot, step in done:
+            tpl = find_route_template(snapshot.template_code)
+            if not tpl or step.role not in tpl.approver_roles:
+                continue
+            a = snapshot.route.approval
+            entries.append(
+                {
+                    "template_code": snapshot.template_code,
+                    "drafter_name": a.name,
+                    "drafter_department": a.department,
+                    "line": f"- #{a.id} {a.title} → {snapshot.route.current_step_label}",
+                }
+            )
+
+        if entries:
+            enqueue_batch_notifications(
+                event="approve",
+                actor_role=role,
+                entries=entries,
+                header=f"내쇼날새천년 전자결재\n일괄 승인 : {role_kr(role)} {len(entries)}건",
+                footer=f"바로가기 : {request.build_absolute_uri(f'/approval/v2/inbox/{role}/')}",
+            )
+
+    return done
+
+
+def v2_search(request):
+    """
+    검색창 자동완성: 관련도 순 상위 문서 + 강조 스니펫 (JSON)
+    """
+    q = (request.GET.get("q") or "").strip()[:100]
+    return JsonResponse({"results": search_hits(q)})
+
+
+# =========================
+# v2 export (PDF 묶음 ZIP)
+# =========================
+def v2_export_zip(request):
+    """
+    v2_list와 같은 필터(status/q/from/to)로 고른 문서들의 PDF를 ZIP으로 스트리밍
+    - 캐시/최종 PDF가 없는 문서: inline 모드는 요청 안에서 하나씩 렌더,
+      service 모드는 PdfRenderJob으로 넘겨 pdf_render_worker가 만들게 한다 (ZIP의 pending.txt에 목록)
+    - APPROVAL_EXPORT_MAX_DOCS를 넘는 문서는 omitted.txt와 X-Export-Omitted 헤더로 알린다
+    - 전부 받으려면 manage.py export_pdfs
+    """
+    filters = read_list_filters(request.GET)
+    limit = int(getattr(settings, "APPROVAL_EXPORT_MAX_DOCS", 1000))
+
+    qs = filter_approvals(ApprovalRequest.objects.order_by("id"), **filters)
+    ids = list(qs.values_list("id", flat=True)[:limit + 1])
+    omitted = 0
+    if len(ids) > limit:
+        omitted = qs.count() - limit
+        ids = ids[:limit]
+
+    response = StreamingHttpResponse(
+        iter_export_zip(
+            iter_approvals_by_ids(ids),
+            base_url=request.build_absolute_uri("/"),
+            render=web_render_mode(),
+            omitted=omitted,
+        ),
+        content_type="application/zip",
     )
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(filters)}"'
+    if omitted:
+        response["X-Export-Omitted"] = str(omitted)
+    return response
 
 
 # =========================
 # v2 new
 # =========================
 def v2_new(request):
-    admin_obj = TelegramRecipient.objects.filter(
-        is_active=True,
-        role=TelegramRecipient.ROLE_ADMIN,
-    ).order_by("id").first()
+    admin_obj = get_directory().first_active(TelegramRecipient.ROLE_ADMIN)
     admin_name = admin_obj.name if admin_obj else ""
 
     if request.method == "GET":
@@ -417,11 +583,8 @@ def v2_new(request):
 
     files = request.FILES.getlist("attachments")
     for f in files:
-        ApprovalAttachment.objects.create(
-            approval=approval,
-            file=f,
-            original_name=getattr(f, "name", "")[:255],
-        )
+        create_attachment(approval, f)
+    attach_uploads(approval, request.POST.getlist("upload_ids"))
 
     rebuild_route_after_edit(request=request, approval=approval, template_code=applied["template_code"])
     return redirect(f"/approval/v2/{approval.id}/")
@@ -429,36 +592,38 @@ def v2_new(request):
 # =========================
 # v2 detail
 # =========================
+def get_route_snapshot_or_404(pk: int) -> RouteSnapshot:
+    try:
+        return load_route_snapshot(pk)
+    except ApprovalRouteInstance.DoesNotExist:
+        raise Http404()
+
+
 def v2_detail(request, pk: int):
-    a = get_object_or_404(ApprovalRequest, pk=pk)
-    route = a.route_v2
-    steps = route.steps.order_by("order")
-    actor_role = get_current_actor_role(route)
-    can_edit = can_edit_approval(route)
+    snapshot = get_route_snapshot_or_404(pk)
 
     return render(
         request,
         "approvals_v2/detail.html",
         {
-            "approval": a,
-            "route": route,
-            "steps": steps,
-            "actor_role": actor_role,
-            "can_edit": can_edit,
+            "approval": snapshot.route.approval,
+            "route": snapshot.route,
+            "steps": snapshot.steps,
+            "actor_role": snapshot.current_role,
+            "can_edit": can_edit_approval(snapshot),
+            "already": bool(request.GET.get("already")),
         },
     )
 
 def v2_edit(request, pk: int):
-    approval = get_object_or_404(ApprovalRequest, pk=pk)
-    route = approval.route_v2
+    snapshot = get_route_snapshot_or_404(pk)
+    route = snapshot.route
+    approval = route.approval
 
-    if not can_edit_approval(route):
+    if not can_edit_approval(snapshot):
         return HttpResponse("이미 결재가 시작되어 수정할 수 없습니다.", status=403)
 
-    admin_obj = TelegramRecipient.objects.filter(
-        is_active=True,
-        role=TelegramRecipient.ROLE_ADMIN,
-    ).order_by("id").first()
+    admin_obj = get_directory().first_active(TelegramRecipient.ROLE_ADMIN)
     admin_name = admin_obj.name if admin_obj else ""
 
     if request.method == "GET":
@@ -514,11 +679,8 @@ def v2_edit(request, pk: int):
 
             files = request.FILES.getlist("attachments")
             for f in files:
-                ApprovalAttachment.objects.create(
-                    approval=approval,
-                    file=f,
-                    original_name=getattr(f, "name", "")[:255],
-                )
+                create_attachment(approval, f)
+            attach_uploads(approval, request.POST.getlist("upload_ids"))
 
             rebuild_route_after_edit(
                 request=request,
@@ -538,33 +700,51 @@ def v2_edit(request, pk: int):
 # =========================
 # approve
 # =========================
+def get_expected_version(request):
+    """
+    결재 폼이 화면을 그릴 때의 route.version (hidden input). 없으면 None → 지금 읽은 값 기준
+    """
+    value = (request.POST.get("version") or "").strip()
+    return int(value) if value.isdigit() else None
+
+
 def v2_approve(request, pk: int):
     if request.method != "POST":
         return HttpResponse("Method not allowed", status=405)
 
-    a = ApprovalRequest.objects.get(pk=pk)
-    route = a.route_v2
+    # ✅ 상태 변경 + 알림 적재를 한 트랜잭션으로 (발송은 outbox 워커)
+    try:
+        with transaction.atomic():
+            a = _approve_and_notify(request, pk)
+    except RouteConflict:
+        # 중복 클릭/동시 결재: 먼저 들어온 요청만 반영됨
+        return redirect(f"/approval/v2/{pk}/?already=1")
+
+    return redirect(f"/approval/v2/{a.id}/")
+
+
+def _approve_and_notify(request, pk: int):
+    route = get_object_or_404(ApprovalRouteInstance.objects.select_related("approval"), approval_id=pk)
+    a = route.approval
 
     step = approve_current_step(
         route=route,
         acted_ip=get_client_ip(request),
         acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
         acted_anon_id=request.COOKIES.get("anon_id", ""),
+        expected_version=get_expected_version(request),
     )
 
-    # ✅ 상태 반영
-    route.refresh_from_db()
+    # ✅ 상태 반영 (전이 후 route+steps를 한 번만 다시 읽음)
+    snapshot = load_route_snapshot(pk)
 
-    should_notify = False
-    if route.template_code == "ADMIN_FINAL":
-        should_notify = (step.role == "admin")
-    elif route.template_code in ("NORMAL", "ADMIN_TO_CHAIR"):
-        should_notify = (step.role in ("admin", "chairman"))
-    elif route.template_code == "ADMIN_TO_AUDITOR_CHAIR":
-        should_notify = (step.role in ("auditor", "chairman"))
+    # 기안자 외 결재자의 승인만 알림
+    tpl = find_route_template(route.template_code)
+    should_notify = bool(tpl) and step.role in tpl.approver_roles
 
     if should_notify:
-        dispatch_notifications(
+        enqueue_notifications(
+            approval=a,
             template_code=route.template_code,
             event="approve",
             actor_role=step.role,
@@ -573,7 +753,7 @@ def v2_approve(request, pk: int):
             text=build_tg_text(
                 kind="approve",
                 approval=a,
-                route=route,
+                route=snapshot,
                 template_code=route.template_code,
                 actor_role=step.role,
                 actor_action_kr="승인",
@@ -581,7 +761,7 @@ def v2_approve(request, pk: int):
             ),
         )
 
-    return redirect(f"/approval/v2/{a.id}/")
+    return a
 
 
 # =========================
@@ -595,8 +775,19 @@ def v2_reject(request, pk: int):
     if not reason:
         return HttpResponse("반려 사유를 입력해주세요.", status=400)
 
-    a = ApprovalRequest.objects.get(pk=pk)
-    route = a.route_v2
+    # ✅ 상태 변경 + 알림 적재를 한 트랜잭션으로 (발송은 outbox 워커)
+    try:
+        with transaction.atomic():
+            a = _reject_and_notify(request, pk, reason=reason)
+    except RouteConflict:
+        return redirect(f"/approval/v2/{pk}/?already=1")
+
+    return redirect(f"/approval/v2/{a.id}/")
+
+
+def _reject_and_notify(request, pk: int, *, reason: str):
+    route = get_object_or_404(ApprovalRouteInstance.objects.select_related("approval"), approval_id=pk)
+    a = route.approval
 
     step = reject_current_step(
         route=route,
@@ -604,12 +795,14 @@ def v2_reject(request, pk: int):
         acted_ip=get_client_ip(request),
         acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
         acted_anon_id=request.COOKIES.get("anon_id", ""),
+        expected_version=get_expected_version(request),
     )
 
-    # ✅ 상태 반영
-    route.refresh_from_db()
+    # ✅ 상태 반영 (전이 후 route+steps를 한 번만 다시 읽음)
+    snapshot = load_route_snapshot(pk)
 
-    dispatch_notifications(
+    enqueue_notifications(
+        approval=a,
         template_code=route.template_code,
         event="reject",
         actor_role=step.role,
@@ -618,7 +811,7 @@ def v2_reject(request, pk: int):
         text=build_tg_text(
             kind="reject",
             approval=a,
-            route=route,
+            route=snapshot,
             template_code=route.template_code,
             actor_role=step.role,
             actor_action_kr="반려",
@@ -626,7 +819,7 @@ def v2_reject(request, pk: int):
         ),
     )
 
-    return redirect(f"/approval/v2/{a.id}/")
+    return a
 
 
 # =========================
@@ -639,7 +832,10 @@ def v2_test_approve_and_notify(request, pk: int):
     a = ApprovalRequest.objects.get(pk=pk)
     route = a.route_v2
 
-    step = approve_current_step(route=route)
+    try:
+        step = approve_current_step(route=route)
+    except RouteConflict:
+        return redirect(f"/approval/v2/{pk}/?already=1")
     actor_role = step.role
 
     result = dispatch_notifications(
@@ -685,12 +881,6 @@ def v2_test_create(request):
 
     route = build_route_for_approval(approval=approval, template_code=template_code)
 
-    if route.template_code == "ADMIN_TO_CHAIR":
-        current_role = get_current_actor_role(route)
-        if current_role == "admin":
-            approve_current_step(route=route)
-            route.refresh_from_db()
-
     dispatch_notifications(
         template_code=route.template_code,
         event="submit",
@@ -715,13 +905,16 @@ def v2_test_reject(request, pk: int):
 
     reason = (request.POST.get("reason") or "").strip() or "테스트"
 
-    step = reject_current_step(
-        route=route,
-        reason=reason,
-        acted_ip=get_client_ip(request),
-        acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
-        acted_anon_id=request.COOKIES.get("anon_id", ""),
-    )
+    try:
+        step = reject_current_step(
+            route=route,
+            reason=reason,
+            acted_ip=get_client_ip(request),
+            acted_device=(request.META.get("HTTP_USER_AGENT", "")[:50]),
+            acted_anon_id=request.COOKIES.get("anon_id", ""),
+        )
+    except RouteConflict:
+        return redirect(f"/approval/v2/{pk}/?already=1")
 
     return HttpResponse(f"rejected actor={step.role} reason={reason}")
 
@@ -729,8 +922,6 @@ def v2_test_reject(request, pk: int):
 # =========================
 # mobile upload (기존 유지)
 # =========================
-MOBILE_UPLOAD_STORE = {}  # token -> {"image_url": "...", "ts": ...}
-
 
 @csrf_exempt
 def mobile_upload_page(request, token: str):
@@ -741,72 +932,152 @@ def mobile_upload_page(request, token: str):
     if not f:
         return JsonResponse({"ok": False, "error": "no file"}, status=400)
 
+    f = normalize_upload(f)
     path = default_storage.save(f"mobile_upload/{token}/{f.name}", f)
     url = default_storage.url(path)
 
-    MOBILE_UPLOAD_STORE[token] = {"image_url": url, "ts": timezone.now().isoformat()}
+    put_upload(token, url)
     return JsonResponse({"ok": True, "image_url": url})
 
 
 def mobile_upload_poll(request, token: str):
-    data = MOBILE_UPLOAD_STORE.get(token) or {}
+    data = latest_upload(token) or {}
     return JsonResponse({"image_url": data.get("image_url", "")})
 
 
+async def _mobile_upload_event_stream(token: str, last_event_id: str):
+    """
+    업로드가 들어올 때까지 연결을 잡고 있다가 image_url을 push (SSE)
+    - handoff 캐시 확인은 서버 안에서만 (MOBILE_UPLOAD_EVENTS_INTERVAL초 간격)
+    - MOBILE_UPLOAD_EVENTS_TIMEOUT초가 지나면 닫고, 브라우저 EventSource가 Last-Event-ID로 다시 붙는다
+    """
+    interval = float(getattr(settings, "MOBILE_UPLOAD_EVENTS_INTERVAL", 3.0))
+    timeout = float(getattr(settings, "MOBILE_UPLOAD_EVENTS_TIMEOUT", 55))
+    deadline = time.monotonic() + timeout
+    next_ping = time.monotonic() + 15
+
+    yield "retry: 3000\n\n"
+    while time.monotonic() < deadline:
+        data = await alatest_upload(token)
+        if data and data["ts"] != last_event_id:
+            last_event_id = data["ts"]
+            payload = json.dumps({"image_url": data["image_url"]})
+            yield f"id: {last_event_id}\nevent: upload\ndata: {payload}\n\n"
+
+        # 프록시가 idle 연결을 끊지 않도록 주석 한 줄
+        if time.monotonic() >= next_ping:
+            next_ping = time.monotonic() + 15
+            yield ": ping\n\n"
+
+        await asyncio.sleep(interval)
+
+
+async def mobile_upload_events(request, token: str):
+    """
+    mobile_upload_poll의 SSE 버전. ASGI(approval/asgi.py)로 띄운 워커에서만 연결을 오래 잡는다.
+    settings.MOBILE_UPLOAD_SSE가 꺼져 있으면(WSGI) 404 → 화면은 폴링을 쓴다.
+    """
+    if not getattr(settings, "MOBILE_UPLOAD_SSE", False):
+        raise Http404()
+
+    response = StreamingHttpResponse(
+        _mobile_upload_event_stream(token, request.headers.get("Last-Event-ID", "")),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx 버퍼링 끔
+    return response
+
+
 # =========================
-# pdf (그대로 유지)
+# pdf
 # =========================
 def approval_pdf(request, pk):
     """
     v2 PDF 출력
-    - content 내부 <html>, <body>, <style>, <script> 제거
-    - 첨부파일 안전 전달
-    - route/steps 안전 처리
+    - 버전(route/본문/첨부) 기준 디스크 캐시, 있으면 파일 그대로 스트리밍
+    - 없을 때만 content 정리 + WeasyPrint 렌더
+    - APPROVAL_PDF_RENDER_MODE="service"면 렌더는 pdf_render_worker에 맡기고 대기 화면(202)
+    - 완료/반려 문서는 route에 붙은 최종 PDF 파일을 그대로 내려줌
     """
-    from weasyprint import HTML
-    import re
-
     try:
         approval = ApprovalRequest.objects.select_related("route_v2").get(pk=pk)
     except ApprovalRequest.DoesNotExist:
         raise Http404()
 
+    filename = f"approval_{approval.id}.pdf"
+    download = request.GET.get("download") == "1"
+
     route = getattr(approval, "route_v2", None)
-    steps = route.steps.all().order_by("order") if route else []
+    if route and route.is_closed and route.final_pdf:
+        return storage_sendfile_response(
+            route.final_pdf.name,
+            content_type="application/pdf",
+            as_attachment=download,
+            filename=filename,
+        )
 
-    raw = approval.content or ""
-    raw = re.sub(r"(?is)<style.*?>.*?</style>", "", raw)
-    raw = re.sub(r"(?is)<script.*?>.*?</script>", "", raw)
-    raw = re.sub(r"(?is)<link[^>]*>", "", raw)
-    raw = re.sub(r"(?is)</?(html|body|head)[^>]*>", "", raw)
-    content_html = raw
+    base_url = request.build_absolute_uri("/")
+
+    if getattr(settings, "APPROVAL_PDF_RENDER_MODE", "inline") == "service":
+        path = get_cached_pdf(approval)
+        if path is None:
+            job = latest_job(approval.id)
+            # 워커가 포기한 문서만 요청 안에서 직접 렌더
+            if not (job and job.status == PdfRenderJob.STATUS_FAILED):
+                enqueue_pdf_render(approval.id, base_url=base_url)
+                return render(request, "approvals_v2/pdf_pending.html", {"approval": approval}, status=202)
+            path = get_or_render_pdf(approval, base_url=base_url, request=request)
+    else:
+        path = get_or_render_pdf(approval, base_url=base_url, request=request)
 
-    attachments = []
-    if hasattr(approval, "v2_attachments"):
-        attachments = list(approval.v2_attachments.all())
+    # 미리 렌더가 안 된 완료/반려 문서는 여기서 붙여 둔다
+    if route and route.is_closed:
+        store_final_pdf(route, path)
 
-    html_string = render_to_string(
-        "approvals_v2/pdf_template.html",
-        {
-            "approval": approval,
-            "route": route,
-            "steps": steps,
-            "content_html": content_html,
-            "attachments": attachments,
-        },
-        request=request,
+    return sendfile_response(
+        path,
+        content_type="application/pdf",
+        as_attachment=download,
+        filename=filename,
     )
 
-    pdf_bytes = HTML(
-        string=html_string,
-        base_url=request.build_absolute_uri("/"),
-    ).write_pdf()
 
-    filename = f"approval_{approval.id}.pdf"
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
+# =========================
+# 첨부/미디어 다운로드 (파일 전송은 앞단 프록시)
+# =========================
+def attachment_download(request, token: str):
+    """
+    attachment_url로 만든 서명 주소만 받는다. (pk를 순서대로 넣어 모든 첨부를 받아 가지 못하게)
+    품의서에 연결된 첨부만 내려준다. (분할 업로드 후 아직 저장 안 된 첨부는 404)
+    """
+    try:
+        pk = read_attachment_token(token)
+    except signing.SignatureExpired:
+        return HttpResponse("링크가 만료되었습니다. 페이지를 새로고침 해주세요.", status=403)
+    except (signing.BadSignature, ValueError):
+        raise Http404()
 
-    download = request.GET.get("download") == "1"
-    disposition = "attachment" if download else "inline"
-    response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    attachment = get_object_or_404(ApprovalAttachment, pk=pk, approval__isnull=False)
+    return storage_sendfile_response(
+        attachment.file.name,
+        filename=attachment.original_name or os.path.basename(attachment.file.name),
+        as_attachment=request.GET.get("download") == "1",
+    )
+
+
+def signed_media(request, token: str):
+    """
+    signed_media_url로 만든 주소 (도장/썸네일 등). 만료되면 403
+    """
+    try:
+        data = read_signed_media_token(token)
+    except signing.SignatureExpired:
+        return HttpResponse("링크가 만료되었습니다. 페이지를 새로고침 해주세요.", status=403)
+    except signing.BadSignature:
+        raise Http404()
 
-    return response
\ No newline at end of file
+    name = data.get("n", "")
+    if not name or not default_storage.exists(name):
+        raise Http404()
+    return storage_sendfile_response(name, filename=data.get("f", ""))